@@ -153,16 +153,42 @@ docker run --rm -v "./user_data:/freqtrade/user_data" \\
 
 from __future__ import annotations
 
-from functools import reduce
-from typing import Any, Optional, Dict
+import atexit
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional, Dict, Tuple
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
-import talib.abstract as ta
+from freqtrade.enums import RunMode
+from freqtrade.exchange import timeframe_to_minutes
 from freqtrade.persistence import Trade
 from freqtrade.strategy import IStrategy
 
+from common.compact import compact_indicators
+from common.exits import LONG_HOLDING_HOURS, LONG_HOLDING_MAX_LOSS, LONG_HOLDING_WINDOW
+from common.fingerprint import SignalFingerprint, config_digest
+from common.hyperopt_params import AssetParameterSet, ema_grid_column
+from common.higher_timeframe import HigherTimeframeEngine, HigherTimeframeSpec, populate_confirmation
+from common.indicator_cache import CachedIndicators
+from common.instrumentation import InstrumentationControl
+from common.market_regime import MarketRegimeFeed
+from common.profile_reload import ProfileWatcher
+from common.profiles import AssetProfile, PairProfileTable, ProfileRegistry
+from common.risk_gate import RiskGate
+from common.signals import SignalKernel, write_signal
+from common.simulator import ExitRules
+from common.snapshot import IndicatorSnapshot
+from common.streaming import StreamingIndicatorEngine
+from common.triggers import PairTriggers
+from common.warmup import DEFAULT_TOLERANCE, pair_warmup
+
+
+logger = logging.getLogger(__name__)
+
 
 # ============================================================
 # 资产配置表 - 仅保留经过验证的币种
@@ -290,6 +316,26 @@ DEFAULT_CONFIG: dict = {
 }
 
 
+# ================================================================
+# 编译后的档案表 - 策略加载时统一校验，之后只读
+# ================================================================
+PROFILES = ProfileRegistry(ASSET_CONFIGS, DEFAULT_CONFIG)
+
+# ================================================================
+# 按资产的超参优化空间（参数名如 doge_ema_fast，默认值取自档案）
+# ================================================================
+# 参与超参优化的资产；其余资产的参数只加载已保存的值，不参与搜索
+HYPEROPT_ASSETS = ("DOGE",)
+
+ASSET_PARAMETERS: Dict[str, AssetParameterSet] = {
+    name: AssetParameterSet(profile, optimize=name in HYPEROPT_ASSETS)
+    for name, profile in PROFILES.profiles.items()
+}
+
+# 入场时附加的布尔过滤列（大盘过滤 / 高周期确认开启时才存在）
+ENTRY_FILTER_COLUMNS = ("market_ok", "htf_ok")
+
+
 class AdaptiveInstitutionalStrategy(IStrategy):
     """
     自适应机构级趋势跟踪策略
@@ -323,7 +369,52 @@ class AdaptiveInstitutionalStrategy(IStrategy):
     process_only_new_candles = True
     
     # 需要的历史K线数量（用于计算 EMA300）
+    # freqtrade 按此全局值加载数据；各交易对实际所需预热见 pair_startup_candles
     startup_candle_count = 350
+    
+    # 递推指标（EMA / Wilder）的收敛容差: 初始种子剩余权重上限
+    warmup_tolerance = DEFAULT_TOLERANCE
+    
+    # 实盘/模拟盘使用流式增量指标（每根新K线 O(1) 更新）
+    # 回测/超参优化仍使用 talib 全量向量化计算
+    use_streaming_indicators = True
+    
+    # 流式指标状态写入 user_data/indicator_state，重启后只补算停机期间的K线
+    use_indicator_snapshot = True
+    # 快照最多每隔这么久写一次（在交易循环中同步写入，不必每根K线都写）；
+    # 重启时最多补推这段时间内的K线，正常退出时总会再写一次
+    snapshot_interval = timedelta(hours=4)
+    
+    # 实盘/模拟盘热加载的资产参数覆盖文件（相对 user_data 目录，None 关闭）
+    # 格式见 common.profile_reload
+    asset_config_file: Optional[str] = "asset_configs.json"
+    
+    # 实盘/模拟盘热路径计时的开关文件（相对 user_data 目录，None 关闭）
+    # 格式见 common.instrumentation；文件不存在时不计时
+    instrumentation_file: Optional[str] = "instrumentation.json"
+    
+    # 大盘过滤: 信息对在各周期收盘价均位于 EMA 上方时才允许入场（None 关闭，见 common.market_regime）
+    # 回测需先下载信息对各周期的数据
+    market_filter_pair: Optional[str] = None
+    market_filter_emas: Dict[str, int] = {"1h": 200, "4h": 50}
+    
+    # 高周期确认: 由已加载的 1h K线重采样出 4h / 1d，趋势确认后才允许入场（空元组关闭）
+    # 如 common.higher_timeframe.DEFAULT_CONFIRMATION；高周期指标所需K线数计入 pair_startup_candles。
+    # 启用 DEFAULT_CONFIRMATION 时必须同时把 startup_candle_count 提高到约 600（容差 5%，
+    # 日线 EMA10 所需；按配置计算见 tools/warmup_report.py --confirmation default），
+    # 否则回测起始段与实盘冷启动时的高周期 EMA 尚未收敛，bot_start 的日志只是提示，不会自动补足
+    higher_timeframe_confirmation: Tuple[HigherTimeframeSpec, ...] = ()
+    
+    # 组合风控（confirm_trade_entry，None 关闭对应检查，见 common.risk_gate）
+    # 持仓上限是策略自己的上限，配置中的 max_open_trades 仍然生效
+    max_positions: Optional[int] = None
+    max_entries_per_day: Optional[int] = None       # 滚动 24 小时
+    max_pair_correlation: Optional[float] = None    # 与任一持仓的K线收益率相关系数上限
+    correlation_halflife = 72                       # 相关系数半衰期（K线数）
+    
+    # 精简 dataframe: 指标 float32、标签 categorical、删除中间列（见 common.compact）
+    # 长区间多交易对的回测/超参优化内存吃紧时开启
+    use_compact_dataframe = False
 
     # ============================================================
     # 止损配置（会被 custom_stoploss 覆盖）
@@ -349,37 +440,199 @@ class AdaptiveInstitutionalStrategy(IStrategy):
     exit_profit_only = False            # 亏损时也允许出场
     
     # ============================================================
-    # 内部缓存
+    # 内部状态（bot_start 中按实例初始化，不在实例间共享）
+    # ============================================================
+    _profiles: Optional[PairProfileTable] = None
+    _streaming_engine: Optional[StreamingIndicatorEngine] = None
+    _signal_kernel: Optional[SignalKernel] = None
+    _tuned_profiles: Optional[Dict[str, tuple]] = None
+    _active_profiles: Optional[Dict[str, AssetProfile]] = None
+    _fingerprint_signals: Optional[Dict[str, tuple]] = None
+    _snapshot: Optional[IndicatorSnapshot] = None
+    _snapshot_due: Optional[datetime] = None
+    _profile_watcher: Optional[ProfileWatcher] = None
+    _instrumentation: Optional[InstrumentationControl] = None
+    _market_feed: Optional[MarketRegimeFeed] = None
+    _market_frames: Optional[Dict[tuple, DataFrame]] = None
+    _htf_engine: Optional[HigherTimeframeEngine] = None
+    _triggers: Optional[Dict[str, PairTriggers]] = None
+    _risk_gate: Optional[RiskGate] = None
+
     # ============================================================
-    _pair_configs: Dict[str, dict] = {}
+    # 生命周期
+    # ============================================================
+    def bot_start(self, **kwargs) -> None:
+        """初始化档案表、流式指标引擎与信号内核（每个策略实例独立持有状态）"""
+        self._profiles = PairProfileTable(PROFILES)
+        self._profiles.precompute(self.config.get("exchange", {}).get("pair_whitelist", []))
+        self._streaming_engine = StreamingIndicatorEngine()
+        self._signal_kernel = SignalKernel()
+        self._tuned_profiles = {}
+        self._active_profiles = {}
+        self._triggers = {}
+        self._fingerprint_signals = {}
+        
+        # 实盘/模拟盘: 高周期K线按交易对增量合成
+        if self.higher_timeframe_confirmation and self._is_live():
+            self._htf_engine = HigherTimeframeEngine(self.timeframe, self.higher_timeframe_confirmation)
+        
+        if any(limit is not None for limit in
+               (self.max_positions, self.max_entries_per_day, self.max_pair_correlation)):
+            self._risk_gate = RiskGate(
+                self.timeframe, self.max_positions, self.max_entries_per_day,
+                self.max_pair_correlation, self.correlation_halflife,
+            )
+        
+        if self.market_filter_pair:
+            self._market_frames = {}
+            self._market_feed = MarketRegimeFeed(
+                self.market_filter_pair, self.timeframe, self.market_filter_emas, self._market_frame,
+            )
+        
+        # 实盘/模拟盘: 监视资产参数覆盖文件（启动时先加载一次）
+        if self.asset_config_file and self._is_live():
+            self._profile_watcher = ProfileWatcher(
+                Path(self.config["user_data_dir"]) / self.asset_config_file,
+                ASSET_CONFIGS, DEFAULT_CONFIG,
+            )
+            self._reload_profiles()
+        
+        # 实盘/模拟盘: 监视计时开关文件
+        if self.instrumentation_file and self._is_live():
+            self._instrumentation = InstrumentationControl(
+                Path(self.config["user_data_dir"]) / self.instrumentation_file, self,
+            )
+            self._instrumentation.poll()
+        
+        # 预热不足的交易对（启动初期的指标仍受种子影响）
+        for pair in self.config.get("exchange", {}).get("pair_whitelist", []):
+            needed = self.pair_startup_candles(pair)
+            if needed > self.startup_candle_count:
+                logger.info("%s 的指标约需 %d 根K线收敛（容差 %.0f%%），startup_candle_count 为 %d",
+                            pair, needed, 100 * self.warmup_tolerance, self.startup_candle_count)
+        
+        # 实盘/模拟盘: 从快照恢复流式指标状态，退出时再写一次
+        if self.use_indicator_snapshot and self._use_streaming():
+            path = Path(self.config["user_data_dir"]) / "indicator_state" / f"{type(self).__name__}.pkl"
+            self._snapshot = IndicatorSnapshot(path, self.timeframe)
+            self._streaming_engine.restore(self._snapshot.load())
+            atexit.register(self._save_snapshot)
+
+    def bot_loop_start(self, current_time: datetime, **kwargs) -> None:
+        """
+        每轮循环开始时:
+        - 资产参数文件有变化则换入新档案表（下一根K线生效）
+        - 距上次写快照超过 snapshot_interval 时持久化新推入的K线（无新K线时不写文件）
+        - 计时开关文件有变化则打开/关闭计时，到时间输出计时日志
+        - 组合风控的持仓集合与数据库同步
+        """
+        self._reload_profiles()
+        if self._snapshot is not None and (self._snapshot_due is None or current_time >= self._snapshot_due):
+            self._save_snapshot()
+            self._snapshot_due = current_time + self.snapshot_interval
+        if self._instrumentation is not None:
+            self._instrumentation.poll()
+        if self._risk_gate is not None:
+            self._risk_gate.sync(trade.pair for trade in Trade.get_open_trades())
+            if self._is_live():
+                self._risk_gate.trim()
+
+    def _reload_profiles(self) -> None:
+        if self._profile_watcher is None:
+            return
+        registry = self._profile_watcher.poll()
+        if registry is None:
+            return
+        # 先建好完整的新表再一次性替换；EMA 周期变化的交易对由流式引擎自行重新预热
+        profiles = PairProfileTable(registry)
+        profiles.precompute(self.config.get("exchange", {}).get("pair_whitelist", []))
+        self._profiles, self._tuned_profiles = profiles, {}
+
+    def _save_snapshot(self) -> None:
+        if self._snapshot is not None and self._streaming_engine.dirty:
+            self._snapshot.save(self._streaming_engine.snapshot())
 
     # ============================================================
     # 辅助方法
     # ============================================================
-    def get_asset_config(self, pair: str) -> dict:
+    def get_profile(self, pair: str) -> AssetProfile:
         """
-        获取资产配置
+        获取资产档案
         
-        根据交易对名称返回对应的参数配置。
-        如果是未知资产，返回默认配置（不建议使用）。
+        根据交易对名称返回对应的参数档案（不可变对象，属性访问）。
+        如果是未知资产，返回默认档案（不建议使用）。
         
         Args:
             pair: 交易对名称，如 "DOGE/USDT"
             
         Returns:
-            dict: 该资产的配置参数
+            AssetProfile: 该资产的参数档案（已叠加超参的当前值）
         """
-        if pair in self._pair_configs:
-            return self._pair_configs[pair]
+        base = self._profiles.get(pair)
+        params = ASSET_PARAMETERS.get(base.name)
+        if params is None:
+            return base
         
-        # 提取基础资产名称（如 DOGE/USDT -> DOGE）
-        base_asset = pair.split("/")[0].upper()
+        # 参数值不变时复用上次生成的档案
+        values = params.values(self)
+        tuned = self._tuned_profiles.get(base.name)
+        if tuned is not None and tuned[0] == values:
+            return tuned[1]
         
-        # 查找匹配的配置，未找到则使用默认配置
-        config = ASSET_CONFIGS.get(base_asset, DEFAULT_CONFIG)
-        self._pair_configs[pair] = config
+        # 档案来自热加载文件时，只有加载了超参结果的参数才覆盖文件中的值
+        overrides = params.overrides(self, tuned_only=self._profile_watcher is not None)
+        profile = base.replace(**overrides) if overrides else base
+        self._tuned_profiles[base.name] = (values, profile)
+        return profile
+
+    def _active_profile(self, pair: str) -> AssetProfile:
+        """回调中使用的档案（populate_entry_trend 时已解析好）"""
+        profile = self._active_profiles.get(pair)
+        if profile is None:
+            profile = self.get_profile(pair)
+        return profile
+
+    def pair_startup_candles(self, pair: str) -> int:
+        """该交易对按当前档案（及高周期确认）实际所需的预热K线数（见 common.warmup）"""
+        needed = pair_warmup(self.get_profile(pair).ema_periods, self.warmup_tolerance)
+        for spec in self.higher_timeframe_confirmation:
+            needed = max(needed, spec.needed_candles(self.timeframe, self.warmup_tolerance))
+        return needed
+
+    def _ema_grid(self, profile: AssetProfile) -> list:
+        """超参优化时需要预计算的 EMA 周期；非超参优化返回空列表"""
+        params = ASSET_PARAMETERS.get(profile.name)
+        if params is None:
+            return []
+        grid = params.ema_grid(self)
+        if len(grid) <= len(set(profile.ema_periods)):
+            return []
+        return grid
+
+    def _market_frame(self, pair: str, timeframe: str) -> Optional[DataFrame]:
+        """
+        大盘过滤的信息对K线
         
-        return config
+        实盘/模拟盘直接读交易所缓存（不复制）；回测/超参优化的历史数据不会变化，
+        读一次后留在实例中，避免每个交易对各复制一份。
+        """
+        if self.dp is None:
+            return None
+        if self._is_live():
+            return self.dp.ohlcv(pair, timeframe, copy=False)
+        frame = self._market_frames.get((pair, timeframe))
+        if frame is None:
+            frame = self._market_frames[(pair, timeframe)] = self.dp.historic_ohlcv(pair, timeframe)
+        return frame
+
+    def _is_live(self) -> bool:
+        return self.dp is not None and self.dp.runmode in (RunMode.LIVE, RunMode.DRY_RUN)
+
+    def _use_streaming(self) -> bool:
+        """仅在实盘/模拟盘启用流式指标"""
+        if not self.use_streaming_indicators or self._streaming_engine is None:
+            return False
+        return self._is_live()
 
     # ============================================================
     # 指标计算
@@ -390,30 +643,94 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         
         计算入场和出场所需的所有技术指标。
         指标周期会根据资产配置动态调整。
+        
+        实盘/模拟盘下由流式引擎只推入新K线；其余模式 talib 全量计算。
         """
         pair = metadata.get("pair", "")
-        config = self.get_asset_config(pair)
+        profile = self.get_profile(pair)
+        periods = profile.ema_periods
+        
+        if self._use_streaming():
+            self._streaming_engine.populate(pair, dataframe, periods)
+        else:
+            self._compute_indicators(dataframe, pair, periods)
+            
+            # 超参优化: 预计算搜索范围内的全部 EMA，epoch 中只挑列
+            grid = self._ema_grid(profile)
+            if grid:
+                ind = CachedIndicators(dataframe, pair, self.timeframe)
+                dtype = np.float32 if self.use_compact_dataframe else np.float64
+                dataframe = pd.concat(
+                    [dataframe, DataFrame(
+                        {ema_grid_column(p): ind.ema(p).astype(dtype, copy=False) for p in grid},
+                        index=dataframe.index,
+                    )],
+                    axis=1,
+                )
+        
+        dataframe = self._add_trend_flags(dataframe)
+        if self._htf_engine is not None:
+            self._htf_engine.populate(pair, dataframe)
+        elif self.higher_timeframe_confirmation:
+            populate_confirmation(dataframe, self.timeframe, self.higher_timeframe_confirmation)
+        if self._market_feed is not None:
+            # 大盘状态整个进程只算一次，这里按时间戳对齐取出
+            market = self._market_feed.column(dataframe)
+            if market is not None:
+                dataframe["market_ok"] = market
+        if self._risk_gate is not None:
+            # 收益率只推入新K线，协方差在入场确认时按K线时间并入
+            self._risk_gate.observe(pair, dataframe)
+        if self.use_compact_dataframe:
+            # 趋势布尔列已派生完毕，中间列不再需要
+            dataframe = compact_indicators(dataframe)
+        return dataframe
+
+    def _select_ema_grid(self, dataframe: DataFrame, profile: AssetProfile) -> None:
+        """
+        超参优化: 从 EMA 网格中取出本 epoch 的周期，重算依赖 EMA 的列
+        
+        只涉及列拷贝与几次向量比较，不调用 talib。
+        """
+        if ema_grid_column(profile.ema_fast) not in dataframe.columns:
+            return
+        for column, period in zip(("ema_fast", "ema_slow", "ema_trend", "ema_exit"),
+                                  profile.ema_periods):
+            dataframe[column] = dataframe[ema_grid_column(period)]
+        ema_slow_prev = dataframe["ema_slow"].shift(10)
+        dataframe["slope"] = (dataframe["ema_slow"] - ema_slow_prev) / ema_slow_prev * 100
+        # adx_rising / is_trending 与 EMA 无关，无需重算
+        self._add_uptrend(dataframe)
+
+    def _compute_indicators(self, dataframe: DataFrame, pair: str, periods: tuple) -> DataFrame:
+        """
+        talib 全量计算数值型指标（列与流式引擎的 STREAM_COLUMNS 一致）
+        
+        指标经本次调用的指标缓存获取：周期相同的 EMA（如 ema_exit == ema_trend）只算一次。
+
+        按交易对逐个调用 talib: 把多个交易对堆成二维数组批量递推的做法实测更慢
+        （EMA / RSI / ADX / ATR 的时间递推只能在 Python 中逐根循环，10 个交易对约慢 5 倍）。
+        """
+        ema_fast_period, ema_slow_period, ema_trend_period, ema_exit_period = periods
+        ind = CachedIndicators(dataframe, pair, self.timeframe)
         
         # ----------------------------------------------------
         # EMA 指标（趋势判断核心）
         # ----------------------------------------------------
-        dataframe["ema_fast"] = ta.EMA(dataframe, timeperiod=config["ema_fast"])
-        dataframe["ema_slow"] = ta.EMA(dataframe, timeperiod=config["ema_slow"])
-        dataframe["ema_trend"] = ta.EMA(dataframe, timeperiod=config["ema_trend"])
-        
-        # 出场用 EMA（可能与趋势 EMA 不同）
-        ema_exit_period = config.get("ema_exit", config["ema_trend"])
-        dataframe["ema_exit"] = ta.EMA(dataframe, timeperiod=ema_exit_period)
+        dataframe["ema_fast"] = ind.ema(ema_fast_period)
+        dataframe["ema_slow"] = ind.ema(ema_slow_period)
+        dataframe["ema_trend"] = ind.ema(ema_trend_period)
+        dataframe["ema_exit"] = ind.ema(ema_exit_period)
         
         # ----------------------------------------------------
         # RSI 指标（超买超卖过滤）
         # ----------------------------------------------------
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        dataframe["rsi"] = ind.rsi(14)
         
         # ----------------------------------------------------
         # ATR 指标（波动率）
         # ----------------------------------------------------
-        dataframe["atr"] = ta.ATR(dataframe, timeperiod=14)
+        dataframe["atr"] = ind.atr(14)
         dataframe["atr_pct"] = dataframe["atr"] / dataframe["close"] * 100
         
         # 波动率比值（当前波动 / 历史平均）
@@ -421,16 +738,6 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         atr_sma = dataframe["atr_pct"].rolling(window=50).mean()
         dataframe["volatility_ratio"] = dataframe["atr_pct"] / atr_sma
         
-        # ----------------------------------------------------
-        # 趋势判断
-        # ----------------------------------------------------
-        # 上升趋势: 快线 > 慢线 > 趋势线，且价格在快线上方
-        dataframe["uptrend"] = (
-            (dataframe["ema_fast"] > dataframe["ema_slow"]) &
-            (dataframe["ema_slow"] > dataframe["ema_trend"]) &
-            (dataframe["close"] > dataframe["ema_fast"])
-        )
-        
         # 趋势斜率（10 根K线的变化率）
         # 正值表示上升，值越大动能越强
         dataframe["slope"] = (
@@ -440,34 +747,26 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         # ----------------------------------------------------
         # ADX 指标（趋势强度）
         # ----------------------------------------------------
-        dataframe["adx"] = ta.ADX(dataframe, timeperiod=14)
+        dataframe["adx"] = ind.adx(14)
         
         # ----------------------------------------------------
         # 震荡/趋势市场判断 (新增)
         # ----------------------------------------------------
         # 1. 布林带宽度 - 宽度大表示趋势，宽度小表示震荡
-        bb = ta.BBANDS(dataframe, timeperiod=20, nbdevup=2.0, nbdevdn=2.0)
-        dataframe["bb_width"] = (bb["upperband"] - bb["lowerband"]) / bb["middleband"]
+        bb_upper, bb_middle, bb_lower = ind.bbands(20, 2.0)
+        dataframe["bb_width"] = (bb_upper - bb_lower) / bb_middle
         dataframe["bb_width_sma"] = dataframe["bb_width"].rolling(window=50).mean()
         
         # 2. ADX 趋势确认 - ADX > 25 且上升表示强趋势
         dataframe["adx_sma"] = dataframe["adx"].rolling(window=10).mean()
-        dataframe["adx_rising"] = dataframe["adx"] > dataframe["adx_sma"]
-        
-        # 3. 综合判断：趋势市场 vs 震荡市场
-        # 趋势市场条件: ADX上升 或 布林带宽度扩张 (宽松条件)
-        dataframe["is_trending"] = (
-            (dataframe["adx_rising"]) |  # ADX 在上升
-            (dataframe["bb_width"] > dataframe["bb_width_sma"])  # 布林带宽度大于均值
-        )
         
         # ----------------------------------------------------
         # MACD 指标（动量确认）
         # ----------------------------------------------------
-        macd = ta.MACD(dataframe, fastperiod=12, slowperiod=26, signalperiod=9)
-        dataframe["macd"] = macd["macd"]
-        dataframe["macd_signal"] = macd["macdsignal"]
-        dataframe["macd_hist"] = macd["macdhist"]
+        macd, macd_signal, macd_hist = ind.macd(12, 26, 9)
+        dataframe["macd"] = macd
+        dataframe["macd_signal"] = macd_signal
+        dataframe["macd_hist"] = macd_hist
         
         # ----------------------------------------------------
         # 成交量指标
@@ -477,6 +776,36 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         
         return dataframe
 
+    def _add_trend_flags(self, dataframe: DataFrame) -> DataFrame:
+        """由数值型指标派生趋势布尔列"""
+        self._add_uptrend(dataframe)
+        return self._add_regime_flags(dataframe)
+
+    def _add_uptrend(self, dataframe: DataFrame) -> DataFrame:
+        """上升趋势: 快线 > 慢线 > 趋势线，且价格在快线上方"""
+        dataframe["uptrend"] = (
+            (dataframe["ema_fast"] > dataframe["ema_slow"]) &
+            (dataframe["ema_slow"] > dataframe["ema_trend"]) &
+            (dataframe["close"] > dataframe["ema_fast"])
+        )
+        return dataframe
+
+    def _add_regime_flags(self, dataframe: DataFrame) -> DataFrame:
+        """震荡/趋势市场判断（只依赖 ADX 与布林带，与 EMA 周期无关）"""
+        # ----------------------------------------------------
+        # 震荡/趋势市场判断
+        # ----------------------------------------------------
+        dataframe["adx_rising"] = dataframe["adx"] > dataframe["adx_sma"]
+        
+        # 综合判断：趋势市场 vs 震荡市场
+        # 趋势市场条件: ADX上升 或 布林带宽度扩张 (宽松条件)
+        dataframe["is_trending"] = (
+            (dataframe["adx_rising"]) |  # ADX 在上升
+            (dataframe["bb_width"] > dataframe["bb_width_sma"])  # 布林带宽度大于均值
+        )
+        
+        return dataframe
+
     # ============================================================
     # 入场信号
     # ============================================================
@@ -492,61 +821,58 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         5. MACD 和成交量辅助确认
         """
         pair = metadata.get("pair", "")
-        config = self.get_asset_config(pair)
+        profile = self.get_profile(pair)
+        self._active_profiles[pair] = profile
         
-        # 基础入场条件
-        conditions = [
-            # 条件1: 上升趋势确认
-            dataframe["uptrend"],
-            
-            # 条件2: 趋势有足够动能
-            dataframe["slope"] > config["slope_threshold"],
-            
-            # 条件3: 回踩买入
-            # 最低价触及快线附近（允许一定容忍度）
-            dataframe["low"] <= dataframe["ema_fast"] * config["pullback_tolerance"],
-            # 但收盘价仍在快线上方（没有跌破）
-            dataframe["close"] > dataframe["ema_fast"],
-            
-            # 条件4: RSI 过滤
-            dataframe["rsi"] < config["rsi_overbought"],  # 不追高
-            dataframe["rsi"] > config["rsi_oversold"],    # 不抄底
-            
-            # 条件5: 趋势强度确认
-            dataframe["adx"] > config.get("min_adx", 20),
-        ]
-        
-        # 合并基础条件
-        valid = dataframe["ema_fast"].notna() & dataframe["rsi"].notna()
-        basic_entry = reduce(lambda x, y: x & y, conditions) & valid
-        
-        # 检查是否使用高级过滤（MACD + 成交量）
-        use_advanced = config.get("use_advanced_filter", True)  # 默认启用
-        
-        if use_advanced:
-            # 高级过滤条件（可选，提高信号质量）
-            advanced_conditions = [
-                # MACD 柱状图为正（动量向上）
-                dataframe["macd_hist"] > 0,
-                
-                # 成交量不能太低（避免假突破）
-                dataframe["volume_ratio"] > 0.8,
-            ]
-            
-            # 震荡市场过滤
-            if config.get("use_trend_filter", False):
-                advanced_conditions.append(dataframe["is_trending"])
-            
-            full_entry = basic_entry & reduce(lambda x, y: x & y, advanced_conditions)
-            dataframe.loc[full_entry, "enter_long"] = 1
-            dataframe.loc[full_entry, "enter_tag"] = "full_signal"
-        else:
-            # 仅使用基础条件（与 MntTrendHoldV3 一致）
-            dataframe.loc[basic_entry, "enter_long"] = 1
-            dataframe.loc[basic_entry, "enter_tag"] = "basic_signal"
+        # 实盘/模拟盘: 最后一根K线由上一根分析后算好的价带判断（见 common.triggers）
+        entry = None
+        if self._use_streaming():
+            entry = self._pair_triggers(pair).entry_signal(
+                dataframe, profile, self._entry_filters(dataframe))
+        if entry is None:
+            memo = self._memo_signals(pair, dataframe, profile)
+            entry = memo[0] if memo is not None else self._entry_signal(dataframe, profile)[0]
+        tag = self._entry_tag(profile)
+        write_signal(dataframe, entry, "enter_long", "enter_tag", tag,
+                     categorical=self.use_compact_dataframe)
         
         return dataframe
 
+    def _entry_signal(self, dataframe: DataFrame, profile: AssetProfile) -> tuple:
+        """返回 (入场掩码, 入场标签)，掩码为信号内核缓冲区的视图"""
+        self._select_ema_grid(dataframe, profile)
+        
+        # 检查是否使用高级过滤（MACD + 成交量，默认启用）
+        use_advanced = profile.use_advanced_filter
+        
+        # 融合内核一次性计算全部条件:
+        # 1. 上升趋势确认  2. 趋势动能  3. 回踩快线（最低价触及、收盘在上方）
+        # 4. RSI 过滤  5. ADX 趋势强度  [6. MACD 柱 > 0、量比 > 0.8、震荡过滤]
+        entry = self._signal_kernel.entry(
+            dataframe,
+            fast_col="ema_fast",
+            slope_col="slope",
+            slope_threshold=profile.slope_threshold,
+            pullback_tolerance=profile.pullback_tolerance,
+            rsi_oversold=profile.rsi_oversold,
+            rsi_overbought=profile.rsi_overbought,
+            min_adx=profile.min_adx,
+            advanced=use_advanced,
+            trend_filter=use_advanced and profile.use_trend_filter,
+            filter_cols=self._entry_filters(dataframe),
+        )
+        return entry, self._entry_tag(profile)
+
+    @staticmethod
+    def _entry_tag(profile: AssetProfile) -> str:
+        """高级过滤 → full_signal；仅基础条件（与 MntTrendHoldV3 一致）→ basic_signal"""
+        return "full_signal" if profile.use_advanced_filter else "basic_signal"
+
+    @staticmethod
+    def _entry_filters(dataframe: DataFrame) -> list:
+        """本 dataframe 中存在的附加入场过滤列"""
+        return [column for column in ENTRY_FILTER_COLUMNS if column in dataframe.columns]
+
     # ============================================================
     # 出场信号
     # ============================================================
@@ -561,30 +887,117 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         注意: 主要出场靠 trailing_stop_loss，trend_break 是辅助
         """
         pair = metadata.get("pair", "")
-        config = self.get_asset_config(pair)
+        profile = self.get_profile(pair)
+        live = self._use_streaming()
+        trend_break = None
+        if live:
+            trend_break = self._pair_triggers(pair).exit_signal(dataframe, profile)
+        if trend_break is None:
+            memo = self._memo_signals(pair, dataframe, profile, consume=True)
+            trend_break = memo[1] if memo is not None else self._exit_signal(dataframe, profile)
+        if trend_break is not None:
+            write_signal(dataframe, trend_break, "exit_long", "exit_tag", "trend_break",
+                         categorical=self.use_compact_dataframe)
+        
+        if live and len(dataframe):
+            self._prepare_triggers(pair, dataframe, profile, trend_break)
+        return dataframe
+
+    def _pair_triggers(self, pair: str) -> PairTriggers:
+        triggers = self._triggers.get(pair)
+        if triggers is None:
+            triggers = self._triggers[pair] = PairTriggers()
+        return triggers
+
+    def _prepare_triggers(self, pair: str, dataframe: DataFrame, profile: AssetProfile,
+                          trend_break: Optional[np.ndarray]) -> None:
+        """记下本次信号，并由流式指标状态算好下一根K线的入场 / 出场价带"""
+        triggers = self._pair_triggers(pair)
+        triggers.record(dataframe, dataframe["enter_long"].to_numpy() == 1, trend_break)
+        last_date = dataframe["date"].iat[-1].value
+        stream = self._streaming_engine.stream(pair)
+        if stream is not None and stream.last_date != last_date:
+            stream = None
+        next_date = last_date + timeframe_to_minutes(self.timeframe) * 60_000_000_000
+        triggers.prepare(stream, next_date, profile, self._entry_filters(dataframe))
+
+    def _exit_signal(self, dataframe: DataFrame, profile: AssetProfile) -> Optional[np.ndarray]:
+        """返回 trend_break 掩码；未启用趋势破坏出场时返回 None"""
+        self._select_ema_grid(dataframe, profile)
         
         # 检查是否启用趋势破坏出场
-        use_trend_exit = config.get("use_trend_exit", True)
-        trend_exit_vol_ratio = config.get("trend_exit_volatility_ratio", 0.0)
-        
-        if use_trend_exit:
-            # 波动率条件（如果设置了阈值）
-            if trend_exit_vol_ratio > 0:
-                volatility_ok = dataframe["volatility_ratio"] >= trend_exit_vol_ratio
-            else:
-                volatility_ok = True
-            
-            # 趋势破坏条件: 连续两根K线收于出场 EMA 下方
-            trend_break = (
-                (dataframe["close"] < dataframe["ema_exit"]) &
-                (dataframe["close"].shift(1) < dataframe["ema_exit"].shift(1)) &
-                volatility_ok
-            )
-            
-            dataframe.loc[trend_break, "exit_long"] = 1
-            dataframe.loc[trend_break, "exit_tag"] = "trend_break"
+        if not profile.use_trend_exit:
+            return None
         
-        return dataframe
+        # 趋势破坏条件: 连续两根K线收于出场 EMA 下方
+        # 波动率条件（如果设置了阈值）
+        return self._signal_kernel.trend_break(
+            dataframe,
+            exit_col="ema_exit",
+            volatility_ratio=profile.trend_exit_volatility_ratio,
+        )
+
+    # ============================================================
+    # 信号指纹（超参优化中跳过信号相同的 epoch，见 tools/hyperopt_memo.py）
+    # ============================================================
+    def signal_fingerprint(self, processed: Dict[str, DataFrame]) -> str:
+        """
+        本 epoch 的信号指纹
+        
+        由各交易对的稀疏入场/出场信号，加上不体现在信号里的出场参数
+        （阶梯止盈、止损、追踪止盈、ROI、出场开关）和影响回测的完整配置共同决定。
+        指纹相同则回测结果相同。
+        
+        算出的信号留给随后的回测使用（缓存未命中时不再算第二遍）。
+        """
+        fingerprint = SignalFingerprint(
+            type(self).__name__,
+            config_digest(self.config),
+        )
+        for pair in sorted(processed):
+            dataframe = processed[pair]
+            profile = self.get_profile(pair)
+            entry, tag = self._entry_signal(dataframe, profile)
+            fingerprint.add_signal(pair, "enter_long", entry, tag)
+            # 信号内核的缓冲区会被下一个交易对复用，这里复制
+            entry = entry.copy()
+            trend_break = self._exit_signal(dataframe, profile)
+            fingerprint.add_signal(pair, "exit_long", trend_break, "trend_break")
+            if trend_break is not None:
+                trend_break = trend_break.copy()
+            self._fingerprint_signals[pair] = (dataframe, profile, entry, trend_break)
+        
+        fingerprint.add_params(
+            (name, getattr(self, name).value)
+            for params in ASSET_PARAMETERS.values()
+            for name, parameter in params.parameters.items()
+            if parameter.space != "buy"
+        )
+        fingerprint.add_params([
+            ("stoploss", self.stoploss),
+            ("trailing_stop", self.trailing_stop),
+            ("trailing_stop_positive", self.trailing_stop_positive),
+            ("trailing_stop_positive_offset", self.trailing_stop_positive_offset),
+            ("trailing_only_offset_is_reached", self.trailing_only_offset_is_reached),
+            ("minimal_roi", tuple(sorted(self.minimal_roi.items()))),
+            ("use_custom_stoploss", self.use_custom_stoploss),
+            ("use_exit_signal", self.use_exit_signal),
+            ("exit_profit_only", self.exit_profit_only),
+            ("ignore_roi_if_entry_signal", self.ignore_roi_if_entry_signal),
+            ("position_adjustment_enable", self.position_adjustment_enable),
+            ("max_open_trades", self.max_open_trades),
+        ])
+        return fingerprint.hexdigest()
+
+    def _memo_signals(self, pair: str, dataframe: DataFrame, profile: AssetProfile,
+                      consume: bool = False) -> Optional[tuple]:
+        """signal_fingerprint 刚为同一 dataframe、同一档案算好的 (入场, 出场)；没有则返回 None"""
+        memo = self._fingerprint_signals.get(pair) if self._fingerprint_signals else None
+        if memo is None or memo[0] is not dataframe or memo[1] is not profile:
+            return None
+        if consume:
+            del self._fingerprint_signals[pair]
+        return memo[2], memo[3]
 
     # ============================================================
     # 自定义止损（核心风控逻辑）
@@ -609,18 +1022,12 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         阶梯止盈示例:
         - 盈利 25% 时，止损设为 -7%（锁定 18% 利润）
         - 盈利 15% 时，止损设为 -5%（锁定 10% 利润）
-        """
-        config = self.get_asset_config(pair)
-        
-        # 阶梯止盈: 根据当前利润调整止损位
-        for profit_level, lock_level in config["profit_lock_levels"]:
-            if current_profit >= profit_level:
-                # 计算新的止损位（负数）
-                # 例: 当前盈利 25%，锁定 18%，则止损为 -(0.25 - 0.18) = -0.07
-                return -(current_profit - lock_level)
         
+        阶梯已预编译为升序阈值数组，这里只做一次二分查找。
+        """
+        # 例: 当前盈利 25%，锁定 18%，则止损为 -(0.25 - 0.18) = -0.07
         # 未触发阶梯止盈，使用固定止损
-        return config["stoploss"]
+        return self._active_profile(pair).ladder.stoploss_at(current_profit)
 
     # ============================================================
     # 自定义出场（补充逻辑）
@@ -645,15 +1052,31 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         - 时间止损
         - 资金管理出场
         """
-        if trade.open_date_utc:
-            holding_hours = (current_time - trade.open_date_utc).total_seconds() / 3600
-            
-            # 持仓超过 7 天且亏损超过 5%，强制出场
-            if holding_hours > 168 and current_profit < -0.05:
+        # 持仓超过 7 天且亏损超过 5%，强制出场
+        # 先比较利润（最便宜），再与预先算好的持仓时长上限比较
+        if current_profit < LONG_HOLDING_MAX_LOSS and trade.open_date_utc:
+            if current_time - trade.open_date_utc > LONG_HOLDING_WINDOW:
                 return "long_holding_loss"
         
         return None
 
+    # ============================================================
+    # 出场规则（供 common.simulator 快速仿真使用）
+    # ============================================================
+    def exit_rules(self, pair: str) -> ExitRules:
+        """
+        该交易对的出场参数
+        
+        与 custom_stoploss / custom_exit / 追踪止盈 / ROI 一一对应，
+        修改上述回调时需同步修改这里。
+        """
+        return ExitRules.from_strategy(
+            self,
+            self._active_profile(pair).ladder,
+            holding_hours=LONG_HOLDING_HOURS,
+            holding_max_loss=LONG_HOLDING_MAX_LOSS,
+        )
+
     # ============================================================
     # 杠杆设置（现货固定为 1x）
     # ============================================================
@@ -689,13 +1112,22 @@ class AdaptiveInstitutionalStrategy(IStrategy):
         """
         入场确认
         
-        可在此实现额外的风控检查:
+        组合风控（各项默认关闭，见类属性）:
         - 最大持仓数量限制
-        - 单日入场次数限制
-        - 相关性检查
+        - 单日入场次数限制（滚动 24 小时）
+        - 与已持仓交易对的收益率相关性检查
         
-        目前: 允许所有通过信号的入场
+        状态在 populate_indicators / bot_loop_start 中增量维护，这里只做常数次查找。
         """
+        if self._risk_gate is None:
+            return True
+        now = pd.Timestamp(current_time).value
+        reason = self._risk_gate.check(pair, now)
+        if reason is not None:
+            if self._is_live():
+                logger.info("组合风控拒绝 %s 入场: %s", pair, reason)
+            return False
+        self._risk_gate.record(pair, now)
         return True
 
     # ============================================================
@@ -703,9 +1135,15 @@ class AdaptiveInstitutionalStrategy(IStrategy):
     # ============================================================
     def informative_pairs(self):
         """
-        信息对（可用于跨品种分析）
-        
-        例如: 使用 BTC 作为大盘指标
-        目前: 不使用
+        信息对: 开启大盘过滤时为 market_filter_pair 的主周期与各 EMA 周期
         """
-        return []
+        if not self.market_filter_pair:
+            return []
+        timeframes = dict.fromkeys([self.timeframe, *self.market_filter_emas])
+        return [(self.market_filter_pair, timeframe) for timeframe in timeframes]
+
+
+# 把各资产的超参注册为策略类属性，freqtrade 据此发现参数空间
+for _asset_params in ASSET_PARAMETERS.values():
+    for _name, _parameter in _asset_params.parameters.items():
+        setattr(AdaptiveInstitutionalStrategy, _name, _parameter)
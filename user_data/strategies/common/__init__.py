@@ -0,0 +1,6 @@
+"""
+策略公共组件
+
+供 user_data/strategies 下各策略共享的指标计算、缓存与风控工具。
+本目录不包含 IStrategy 子类，freqtrade 加载策略时会直接跳过。
+"""
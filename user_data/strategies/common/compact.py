@@ -0,0 +1,61 @@
+"""
+内存精简的 dataframe 模式
+
+长区间、多交易对的回测 / 超参优化中，每个交易对的 dataframe 带着二十多列
+float64 指标（超参优化时还有整张 EMA 网格），worker 进程内存很快被占满。
+精简模式（策略的 use_compact_dataframe）下:
+
+- 指标列存为 float32（OHLCV 保持 float64，出场价格计算不受影响）
+- 趋势布尔列保持 bool（1 字节），不会因 NaN 处理被提升为 object / float
+- enter_tag / exit_tag 存为 categorical（每行 1 字节编码），不再是 object 字符串
+- 只用于派生其他列的中间列（bb_width_sma / adx_sma / volume_sma）用完即删
+
+float32 约 7 位有效数字，指标与价格比较时在极少数临界K线上可能与 float64
+结果不同，因此为可选模式。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+# 保持原精度的列（价格 / 成交量 / 信号）
+KEEP_PRECISION = ("open", "high", "low", "close", "volume")
+
+# 只用于派生 is_trending / volume_ratio 的中间列
+INTERMEDIATE_COLUMNS = ("bb_width_sma", "adx_sma", "volume_sma")
+
+FLAG_COLUMNS = ("uptrend", "adx_rising", "is_trending", "market_ok", "htf_ok")
+
+
+def compact_indicators(dataframe: DataFrame,
+                       drop: Sequence[str] = INTERMEDIATE_COLUMNS,
+                       keep: Iterable[str] = KEEP_PRECISION) -> DataFrame:
+    """指标列转 float32、布尔列转 bool，并删除中间列（返回新的 dataframe）"""
+    keep = set(keep)
+    dataframe = dataframe.drop(columns=[c for c in drop if c in dataframe.columns])
+    dtypes = {}
+    for column, dtype in dataframe.dtypes.items():
+        if column in keep:
+            continue
+        if column in FLAG_COLUMNS and dtype != np.bool_:
+            dtypes[column] = np.bool_
+        elif dtype == np.float64:
+            dtypes[column] = np.float32
+    if not dtypes:
+        return dataframe
+    for column in dtypes:
+        if dtypes[column] is np.bool_:
+            dataframe[column] = dataframe[column].fillna(False)
+    return dataframe.astype(dtypes, copy=False)
+
+
+def categorical_tags(mask: np.ndarray, tag: Optional[str]) -> pd.Categorical:
+    """信号位置为 tag、其余为缺失值的 categorical（不生成 object 数组）"""
+    if tag is None:
+        return pd.Categorical.from_codes(np.full(len(mask), -1, dtype=np.int8), categories=[])
+    return pd.Categorical.from_codes(np.where(mask, 0, -1).astype(np.int8), categories=[tag])
@@ -0,0 +1,59 @@
+"""
+预编译出场规则
+
+custom_stoploss / custom_exit 在回测中对每笔持仓的每根K线都会被调用一次。
+这里把规则预先编译好，让回调只剩数组查找与一次比较：
+
+- 阶梯止盈: profit_lock_levels 编译为升序的阈值 / 锁定数组，
+  二分查找当前利润所在的档位（向量版本用 np.searchsorted）
+- 长期持仓亏损: 持仓时长上限预先算成 timedelta，回调中直接比较
+  current_time - open_date，不再换算成小时数，也不按交易保存任何状态
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import timedelta
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+# 持仓超过 7 天且亏损超过 5%，强制出场
+LONG_HOLDING_HOURS = 168
+LONG_HOLDING_MAX_LOSS = -0.05
+LONG_HOLDING_WINDOW = timedelta(hours=LONG_HOLDING_HOURS)
+
+
+class ProfitLockLadder:
+    """
+    阶梯止盈
+
+    与原逻辑等价: 在利润 >= 阈值的档位中取阈值最高的一档，
+    止损设为 -(当前利润 - 锁定利润)；一档都未触发时返回固定止损。
+    """
+
+    __slots__ = ("thresholds", "locks", "stoploss", "_thresholds", "_locks")
+
+    def __init__(self, levels: Sequence[Tuple[float, float]], stoploss: float):
+        ordered = sorted(levels)
+        self.thresholds = np.asarray([t for t, _ in ordered], dtype=np.float64)
+        self.locks = np.asarray([lock for _, lock in ordered], dtype=np.float64)
+        self.stoploss = stoploss
+        # 标量路径用 tuple + bisect，避免 NumPy 单元素调用的开销
+        self._thresholds = tuple(self.thresholds.tolist())
+        self._locks = tuple(self.locks.tolist())
+
+    def stoploss_at(self, profit: float) -> float:
+        i = bisect_right(self._thresholds, profit)
+        if i == 0:
+            return self.stoploss
+        return -(profit - self._locks[i - 1])
+
+    def stoploss_array(self, profits: np.ndarray) -> np.ndarray:
+        """向量版本（回测仿真 / 批量评估使用）"""
+        if len(self.locks) == 0:
+            return np.full(np.shape(profits), self.stoploss)
+        idx = np.searchsorted(self.thresholds, profits, side="right")
+        locks = self.locks[np.maximum(idx - 1, 0)]
+        return np.where(idx == 0, self.stoploss, -(profits - locks))
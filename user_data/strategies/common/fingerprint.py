@@ -0,0 +1,201 @@
+"""
+信号指纹记忆化（超参优化）
+
+很多参数组合（rsi_oversold / slope_threshold / min_adx 的微小变化）
+产生完全相同的 enter_long / exit_long。此时完整回测与损失函数的结果
+必然相同，没有必要再跑一遍。
+
+做法:
+- 策略提供 signal_fingerprint(processed): 对每个交易对计算稀疏信号（触发位置的下标），
+  与出场相关参数（阶梯止盈、止损、追踪止盈、ROI）以及影响回测的完整配置一起哈希成指纹
+- 记忆化由显式的运行器完成（user_data/tools/hyperopt_memo.py），它持有超参优化的
+  Backtesting 实例；策略本身不修改 freqtrade
+- 缓存存放在 user_data/hyperopt_results 下的 sqlite 文件中，多个超参优化 worker 进程共享；
+  各进程的命中 / 未命中计数每个 epoch 写一次（未命中随回测结果一起写入，命中时单独写入，
+  不依赖 worker 退出），运行结束时汇总写入日志
+- 缓存只在一次超参优化运行内有效: 指纹不包含策略代码、freqtrade 版本与K线数据，
+  每次运行开始时清空，修改出场逻辑 / 升级 / 重新下载数据后不会复用旧结果
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# 不影响回测结果的配置项（输出、日志、超参优化自身的设置 ...）；其余配置全部参与指纹
+NON_BACKTEST_CONFIG_KEYS = frozenset({
+    "config_files", "original_config", "user_data_dir", "datadir", "strategy_path",
+    "recursive_strategy_search", "hyperopt_path", "logfile", "verbosity", "print_all",
+    "print_colorized", "print_json", "export", "exportfilename", "hyperoptexportfilename",
+    "epochs", "spaces", "hyperopt_jobs", "hyperopt_random_state", "hyperopt_min_trades",
+    "hyperopt_loss", "hyperopt_show_index", "disableparamexport", "analyze_per_epoch",
+    "effort", "early_stop", "api_server", "telegram", "webhook", "db_url", "dry_run",
+})
+
+class _ProcessState:
+    """一个进程对一个缓存文件的连接与命中计数"""
+
+    __slots__ = ("conn", "hits", "misses", "written")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+
+    @property
+    def pending(self) -> int:
+        return self.hits + self.misses - self.written
+
+
+# (文件, 进程号) → 状态；同一 worker 会多次收到 pickle 出的存储副本，
+# 连接与计数放在模块级别才能在副本之间共享、不被后来的副本覆盖
+_STATES: Dict[Tuple[str, int], _ProcessState] = {}
+
+
+class SignalFingerprint:
+    """增量构造指纹（blake2b）"""
+
+    def __init__(self, *context: Any):
+        self._hash = hashlib.blake2b(digest_size=20)
+        self._hash.update(repr(context).encode())
+
+    def add_signal(self, pair: str, name: str, mask: Optional[np.ndarray],
+                   tag: Optional[str] = None) -> None:
+        self._hash.update(f"|{pair}|{name}|{tag}|".encode())
+        if mask is not None:
+            self._hash.update(np.flatnonzero(mask).astype(np.int64).tobytes())
+
+    def add_params(self, params: Iterable[Tuple[str, Any]]) -> None:
+        self._hash.update(repr(sorted(params)).encode())
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    """
+    把影响回测结果的配置压成短摘要
+
+    除 NON_BACKTEST_CONFIG_KEYS 外的全部配置都参与（资金、手续费、时间范围、protections、
+    order_types / unfilledtimeout、position_adjustment_enable ...），未知配置项按影响处理。
+    """
+    relevant = {key: value for key, value in config.items() if key not in NON_BACKTEST_CONFIG_KEYS}
+    text = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=12).hexdigest()
+
+
+class FingerprintStore:
+    """
+    指纹 → 回测结果 的共享缓存（sqlite，多进程安全）
+
+    每个进程一行命中 / 未命中计数: 命中时在 get() 中写入，未命中时随 put() 的结果一起写入。
+    joblib / loky 的 worker 退出时不执行 atexit，计数不能留到退出时再写。
+
+    Args:
+        path: sqlite 文件路径
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _state(self) -> _ProcessState:
+        key = (str(self.path), os.getpid())
+        state = _STATES.get(key)
+        if state is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS process_stats "
+                "(pid INTEGER PRIMARY KEY, hits INTEGER, misses INTEGER)"
+            )
+            conn.commit()
+            state = _STATES[key] = _ProcessState(conn)
+        return state
+
+    @staticmethod
+    def _write_stats(state: _ProcessState) -> None:
+        state.conn.execute(
+            "INSERT OR REPLACE INTO process_stats (pid, hits, misses) VALUES (?, ?, ?)",
+            (os.getpid(), state.hits, state.misses),
+        )
+        state.written = state.hits + state.misses
+
+    def get(self, key: str) -> Optional[Any]:
+        state = self._state()
+        row = state.conn.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            # 计数随随后 put() 的结果一起写入
+            state.misses += 1
+            return None
+        state.hits += 1
+        self._write_stats(state)
+        state.conn.commit()
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        state = self._state()
+        state.conn.execute(
+            "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+        self._write_stats(state)
+        state.conn.commit()
+
+    def flush(self) -> None:
+        """把本进程尚未写入的计数写回（未命中后回测失败、没有 put 时）"""
+        state = self._state()
+        if state.pending:
+            self._write_stats(state)
+            state.conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """所有进程的命中 / 未命中合计"""
+        self.flush()
+        hits, misses = self._state().conn.execute(
+            "SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0) FROM process_stats"
+        ).fetchone()
+        return {"hits": hits, "misses": misses}
+
+    def clear(self) -> None:
+        """清空回测结果与统计"""
+        state = self._state()
+        state.conn.execute("DELETE FROM results")
+        state.conn.execute("DELETE FROM process_stats")
+        state.conn.commit()
+        state.hits = state.misses = state.written = 0
+
+
+def log_hit_rate(store: FingerprintStore) -> None:
+    stats = store.stats()
+    hits, misses = stats["hits"], stats["misses"]
+    total = hits + misses
+    if total:
+        logger.info(
+            "信号指纹缓存: 命中 %d / %d 个 epoch (%.1f%%)，跳过的回测均复用了已有结果",
+            hits, total, 100.0 * hits / total,
+        )
+
+
+def register_report(store: FingerprintStore) -> None:
+    """主进程中调用：清空上次运行留下的结果与统计，并在退出时输出命中率"""
+    store.clear()
+    atexit.register(log_hit_rate, store)
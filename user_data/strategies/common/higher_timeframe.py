@@ -0,0 +1,295 @@
+"""
+高周期确认（由主周期K线重采样）
+
+两个策略都只跑 1h。4h / 1d 的趋势确认不另外请求交易所、不另存数据文件，
+而是把已经加载的 1h K线按时间分桶合成高周期K线:
+
+- 高周期K线 = 同一桶内 1h K线的 (最高, 最低, 末收)，分桶与交易所一致
+  （4h 从 00:00 UTC 起每 4 小时一根，1d 按 UTC 自然日）
+- 每个周期的确认: 高周期收盘 > EMA(fast) > EMA(slow) [& ADX > min_adx]
+- 主周期K线只能看到已收盘的高周期K线: 桶的最后一根 1h K线收盘时该桶收盘
+  （中间缺K线时，下一个桶的第一根K线到来时收盘），无前视
+
+两种计算方式结果一致:
+
+- 回测 / 超参优化: 向量化分桶（np.maximum.reduceat 等）+ talib 整段计算
+- 实盘 / 模拟盘: HigherTimeframeEngine 为每个交易对保存递推状态，
+  每根新 1h K线只并入当前的高周期K线；该K线收盘时才推进一次 EMA / ADX
+  （common.streaming 的递推状态，与 talib 逐步对应）
+
+两种方式最后都得到 (高周期收盘时间, 指标值) 表，再按收盘时间一次二分查找
+映射回主周期的每根K线。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+import talib
+
+from freqtrade.exchange import timeframe_to_minutes
+
+from common.streaming import NAN, AdxState, EmaState
+from common.warmup import ema_warmup, wilder_warmup
+
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+# 每根高周期K线输出的值
+BAR_VALUES = ("ema_fast", "ema_slow", "adx", "ok")
+
+
+class HigherTimeframeSpec:
+    """
+    一个高周期的确认条件
+
+    Args:
+        timeframe: 高周期，需为主周期的整数倍，如 "4h" / "1d"
+        ema_fast / ema_slow: 高周期 EMA 长度
+        min_adx: 高周期 ADX 下限（None 表示不检查 ADX）
+        adx_period: 高周期 ADX 长度
+    """
+
+    __slots__ = ("timeframe", "ema_fast", "ema_slow", "min_adx", "adx_period", "minutes")
+
+    def __init__(self, timeframe: str, ema_fast: int, ema_slow: int,
+                 min_adx: Optional[float] = None, adx_period: int = 14):
+        self.timeframe = timeframe
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.min_adx = min_adx
+        self.adx_period = adx_period
+        self.minutes = timeframe_to_minutes(timeframe)
+
+    def __repr__(self) -> str:
+        return (f"HigherTimeframeSpec({self.timeframe!r}, {self.ema_fast}, {self.ema_slow}, "
+                f"min_adx={self.min_adx}, adx_period={self.adx_period})")
+
+    def column(self, value: str) -> str:
+        return f"htf_{self.timeframe}_{value}"
+
+    def needed_candles(self, base_timeframe: str, tolerance: Optional[float] = None) -> int:
+        """
+        高周期指标所需的主周期K线数
+
+        tolerance 为 None 时按指标首次有值计算；否则按 common.warmup 的收敛容差估算
+        （策略的 pair_startup_candles 使用后者）。
+        """
+        if tolerance is None:
+            bars = self.ema_slow
+            if self.min_adx is not None:
+                bars = max(bars, 2 * self.adx_period)
+        else:
+            bars = ema_warmup(self.ema_slow, tolerance)
+            if self.min_adx is not None:
+                bars = max(bars, 2 * wilder_warmup(self.adx_period, tolerance))
+        return bars * self.minutes // timeframe_to_minutes(base_timeframe)
+
+
+# 4h 趋势与强度 + 日线方向
+# 日线 EMA10 约需 240 根 1h K线，ADX 需要 28 天，超出 startup_candle_count，日线不检查 ADX
+DEFAULT_CONFIRMATION = (
+    HigherTimeframeSpec("4h", 20, 50, min_adx=20.0),
+    HigherTimeframeSpec("1d", 5, 10),
+)
+
+
+def _confirm(spec: HigherTimeframeSpec, close, ema_fast, ema_slow, adx):
+    """收盘 > 快线 > 慢线 [& ADX > 下限]（NaN 比较为 False）"""
+    ok = (close > ema_fast) & (ema_fast > ema_slow)
+    if spec.min_adx is not None:
+        ok = ok & (adx > spec.min_adx)
+    return ok
+
+
+def _dates_ns(dataframe: DataFrame) -> np.ndarray:
+    return dataframe["date"].values.astype("datetime64[ns]").view(np.int64)
+
+
+# ============================================================
+# 向量化（回测 / 超参优化）
+# ============================================================
+def resample_bars(dates: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                  minutes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    主周期K线按 minutes 分桶合成高周期K线
+
+    Returns:
+        (各桶收盘时间 ns, 最高, 最低, 收盘)
+    """
+    width = minutes * _NS_PER_MINUTE
+    if len(dates) == 0:
+        return dates, high, low, close
+    buckets = dates // width
+    starts = np.flatnonzero(np.diff(buckets, prepend=buckets[:1] - 1))
+    ends = (buckets[starts] + 1) * width
+    last = np.append(starts[1:], len(dates)) - 1
+    return ends, np.maximum.reduceat(high, starts), np.minimum.reduceat(low, starts), close[last]
+
+
+def bar_values(spec: HigherTimeframeSpec, high: np.ndarray, low: np.ndarray,
+               close: np.ndarray) -> np.ndarray:
+    """高周期K线 → 每根的 BAR_VALUES（talib 整段计算）"""
+    ema_fast = talib.EMA(close, timeperiod=spec.ema_fast)
+    ema_slow = talib.EMA(close, timeperiod=spec.ema_slow)
+    if spec.min_adx is not None:
+        adx = talib.ADX(high, low, close, timeperiod=spec.adx_period)
+    else:
+        adx = np.full(len(close), NAN)
+    ok = _confirm(spec, close, ema_fast, ema_slow, adx)
+    return np.column_stack([ema_fast, ema_slow, adx, ok.astype(np.float64)])
+
+
+def compute_bars(dataframe: DataFrame, spec: HigherTimeframeSpec) -> Tuple[np.ndarray, np.ndarray]:
+    """(高周期收盘时间 ns, BAR_VALUES)；最后一根未收盘的高周期K线不会被引用"""
+    ends, high, low, close = resample_bars(
+        _dates_ns(dataframe),
+        dataframe["high"].to_numpy(dtype=np.float64),
+        dataframe["low"].to_numpy(dtype=np.float64),
+        dataframe["close"].to_numpy(dtype=np.float64),
+        spec.minutes,
+    )
+    return ends, bar_values(spec, high, low, close)
+
+
+def map_closed(dates: np.ndarray, base_minutes: int, ends: np.ndarray,
+               values: np.ndarray) -> np.ndarray:
+    """主周期每根K线收盘时最近一根已收盘高周期K线的值（没有则为 NaN）"""
+    index = np.searchsorted(ends, dates + base_minutes * _NS_PER_MINUTE, side="right") - 1
+    mapped = values[np.maximum(index, 0)]
+    mapped[index < 0] = NAN
+    return mapped
+
+
+def write_columns(dataframe: DataFrame, specs: Sequence[HigherTimeframeSpec],
+                  mapped: Sequence[np.ndarray]) -> DataFrame:
+    """写入各周期的指标列与综合确认列 htf_ok"""
+    ok = np.ones(len(dataframe), dtype=np.bool_)
+    for spec, values in zip(specs, mapped):
+        for j, name in enumerate(BAR_VALUES[:-1]):
+            dataframe[spec.column(name)] = values[:, j]
+        ok &= values[:, -1] == 1.0
+    dataframe["htf_ok"] = ok
+    return dataframe
+
+
+def populate_confirmation(dataframe: DataFrame, base_timeframe: str,
+                          specs: Sequence[HigherTimeframeSpec]) -> DataFrame:
+    """回测 / 超参优化: 整段重采样并写入确认列"""
+    dates = _dates_ns(dataframe)
+    base = timeframe_to_minutes(base_timeframe)
+    mapped = [map_closed(dates, base, *compute_bars(dataframe, spec)) for spec in specs]
+    return write_columns(dataframe, specs, mapped)
+
+
+# ============================================================
+# 增量（实盘 / 模拟盘）
+# ============================================================
+class HigherTimeframeStream:
+    """
+    单个交易对、单个高周期的递推状态
+
+    当前桶只累计 最高 / 最低 / 收盘；桶收盘时推进 EMA / ADX 并记下该根的值。
+    """
+
+    def __init__(self, spec: HigherTimeframeSpec, base_minutes: int):
+        self.spec = spec
+        self.base_ns = base_minutes * _NS_PER_MINUTE
+        self.width = spec.minutes * _NS_PER_MINUTE
+        self.ema_fast = EmaState(spec.ema_fast)
+        self.ema_slow = EmaState(spec.ema_slow)
+        self.adx = AdxState(spec.adx_period) if spec.min_adx is not None else None
+        self.bucket: Optional[int] = None
+        self.high = NAN
+        self.low = NAN
+        self.close = NAN
+        self.last_date: Optional[int] = None
+        # 已收盘的高周期K线（收盘时间, BAR_VALUES）
+        self.ends: List[int] = []
+        self.values: List[Tuple[float, ...]] = []
+
+    def _commit(self) -> None:
+        close = self.close
+        ema_fast = self.ema_fast.update(close)
+        ema_slow = self.ema_slow.update(close)
+        adx = self.adx.update(self.high, self.low, close) if self.adx is not None else NAN
+        ok = _confirm(self.spec, close, ema_fast, ema_slow, adx)
+        self.ends.append((self.bucket + 1) * self.width)
+        self.values.append((ema_fast, ema_slow, adx, float(ok)))
+        self.bucket = None
+
+    def update(self, date: int, high: float, low: float, close: float) -> None:
+        """推入一根主周期K线"""
+        bucket = date // self.width
+        if self.bucket is not None and bucket != self.bucket:
+            # 上一个桶缺了最后几根K线，新桶的K线到来时收盘
+            self._commit()
+        if self.bucket is None:
+            self.bucket, self.high, self.low = bucket, high, low
+        else:
+            self.high = max(self.high, high)
+            self.low = min(self.low, low)
+        self.close = close
+        self.last_date = date
+        if date + self.base_ns >= (bucket + 1) * self.width:
+            self._commit()
+
+    def trim(self, keep: int) -> None:
+        """只保留最近 keep 根已收盘的高周期K线"""
+        if len(self.ends) > 2 * keep:
+            del self.ends[:-keep]
+            del self.values[:-keep]
+
+    def mapped(self, dates: np.ndarray) -> np.ndarray:
+        values = np.array(self.values, dtype=np.float64).reshape(-1, len(BAR_VALUES))
+        ends = np.array(self.ends, dtype=np.int64)
+        if len(ends) == 0:
+            return np.full((len(dates), len(BAR_VALUES)), NAN)
+        return map_closed(dates, self.base_ns // _NS_PER_MINUTE, ends, values)
+
+
+class HigherTimeframeEngine:
+    """
+    实盘 / 模拟盘: 按交易对维护各高周期的 HigherTimeframeStream
+
+    每次只推入比上次更新的K线；K线断档或确认条件变化时用整段数据重建。
+    重启后由第一次传入的K线重建（高周期K线数少，不写快照）。
+    """
+
+    def __init__(self, base_timeframe: str, specs: Sequence[HigherTimeframeSpec]):
+        self.base_minutes = timeframe_to_minutes(base_timeframe)
+        self.specs = tuple(specs)
+        self._streams: Dict[str, List[HigherTimeframeStream]] = {}
+
+    def reset(self, pair: Optional[str] = None) -> None:
+        if pair is None:
+            self._streams.clear()
+        else:
+            self._streams.pop(pair, None)
+
+    def populate(self, pair: str, dataframe: DataFrame) -> DataFrame:
+        """把确认列写入 dataframe（原地修改并返回）"""
+        dates = _dates_ns(dataframe)
+        streams = self._streams.get(pair)
+        start = 0
+        if streams is not None and streams[0].last_date is not None:
+            pos = int(np.searchsorted(dates, streams[0].last_date))
+            if pos < len(dates) and dates[pos] == streams[0].last_date:
+                start = pos + 1
+            else:
+                streams = None
+        if streams is None:
+            streams = [HigherTimeframeStream(spec, self.base_minutes) for spec in self.specs]
+            self._streams[pair] = streams
+
+        high = dataframe["high"].to_numpy(dtype=np.float64)
+        low = dataframe["low"].to_numpy(dtype=np.float64)
+        close = dataframe["close"].to_numpy(dtype=np.float64)
+        for stream in streams:
+            for i in range(start, len(dates)):
+                stream.update(int(dates[i]), float(high[i]), float(low[i]), float(close[i]))
+            stream.trim(len(dates) * self.base_minutes // stream.spec.minutes + 2)
+        return write_columns(dataframe, self.specs, [stream.mapped(dates) for stream in streams])
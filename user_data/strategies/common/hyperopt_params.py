@@ -0,0 +1,167 @@
+"""
+按资产的超参优化空间
+
+为 ASSET_CONFIGS 中的每个资产生成 IntParameter / DecimalParameter，
+参数名带资产前缀（如 doge_ema_fast），默认值取自编译后的档案，
+因此不做超参优化时策略行为与 ASSET_CONFIGS 完全一致。
+
+超参优化时 populate_indicators 只调用一次，之后每个 epoch 只重跑
+populate_entry_trend / populate_exit_trend。为此指标层会预先计算
+搜索范围内所有 EMA 周期（ema_grid_{周期} 列，同一周期只算一次），
+每个 epoch 只需从网格中挑列并重算趋势布尔列，不再调用 talib。
+
+任意参数组合都要能通过 AssetProfile 的校验，各范围因此互不重叠:
+EMA 范围固定为 ema_fast < ema_slow < ema_trend；阶梯阈值按默认值上下浮动
+LADDER_SPAN，相邻两档浮动后会交叠时（阈值相差不到约 1.35 倍）在两档之间切开，
+锁定利润的上限低于本档阈值的下限（见 ladder_ranges）。
+
+入场用的 EMA 与过滤条件在 buy 空间，出场 EMA (ema_exit) 与阶梯止盈在 sell 空间。
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+from freqtrade.strategy import DecimalParameter, IntParameter
+
+from common.profiles import AssetProfile
+
+
+# EMA 搜索范围
+EMA_RANGES: Dict[str, Tuple[int, int]] = {
+    "ema_fast": (10, 30),
+    "ema_slow": (35, 70),
+    "ema_trend": (80, 150),
+    "ema_exit": (80, 320),
+}
+
+# 只影响出场信号的参数，归入 sell 空间
+SELL_KEYS = frozenset({"ema_exit"})
+
+# 阶梯阈值的搜索范围: 默认阈值上下浮动 15%
+LADDER_SPAN = 0.15
+
+
+def ema_grid_column(period: int) -> str:
+    return f"ema_grid_{period}"
+
+
+def ladder_ranges(levels: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """
+    各档阈值的搜索范围 (下限, 上限)，与 levels 同序（阈值从高到低）
+
+    每档在默认阈值上下浮动 LADDER_SPAN，下限至少比默认锁定利润高 0.001；
+    相邻两档交叠时在两档默认阈值的中点切开，上档下限比下档上限高 0.001。
+    按千分位（DecimalParameter 的 decimals=3）整数计算，避免浮点误差。
+    """
+    bounds = []
+    for threshold, lock in levels:
+        default = round(threshold * 1000)
+        low = max(round(threshold * (1 - LADDER_SPAN) * 1000), round(lock * 1000) + 1)
+        high = round(threshold * (1 + LADDER_SPAN) * 1000)
+        bounds.append([low, high, default, round(lock * 1000)])
+    for upper, lower in zip(bounds, bounds[1:]):
+        if upper[0] > lower[1]:
+            continue
+        # 切点不低于下档默认阈值、不低于上档锁定利润，且低于上档默认阈值
+        split = min(max((upper[2] + lower[2]) // 2, upper[3]), upper[2] - 1)
+        lower[1] = min(lower[1], split)
+        upper[0] = max(upper[0], split + 1)
+    return [(low / 1000, high / 1000) for low, high, _, _ in bounds]
+
+
+class AssetParameterSet:
+    """
+    单个资产的全部超参
+
+    Args:
+        profile: 该资产编译后的档案（提供默认值与阶梯档数）
+        optimize: 是否参与本轮超参优化（不参与时仅加载已保存的值）
+    """
+
+    def __init__(self, profile: AssetProfile, optimize: bool):
+        self.asset = profile.name
+        self.prefix = profile.name.lower()
+        self.levels = len(profile.profit_lock_levels)
+        self.parameters: Dict[str, Any] = {}
+        # 参数默认值（freqtrade 的参数对象不保留默认值）
+        self.defaults: Dict[str, Any] = {}
+
+        for key, (low, high) in EMA_RANGES.items():
+            default = getattr(profile, key)
+            self._add(key, IntParameter(
+                min(low, default), max(high, default), default=default,
+                space="sell" if key in SELL_KEYS else "buy", optimize=optimize,
+            ))
+
+        self._add("rsi_oversold", IntParameter(
+            25, 45, default=profile.rsi_oversold, space="buy", optimize=optimize))
+        self._add("rsi_overbought", IntParameter(
+            60, 85, default=profile.rsi_overbought, space="buy", optimize=optimize))
+        self._add("slope_threshold", DecimalParameter(
+            0.1, 1.0, default=profile.slope_threshold, decimals=2,
+            space="buy", optimize=optimize))
+        self._add("pullback_tolerance", DecimalParameter(
+            1.0, 1.04, default=profile.pullback_tolerance, decimals=3,
+            space="buy", optimize=optimize))
+        self._add("min_adx", IntParameter(
+            0, 35, default=profile.min_adx, space="buy", optimize=optimize))
+
+        # 阶梯止盈: 每档一个阈值 + 一个锁定利润（锁定上限低于该档阈值下限）
+        ranges = ladder_ranges(profile.profit_lock_levels)
+        for i, ((threshold, lock), (low, high)) in enumerate(
+                zip(profile.profit_lock_levels, ranges), start=1):
+            self._add(f"lock{i}_profit", DecimalParameter(
+                low, high, default=threshold, decimals=3, space="sell", optimize=optimize))
+            self._add(f"lock{i}_lock", DecimalParameter(
+                0.0, round(low - 0.001, 3), default=lock, decimals=3,
+                space="sell", optimize=optimize))
+
+    def _add(self, key: str, parameter: Any) -> None:
+        self.parameters[f"{self.prefix}_{key}"] = parameter
+        self.defaults[key] = parameter.value
+
+    def _value(self, strategy: Any, key: str) -> Any:
+        # 从策略实例读取，freqtrade 加载参数时可能替换参数对象
+        return getattr(strategy, f"{self.prefix}_{key}").value
+
+    def values(self, strategy: Any) -> Tuple:
+        return tuple(getattr(strategy, name).value for name in self.parameters)
+
+    def _tuned(self, strategy: Any, key: str) -> bool:
+        return self._value(strategy, key) != self.defaults[key]
+
+    def overrides(self, strategy: Any, tuned_only: bool = False) -> Dict[str, Any]:
+        """
+        当前参数值 → AssetProfile.replace 的覆盖项
+
+        tuned_only=True 时只返回偏离默认值（即加载了超参结果）的项，
+        用于档案来自热加载文件、参数默认值已不代表当前配置的情况。
+        """
+        overrides: Dict[str, Any] = {
+            key: self._value(strategy, key)
+            for key in (*EMA_RANGES, "rsi_oversold", "rsi_overbought",
+                        "slope_threshold", "pullback_tolerance", "min_adx")
+            if not tuned_only or self._tuned(strategy, key)
+        }
+        ladder_keys = [
+            key for i in range(1, self.levels + 1) for key in (f"lock{i}_profit", f"lock{i}_lock")
+        ]
+        if not tuned_only or any(self._tuned(strategy, key) for key in ladder_keys):
+            overrides["profit_lock_levels"] = tuple(
+                (self._value(strategy, f"lock{i}_profit"), self._value(strategy, f"lock{i}_lock"))
+                for i in range(1, self.levels + 1)
+            )
+        return overrides
+
+    def ema_grid(self, strategy: Any) -> List[int]:
+        """
+        需要预计算的 EMA 周期
+
+        超参优化中为各 EMA 参数搜索范围的并集；其他模式下 .range
+        只返回当前值，网格退化为普通的 4 条 EMA。
+        """
+        periods = set()
+        for key in EMA_RANGES:
+            periods.update(getattr(strategy, f"{self.prefix}_{key}").range)
+        return sorted(periods)
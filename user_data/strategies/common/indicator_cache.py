@@ -0,0 +1,184 @@
+"""
+指标缓存
+
+按 (交易对, 周期, 指标, 参数, K线窗口) 记忆化 talib 计算结果，
+同一K线窗口上无论多少列请求同一指标，都只计算一次。
+
+- 默认每个 CachedIndicators（一次 populate_indicators 调用）独立缓存，调用结束即释放:
+  ema_exit 与 ema_trend 周期相同时（MNT / DEFAULT_CONFIG）复用同一结果，
+  回测 / 超参优化不会在整个运行期间额外持有一份 float64 指标列
+- 同一进程中多个策略处理同样的K线时（tools/compare.py），在 shared_indicators()
+  作用域内共享一个有界缓存，EMA20/50/100、RSI14、ATR14 只算一次
+
+K线窗口由 (首根时间, 末根时间, 长度) 标识：EMA / Wilder 类指标的值依赖
+起始K线，仅用末根时间作为键会把不同窗口的结果混在一起。
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+
+import talib.abstract as ta
+
+
+CacheValue = Union[np.ndarray, Tuple[np.ndarray, ...]]
+
+
+def _nbytes(value: CacheValue) -> int:
+    if isinstance(value, tuple):
+        return sum(v.nbytes for v in value)
+    return value.nbytes
+
+
+def _freeze(value: CacheValue) -> CacheValue:
+    # 缓存中的数组设为只读，防止某个调用方原地修改污染其他调用方
+    for array in value if isinstance(value, tuple) else (value,):
+        array.setflags(write=False)
+    return value
+
+
+class IndicatorCache:
+    """
+    有界 LRU 指标缓存
+
+    Args:
+        maxsize: 最多缓存的条目数
+        max_bytes: 缓存数组占用的内存上限（回测时单列可达数 MB）
+    """
+
+    def __init__(self, maxsize: int = 512, max_bytes: int = 256 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._store: "OrderedDict[Hashable, CacheValue]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], CacheValue]) -> CacheValue:
+        value = self._store.get(key)
+        if value is not None:
+            self._store.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = _freeze(compute())
+        self._store[key] = value
+        self._bytes += _nbytes(value)
+        self._evict()
+        return value
+
+    def _evict(self) -> None:
+        while self._store and (len(self._store) > self.maxsize or self._bytes > self.max_bytes):
+            _, value = self._store.popitem(last=False)
+            self._bytes -= _nbytes(value)
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._store),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# shared_indicators() 作用域内生效的共享缓存；None 时每个访问器独立缓存
+_shared_cache: Optional[IndicatorCache] = None
+
+
+@contextmanager
+def shared_indicators(cache: Optional[IndicatorCache] = None) -> Iterator[IndicatorCache]:
+    """
+    作用域内新建的 CachedIndicators 共用一个缓存（默认新建），退出时恢复原状
+
+    用法:
+        with shared_indicators() as cache:
+            for strategy in strategies:
+                strategy.advise_all_indicators(candles)
+        print(cache.stats())
+    """
+    global _shared_cache
+    previous = _shared_cache
+    _shared_cache = cache if cache is not None else IndicatorCache()
+    try:
+        yield _shared_cache
+    finally:
+        _shared_cache = previous
+
+
+def frame_key(dataframe: DataFrame, pair: str, timeframe: str) -> Tuple:
+    """K线窗口标识: (交易对, 周期, 首根时间, 末根时间, 长度)"""
+    if len(dataframe) == 0:
+        return (pair, timeframe, None, None, 0)
+    dates = dataframe["date"]
+    return (pair, timeframe, dates.iloc[0].value, dates.iloc[-1].value, len(dataframe))
+
+
+class CachedIndicators:
+    """
+    绑定到某个 dataframe 的缓存指标访问器
+
+    用法:
+        ind = CachedIndicators(dataframe, metadata["pair"], self.timeframe)
+        dataframe["ema_fast"] = ind.ema(20)
+    """
+
+    def __init__(self, dataframe: DataFrame, pair: str, timeframe: str,
+                 cache: Optional[IndicatorCache] = None):
+        self.dataframe = dataframe
+        if cache is None:
+            cache = _shared_cache if _shared_cache is not None else IndicatorCache()
+        self.cache = cache
+        self._frame = frame_key(dataframe, pair, timeframe)
+
+    def _get(self, name: str, params: Tuple, compute: Callable[[], CacheValue]) -> CacheValue:
+        return self.cache.get_or_compute(self._frame + (name, params), compute)
+
+    def _series(self, fn, **kwargs) -> np.ndarray:
+        return np.asarray(fn(self.dataframe, **kwargs), dtype=np.float64)
+
+    def ema(self, period: int) -> np.ndarray:
+        return self._get("ema", (period,), lambda: self._series(ta.EMA, timeperiod=period))
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        return self._get("rsi", (period,), lambda: self._series(ta.RSI, timeperiod=period))
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self._get("atr", (period,), lambda: self._series(ta.ATR, timeperiod=period))
+
+    def adx(self, period: int = 14) -> np.ndarray:
+        return self._get("adx", (period,), lambda: self._series(ta.ADX, timeperiod=period))
+
+    def bbands(self, period: int = 20, nbdev: float = 2.0) -> Tuple[np.ndarray, ...]:
+        """返回 (upper, middle, lower)"""
+        def compute():
+            bb = ta.BBANDS(self.dataframe, timeperiod=period, nbdevup=nbdev, nbdevdn=nbdev)
+            return tuple(
+                np.asarray(bb[col], dtype=np.float64)
+                for col in ("upperband", "middleband", "lowerband")
+            )
+        return self._get("bbands", (period, nbdev), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, ...]:
+        """返回 (macd, signal, hist)"""
+        def compute():
+            macd = ta.MACD(self.dataframe, fastperiod=fast, slowperiod=slow, signalperiod=signal)
+            return tuple(
+                np.asarray(macd[col], dtype=np.float64)
+                for col in ("macd", "macdsignal", "macdhist")
+            )
+        return self._get("macd", (fast, slow, signal), compute)
@@ -0,0 +1,434 @@
+"""
+热路径计时（实盘 / 模拟盘）
+
+看不到每根K线的时间花在哪里: populate_indicators / populate_entry_trend /
+populate_exit_trend / custom_stoploss / custom_exit / confirm_trade_entry，
+以及其中各个指标各占多少；也看不到收盘后多久才把信号算完、把单下出去。
+
+打开后按 (阶段, 交易对) 记录延迟直方图:
+
+- 策略回调: 上述 6 个方法（包装策略实例的方法）
+- 指标: indicator:ema / rsi / atr / adx / bbands / macd / rolling_mean
+  （流式引擎的递推状态与 CachedIndicators 的 talib 计算，均按所属交易对记录）
+- 收盘后延迟: signals_after_close（populate_exit_trend 返回时距最后一根K线收盘）、
+  entry_after_close（confirm_trade_entry 被调用时距当前K线开盘，即距上一根收盘）
+
+运行时开关为 user_data 下的 JSON 文件（策略的 instrumentation_file），每轮循环检查修改时间:
+
+    {"enabled": true, "indicators": true, "log_interval": 300, "http_port": 9109}
+
+- enabled: 是否计时；关闭时撤掉全部包装，热路径上没有任何额外开销
+- indicators: 是否细分到指标（单次递推约 1 微秒，计时本身有可见开销）
+- log_interval: 每隔多少秒按阶段输出 次数 / p50 / p99（只统计该间隔内）与启动以来的最大值
+- http_port: 在 127.0.0.1 上提供 Prometheus 文本格式的 /metrics（累计直方图，按交易对）
+
+直方图为对数分桶（每 10 倍 4 档，1 微秒 ~ 100 秒），分位数取所在桶的上界。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# 桶上界（纳秒）: 1µs * 10^(i/4)，i = 0..32（最后一个为 100s），其后为 +Inf
+BUCKET_BOUNDS_NS: Tuple[int, ...] = tuple(int(round(1000 * 10 ** (i / 4))) for i in range(33))
+
+STRATEGY_STAGES = (
+    "populate_indicators",
+    "populate_entry_trend",
+    "populate_exit_trend",
+    "custom_stoploss",
+    "custom_exit",
+    "confirm_trade_entry",
+)
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "enabled": False,
+    "indicators": False,
+    "log_interval": 300,
+    "http_port": None,
+}
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图"""
+
+    __slots__ = ("counts", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def record(self, ns: int) -> None:
+        self.counts[bisect_left(BUCKET_BOUNDS_NS, ns)] += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def copy(self) -> "LatencyHistogram":
+        other = LatencyHistogram()
+        other.counts = list(self.counts)
+        other.total_ns, other.max_ns = self.total_ns, self.max_ns
+        return other
+
+    def since(self, earlier: Optional["LatencyHistogram"]) -> "LatencyHistogram":
+        """自 earlier 之后新增的部分（最大值仍为累计最大值）"""
+        delta = self.copy()
+        if earlier is not None:
+            delta.counts = [a - b for a, b in zip(self.counts, earlier.counts)]
+            delta.total_ns -= earlier.total_ns
+        return delta
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+
+    def quantile(self, q: float) -> int:
+        """分位数（所在桶的上界，不超过最大值）"""
+        total = self.count
+        if total == 0:
+            return 0
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKET_BOUNDS_NS[i], self.max_ns) if i < len(BUCKET_BOUNDS_NS) else self.max_ns
+        return self.max_ns
+
+
+def _pair_of(args: tuple, kwargs: Dict[str, Any]) -> Optional[str]:
+    """回调参数中的交易对: 关键字 pair，或 populate_* 的 metadata["pair"]"""
+    pair = kwargs.get("pair")
+    if pair is not None:
+        return pair
+    metadata = kwargs.get("metadata", args[1] if len(args) > 1 else None)
+    if isinstance(metadata, dict):
+        return metadata.get("pair")
+    if args and isinstance(args[0], str):
+        return args[0]
+    return None
+
+
+def _fmt_ns(ns: float) -> str:
+    if ns >= 1e9:
+        return f"{ns / 1e9:.2f}s"
+    if ns >= 1e6:
+        return f"{ns / 1e6:.1f}ms"
+    return f"{ns / 1e3:.0f}µs"
+
+
+# ============================================================
+# 计时器
+# ============================================================
+class Instrumentation:
+    """
+    按 (阶段, 交易对) 的延迟直方图与方法包装
+
+    关闭时不保留任何包装；attach 记录被替换的原属性，disable 时原样恢复。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # 当前正在处理的交易对（指标计时没有交易对参数，取外层回调的）
+        self.current_pair = ""
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._logged: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._patches: List[Tuple[Any, str, Any, bool]] = []
+
+    # ------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------
+    def record(self, stage: str, pair: str, ns: int) -> None:
+        key = (stage, pair)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.record(ns)
+
+    def record_since(self, stage: str, pair: str, moment: pd.Timestamp) -> None:
+        """从 moment（UTC）到现在的延迟"""
+        self.record(stage, pair, max(time.time_ns() - moment.value, 0))
+
+    def reset(self) -> None:
+        self._histograms.clear()
+        self._logged.clear()
+
+    # ------------------------------------------------------------
+    # 包装
+    # ------------------------------------------------------------
+    def attach(self, owner: Any, name: str, stage: str,
+               after: Optional[Callable[[tuple, Dict[str, Any], Any, str], None]] = None,
+               track_pair: bool = False) -> None:
+        """
+        把 owner.name 替换为计时版本
+
+        owner 为实例时只影响该实例，为类时影响全部实例（指标状态类）。
+        track_pair: 调用期间把 current_pair 设为本次的交易对（供内层指标计时使用）
+        after: 调用返回后的附加记录，参数为 (args, kwargs, 返回值, 交易对)
+        """
+        original = getattr(owner, name)
+        record = self.record
+        instruments = self
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            pair = _pair_of(args, kwargs) if track_pair or after is not None else None
+            if pair is None:
+                pair = instruments.current_pair
+            elif track_pair:
+                instruments.current_pair = pair
+            started = time.perf_counter_ns()
+            result = original(*args, **kwargs)
+            record(stage, pair, time.perf_counter_ns() - started)
+            if after is not None:
+                after(args, kwargs, result, pair)
+            return result
+
+        self._patches.append((owner, name, original, name in vars(owner)))
+        setattr(owner, name, timed)
+
+    def detach_all(self) -> None:
+        for owner, name, original, owned in reversed(self._patches):
+            if owned:
+                setattr(owner, name, original)
+            else:
+                # 原方法来自类: 删掉实例上的包装即可
+                delattr(owner, name)
+        self._patches.clear()
+
+    def enable(self, strategy: Any, indicators: bool = False) -> None:
+        """包装策略实例的回调（以及指标计算），开始计时"""
+        if self.enabled:
+            self.disable()
+        timeframe = pd.Timedelta(minutes=_timeframe_minutes(strategy.timeframe))
+
+        def signals_ready(args, kwargs, result, pair):
+            if len(result):
+                self.record_since("signals_after_close", pair, result["date"].iloc[-1] + timeframe)
+
+        def entry_ready(args, kwargs, result, pair):
+            now = pd.Timestamp(time.time_ns(), tz="UTC")
+            self.record_since("entry_after_close", pair, now.floor(timeframe))
+
+        after_hooks = {"populate_exit_trend": signals_ready, "confirm_trade_entry": entry_ready}
+        for stage in STRATEGY_STAGES:
+            if hasattr(strategy, stage):
+                self.attach(strategy, stage, stage, after=after_hooks.get(stage),
+                            track_pair=stage == "populate_indicators")
+
+        if indicators:
+            for owner, name, stage in _indicator_targets():
+                self.attach(owner, name, stage)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.detach_all()
+        self.enabled = False
+        self.current_pair = ""
+
+    # ------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------
+    def _by_stage(self, histograms: Iterable[Tuple[Tuple[str, str], LatencyHistogram]]
+                  ) -> Dict[str, Tuple[LatencyHistogram, str, int]]:
+        """阶段 → (合并后的直方图, p99 最高的交易对, 该交易对的 p99)"""
+        result: Dict[str, Tuple[LatencyHistogram, str, int]] = {}
+        for (stage, pair), histogram in histograms:
+            if histogram.count == 0:
+                continue
+            merged, worst, worst_p99 = result.get(stage, (LatencyHistogram(), "", -1))
+            merged.merge(histogram)
+            p99 = histogram.quantile(0.99)
+            if p99 > worst_p99:
+                worst, worst_p99 = pair, p99
+            result[stage] = (merged, worst, worst_p99)
+        return result
+
+    def interval_summary(self) -> List[str]:
+        """上次调用以来各阶段的 次数 / p50 / p99（每阶段一行，附启动以来的最大值）"""
+        current = {key: histogram.copy() for key, histogram in list(self._histograms.items())}
+        deltas = [(key, histogram.since(self._logged.get(key))) for key, histogram in current.items()]
+        self._logged = current
+        lines = []
+        for stage, (merged, worst, worst_p99) in sorted(self._by_stage(deltas).items()):
+            line = (f"{stage} n={merged.count} p50={_fmt_ns(merged.quantile(0.5))} "
+                    f"p99={_fmt_ns(merged.quantile(0.99))} 累计max={_fmt_ns(merged.max_ns)}")
+            if worst:
+                line += f" 最慢 {worst}(p99={_fmt_ns(worst_p99)})"
+            lines.append(line)
+        return lines
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式（累计直方图，单位秒）"""
+        name = "strategy_stage_latency_seconds"
+        lines = [f"# HELP {name} 策略回调 / 指标 / 收盘后延迟", f"# TYPE {name} histogram"]
+        for (stage, pair), histogram in sorted(list(self._histograms.items())):
+            labels = f'stage="{stage}",pair="{pair}"'
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS_NS, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound / 1e9:.9g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.total_ns / 1e9:.9g}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _timeframe_minutes(timeframe: str) -> int:
+    from freqtrade.exchange import timeframe_to_minutes
+    return timeframe_to_minutes(timeframe)
+
+
+def _indicator_targets() -> List[Tuple[Any, str, str]]:
+    """(类, 方法名, 阶段) - 流式递推状态与 talib 缓存访问器"""
+    from common import streaming
+    from common.indicator_cache import CachedIndicators
+
+    targets = [
+        (streaming.EmaState, "update", "indicator:ema"),
+        (streaming.RsiState, "update", "indicator:rsi"),
+        (streaming.AtrState, "update", "indicator:atr"),
+        (streaming.AdxState, "update", "indicator:adx"),
+        (streaming.BollingerState, "update", "indicator:bbands"),
+        (streaming.MacdState, "update", "indicator:macd"),
+        (streaming.RollingMean, "update", "indicator:rolling_mean"),
+    ]
+    targets += [(CachedIndicators, name, f"indicator:{name}")
+                for name in ("ema", "rsi", "atr", "adx", "bbands", "macd")]
+    return targets
+
+
+# 进程级共享实例（指标状态类的包装对所有策略实例生效）
+INSTRUMENTS = Instrumentation()
+
+
+# ============================================================
+# 输出: 本地 HTTP 端点
+# ============================================================
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = INSTRUMENTS.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """127.0.0.1:port 上的 /metrics（后台守护线程）"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="strategy-metrics", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ============================================================
+# 运行时开关
+# ============================================================
+class InstrumentationControl:
+    """
+    监视开关文件，按内容打开 / 关闭计时、启停 HTTP 端点，并定期输出日志行
+
+    Args:
+        path: 开关文件（不存在时视为关闭）
+        strategy: 要计时的策略实例
+    """
+
+    def __init__(self, path: Path, strategy: Any, instruments: Instrumentation = INSTRUMENTS):
+        self.path = Path(path)
+        self.strategy = strategy
+        self.instruments = instruments
+        self.settings: Dict[str, Any] = dict(DEFAULT_SETTINGS)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._server: Optional[MetricsServer] = None
+        self._last_log = time.monotonic()
+
+    def _current_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> None:
+        """每轮循环调用: 文件变化时应用新设置；到时间时输出日志行"""
+        stamp = self._current_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            try:
+                settings = self._read() if stamp is not None else {}
+            except (OSError, ValueError) as exc:
+                logger.error("计时开关文件 %s 无效，保持当前设置: %s", self.path, exc)
+            else:
+                self._apply({**DEFAULT_SETTINGS, **settings})
+
+        interval = self.settings["log_interval"]
+        if self.instruments.enabled and interval and time.monotonic() - self._last_log >= interval:
+            self._last_log = time.monotonic()
+            for line in self.instruments.interval_summary():
+                logger.info("计时 %s", line)
+
+    def _read(self) -> Dict[str, Any]:
+        settings = json.loads(self.path.read_text(encoding="utf-8"))
+        if not isinstance(settings, dict):
+            raise ValueError("内容必须是对象")
+        unknown = sorted(set(settings) - set(DEFAULT_SETTINGS))
+        if unknown:
+            raise ValueError(f"未知设置: {', '.join(unknown)}")
+        return settings
+
+    def _apply(self, settings: Dict[str, Any]) -> None:
+        old, self.settings = self.settings, settings
+        if settings["enabled"] and (not self.instruments.enabled
+                                    or settings["indicators"] != old["indicators"]):
+            self.instruments.enable(self.strategy, indicators=settings["indicators"])
+            self._last_log = time.monotonic()
+            logger.info("已开启热路径计时（%s）", "含指标" if settings["indicators"] else "仅回调")
+        elif not settings["enabled"] and self.instruments.enabled:
+            self.instruments.disable()
+            logger.info("已关闭热路径计时")
+
+        port = settings["http_port"] if settings["enabled"] else None
+        if self._server is not None and self._server.port != port:
+            self._server.close()
+            self._server = None
+        if port and self._server is None:
+            try:
+                self._server = MetricsServer(int(port))
+            except OSError as exc:
+                logger.error("无法在 127.0.0.1:%s 提供计时指标: %s", port, exc)
+            else:
+                logger.info("计时指标: http://127.0.0.1:%s/metrics", port)
@@ -0,0 +1,138 @@
+"""
+大盘状态过滤（BTC 等信息对）
+
+DOGE 2025 Q4 在大盘 -43.52% 的熊市中亏损 12%: 单看本交易对的 EMA 排列，
+下跌中途的反弹同样满足回踩入场。大盘过滤要求信息对（默认 BTC/USDT）在
+各个周期上收盘价都位于 EMA 上方时才允许入场:
+
+    market_ok = AND(信息对 close > EMA(period)  for 周期, period in 配置)
+
+计算只做一次、所有交易对共享:
+
+- 大盘状态在信息对的主周期时间轴上算好并缓存（键为各周期K线窗口），
+  同一根K线上无论多少个交易对请求都只计算一次
+- 高周期（如 4h）在计算时按收盘时间对齐到主周期: 主周期K线只能看到
+  已收盘的高周期K线（与 merge_informative_pair 的对齐方式一致，无前视）
+- 并入交易对时按时间戳对齐: 交易对的时间轴是信息对时间轴的连续一段
+  （通常情况: 同样的 K线数 / 回测区间）时直接取切片视图；
+  否则按时间二分查找（交易对K线之前没有信息对数据的位置记为 False）
+
+信息对数据不可用时不过滤（记录一次警告），避免数据缺失让策略静默停止交易。
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.exchange import timeframe_to_minutes
+
+from common.indicator_cache import CachedIndicators, frame_key
+
+
+logger = logging.getLogger(__name__)
+
+# 按 (交易对, 周期) 取信息对K线的函数，不可用时返回 None / 空表
+FrameSource = Callable[[str, str], Optional[DataFrame]]
+
+
+def _dates(dataframe: DataFrame) -> np.ndarray:
+    return dataframe["date"].to_numpy(dtype="datetime64[ns]")
+
+
+def align_closed(base_dates: np.ndarray, base_timeframe: str,
+                 dates: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    主周期每根K线可见的最后一根 timeframe K线的下标（-1 表示没有）
+
+    timeframe K线 (开盘 t) 在 t + timeframe 收盘；主周期K线 (开盘 d) 在
+    d + base_timeframe 收盘时可以使用它的条件为 t + timeframe <= d + base_timeframe。
+    """
+    shift = pd.Timedelta(minutes=timeframe_to_minutes(timeframe) - timeframe_to_minutes(base_timeframe))
+    return np.searchsorted(dates + shift.to_timedelta64(), base_dates, side="right") - 1
+
+
+class MarketRegimeFeed:
+    """
+    信息对的大盘状态（主周期时间轴上的布尔数组），按K线窗口缓存
+
+    Args:
+        pair: 信息对，如 "BTC/USDT"
+        timeframe: 主周期（与策略一致）
+        emas: 周期 → EMA 长度，如 {"1h": 200, "4h": 50}
+        source: 取信息对K线的函数
+    """
+
+    def __init__(self, pair: str, timeframe: str, emas: Dict[str, int], source: FrameSource):
+        self.pair = pair
+        self.timeframe = timeframe
+        self.emas = dict(emas)
+        self.source = source
+        self._key: Optional[Tuple] = None
+        self._dates: Optional[np.ndarray] = None
+        self._regime: Optional[np.ndarray] = None
+        self._warned = False
+
+    @property
+    def timeframes(self) -> Tuple[str, ...]:
+        """需要的信息对周期（主周期在前）"""
+        return (self.timeframe,) + tuple(tf for tf in self.emas if tf != self.timeframe)
+
+    def regime(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(信息对主周期时间, 大盘状态)；数据不可用时返回 None"""
+        frames = {tf: self.source(self.pair, tf) for tf in self.timeframes}
+        if any(frame is None or frame.empty for frame in frames.values()):
+            if not self._warned:
+                self._warned = True
+                logger.warning("大盘过滤: %s 的 %s K线不可用，暂不过滤",
+                               self.pair, "/".join(self.timeframes))
+            return None
+        self._warned = False
+
+        key = tuple(frame_key(frames[tf], self.pair, tf) for tf in self.timeframes)
+        if key != self._key:
+            self._dates, self._regime = self._compute(frames)
+            self._key = key
+        return self._dates, self._regime
+
+    def _compute(self, frames: Dict[str, DataFrame]) -> Tuple[np.ndarray, np.ndarray]:
+        base_dates = _dates(frames[self.timeframe])
+        regime = np.ones(len(base_dates), dtype=np.bool_)
+        for tf, period in self.emas.items():
+            frame = frames[tf]
+            # EMA 预热期为 NaN，比较结果为 False
+            above = frame["close"].to_numpy() > CachedIndicators(frame, self.pair, tf).ema(period)
+            if tf == self.timeframe:
+                regime &= above
+                continue
+            index = align_closed(base_dates, self.timeframe, _dates(frame), tf)
+            regime &= np.where(index >= 0, above[np.maximum(index, 0)], False)
+        regime.setflags(write=False)
+        return base_dates, regime
+
+    def column(self, dataframe: DataFrame) -> Optional[np.ndarray]:
+        """
+        交易对 dataframe 每根K线的大盘状态；数据不可用时返回 None
+
+        时间轴是信息对时间轴的连续一段时返回只读切片视图（不复制）。
+        """
+        result = self.regime()
+        if result is None:
+            return None
+        market_dates, regime = result
+        n = len(dataframe)
+        if n == 0:
+            return regime[:0]
+        dates = _dates(dataframe)
+        start = int(np.searchsorted(market_dates, dates[0]))
+        stop = start + n
+        if (stop <= len(market_dates) and market_dates[start] == dates[0]
+                and market_dates[stop - 1] == dates[-1]):
+            return regime[start:stop]
+        # 时间轴不一致（缺K线 / 信息对数据更短）: 逐根取不晚于该K线的信息对K线
+        index = np.searchsorted(market_dates, dates, side="right") - 1
+        return np.where(index >= 0, regime[np.maximum(index, 0)], False)
@@ -0,0 +1,108 @@
+"""
+资产参数热加载（实盘 / 模拟盘）
+
+修改 ASSET_CONFIGS 中的一个阈值原本需要改策略文件并重启容器，
+重启会断开 websocket / API 并重新加载全部数据。
+
+现在可以在 user_data/asset_configs.json 中按资产覆盖参数:
+
+    {
+        "assets": {
+            "DOGE": {"rsi_oversold": 33, "slope_threshold": 0.35},
+            "MNT":  {"profit_lock_levels": [[0.25, 0.18], [0.15, 0.10], [0.08, 0.05], [0.04, 0.02]]}
+        },
+        "default": {"stoploss": -0.08}
+    }
+
+- 文件中的键逐项覆盖策略代码里的 ASSET_CONFIGS / DEFAULT_CONFIG，未出现的键保持代码中的值；
+  代码中没有的资产以 DEFAULT_CONFIG 为底
+- 运行中的策略每轮循环检查文件修改时间，变化后重新编译整张档案表；
+  校验失败时记录错误并继续使用旧档案表（不会半途生效）
+- 新档案表在下一根K线生效。只改阈值 / 阶梯时不重算任何指标；
+  EMA 周期变化的交易对由流式引擎在下一次 populate 时单独重新预热
+- 已通过超参优化加载的参数值（与参数默认值不同）仍优先于文件
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from freqtrade.exceptions import OperationalException
+
+from common.profiles import CONFIG_KEYS, ProfileRegistry
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileWatcher:
+    """
+    监视参数覆盖文件，文件变化且校验通过时返回新的档案表
+
+    Args:
+        path: 覆盖文件路径（不存在时使用代码中的配置）
+        asset_configs: 代码中的 ASSET_CONFIGS
+        default_config: 代码中的 DEFAULT_CONFIG
+    """
+
+    def __init__(self, path: Path, asset_configs: Mapping[str, Mapping[str, Any]],
+                 default_config: Mapping[str, Any]):
+        self.path = Path(path)
+        self.asset_configs = asset_configs
+        self.default_config = default_config
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    def _current_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> Optional[ProfileRegistry]:
+        """文件自上次检查以来有变化时返回新档案表，否则返回 None"""
+        stamp = self._current_stamp()
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+
+        try:
+            registry = self._build(self._read() if stamp is not None else {})
+        except (OSError, TypeError, ValueError, OperationalException) as exc:
+            logger.error("资产参数文件 %s 无效，继续使用当前参数: %s", self.path, exc)
+            return None
+
+        if stamp is None:
+            logger.info("资产参数文件 %s 不存在，使用策略代码中的配置", self.path)
+        else:
+            logger.info("已加载资产参数文件 %s", self.path)
+        return registry
+
+    def _read(self) -> Dict[str, Any]:
+        overrides = json.loads(self.path.read_text(encoding="utf-8"))
+        if not isinstance(overrides, dict) or set(overrides) - {"assets", "default"}:
+            raise ValueError('顶层只能包含 "assets" 与 "default"')
+        return overrides
+
+    def _build(self, overrides: Mapping[str, Any]) -> ProfileRegistry:
+        assets: Dict[str, Dict[str, Any]] = {
+            asset.upper(): dict(config) for asset, config in self.asset_configs.items()
+        }
+        for asset, config in overrides.get("assets", {}).items():
+            _check_keys(asset, config)
+            assets.setdefault(asset.upper(), dict(self.default_config)).update(config)
+        default = overrides.get("default", {})
+        _check_keys("default", default)
+        return ProfileRegistry(assets, {**self.default_config, **default})
+
+
+def _check_keys(name: str, config: Any) -> None:
+    """拼错的键会被档案静默忽略，这里提前拒绝"""
+    if not isinstance(config, dict):
+        raise ValueError(f"{name} 的配置必须是对象")
+    unknown = sorted(set(config) - set(CONFIG_KEYS))
+    if unknown:
+        raise ValueError(f"{name} 包含未知参数: {', '.join(unknown)}")
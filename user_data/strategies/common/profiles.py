@@ -0,0 +1,154 @@
+"""
+资产参数档案（AssetProfile）
+
+把 ASSET_CONFIGS / DEFAULT_CONFIG 的原始 dict 在策略加载时编译成
+不可变的 __slots__ 对象：
+- 默认值集中在 PROFILE_DEFAULTS 一处，不再散落在各回调的 config.get(...)
+- 加载时统一校验（阶梯降序、止损为负、EMA 周期递增 ...）
+- 回调中通过属性访问取参数，比字符串键查找更快
+- 交易对 → 档案的映射由每个策略实例各自持有，不会在实例 / 超参优化进程间泄漏
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping
+
+from freqtrade.exceptions import OperationalException
+
+from common.exits import ProfitLockLadder
+
+
+# 各参数的默认值（原先分散在 populate_* 中的 config.get 默认值）
+PROFILE_DEFAULTS: Dict[str, Any] = {
+    "min_adx": 20,
+    "use_advanced_filter": True,
+    "use_trend_filter": False,
+    "use_trend_exit": True,
+    "trend_exit_volatility_ratio": 0.0,
+}
+
+_REQUIRED = (
+    "stoploss", "trailing_stop", "trailing_offset", "profit_lock_levels",
+    "ema_fast", "ema_slow", "ema_trend",
+    "rsi_oversold", "rsi_overbought", "slope_threshold",
+    "pullback_tolerance", "volatility_multiplier",
+)
+
+
+class AssetProfile:
+    """单个资产的不可变参数档案"""
+
+    __slots__ = (
+        "name",
+        "stoploss", "trailing_stop", "trailing_offset",
+        "profit_lock_levels", "ladder",
+        "ema_fast", "ema_slow", "ema_trend", "ema_exit", "ema_periods",
+        "rsi_oversold", "rsi_overbought", "slope_threshold",
+        "pullback_tolerance", "volatility_multiplier",
+        "min_adx", "use_advanced_filter", "use_trend_filter",
+        "use_trend_exit", "trend_exit_volatility_ratio",
+    )
+
+    def __init__(self, name: str, config: Mapping[str, Any]):
+        missing = [key for key in _REQUIRED if key not in config]
+        if missing:
+            raise OperationalException(f"资产配置 {name} 缺少参数: {', '.join(missing)}")
+        values = {**PROFILE_DEFAULTS, **config}
+        values.setdefault("ema_exit", values["ema_trend"])
+
+        assign = object.__setattr__
+        assign(self, "name", name)
+        for key in self.__slots__:
+            if key in values:
+                assign(self, key, values[key])
+        assign(self, "profit_lock_levels", tuple(tuple(level) for level in values["profit_lock_levels"]))
+        assign(self, "ema_periods", (self.ema_fast, self.ema_slow, self.ema_trend, self.ema_exit))
+        assign(self, "ladder", ProfitLockLadder(self.profit_lock_levels, self.stoploss))
+        self._validate()
+
+    def replace(self, **overrides: Any) -> "AssetProfile":
+        """返回替换部分参数后的新档案（同样经过校验）"""
+        config = {key: getattr(self, key) for key in CONFIG_KEYS}
+        config.update(overrides)
+        return AssetProfile(self.name, config)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f"AssetProfile 为只读对象，不能修改 {key}")
+
+    def __delattr__(self, key: str) -> None:
+        raise AttributeError(f"AssetProfile 为只读对象，不能删除 {key}")
+
+    def __repr__(self) -> str:
+        return f"AssetProfile({self.name})"
+
+    def _validate(self) -> None:
+        errors = []
+        if not self.stoploss < 0:
+            errors.append(f"stoploss 必须为负数 (当前 {self.stoploss})")
+        if not 0 < self.trailing_stop < self.trailing_offset:
+            errors.append("需满足 0 < trailing_stop < trailing_offset")
+        if not self.ema_fast < self.ema_slow < self.ema_trend:
+            errors.append("EMA 周期需满足 ema_fast < ema_slow < ema_trend")
+        if self.ema_exit < 2:
+            errors.append("ema_exit 周期至少为 2")
+        if not self.rsi_oversold < self.rsi_overbought:
+            errors.append("需满足 rsi_oversold < rsi_overbought")
+
+        thresholds = [t for t, _ in self.profit_lock_levels]
+        if any(a <= b for a, b in zip(thresholds, thresholds[1:])):
+            errors.append("profit_lock_levels 需按利润阈值从高到低排列")
+        if any(not 0 <= lock < level for level, lock in self.profit_lock_levels):
+            errors.append("profit_lock_levels 的锁定利润需满足 0 <= 锁定 < 阈值")
+
+        if errors:
+            raise OperationalException(f"资产配置 {self.name} 校验失败: " + "; ".join(errors))
+
+
+# 可由原始配置给出的字段（其余为编译产物）
+CONFIG_KEYS = tuple(
+    key for key in AssetProfile.__slots__ if key not in ("name", "ladder", "ema_periods")
+)
+
+
+class ProfileRegistry:
+    """
+    编译后的档案表
+
+    Args:
+        asset_configs: {基础资产: 原始配置}，如 ASSET_CONFIGS
+        default_config: 未知资产使用的配置
+    """
+
+    def __init__(self, asset_configs: Mapping[str, Mapping[str, Any]],
+                 default_config: Mapping[str, Any]):
+        self.profiles: Dict[str, AssetProfile] = {
+            asset.upper(): AssetProfile(asset.upper(), config)
+            for asset, config in asset_configs.items()
+        }
+        self.default = AssetProfile("DEFAULT", default_config)
+
+    def resolve(self, pair: str) -> AssetProfile:
+        """交易对 → 档案（如 DOGE/USDT -> DOGE，未找到则使用默认档案）"""
+        base_asset = pair.split("/")[0].upper()
+        return self.profiles.get(base_asset, self.default)
+
+
+class PairProfileTable:
+    """每个策略实例持有的交易对 → 档案查找表"""
+
+    __slots__ = ("registry", "_table")
+
+    def __init__(self, registry: ProfileRegistry):
+        self.registry = registry
+        self._table: Dict[str, AssetProfile] = {}
+
+    def get(self, pair: str) -> AssetProfile:
+        profile = self._table.get(pair)
+        if profile is None:
+            profile = self.registry.resolve(pair)
+            self._table[pair] = profile
+        return profile
+
+    def precompute(self, pairs: Iterable[str]) -> None:
+        for pair in pairs:
+            self.get(pair)
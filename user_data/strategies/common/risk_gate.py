@@ -0,0 +1,267 @@
+"""
+组合风控（confirm_trade_entry）
+
+入场确认在每个信号上都会被调用，这里只做常数次比较，状态全部在别处增量维护:
+
+- 持仓上限: 持仓交易对集合，每轮循环开始时与数据库同步一次，
+  本轮批准的入场立即计入（同一轮多个信号不会一起越过上限）
+- 单日入场上限: 滚动 24 小时窗口内的入场时间队列，过期的从队首弹出
+- 相关性: 各交易对每根K线的对数收益率按时间对齐，推入指数加权的
+  协方差矩阵（每根K线 O(P²) 向量更新一次）；查询两两相关系数只读三个元素
+
+收益率按K线时间排队，只有在入场时刻已收盘的K线才会并入协方差
+（回测中全部历史一次排好队，随回测时间逐根并入，无前视）。
+回测时间倒退（超参优化的下一个 epoch / 下一次回测）时全部状态从头开始。
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from pandas import DataFrame
+
+from freqtrade.exchange import timeframe_to_minutes
+
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+_NS_PER_DAY = 24 * 60 * _NS_PER_MINUTE
+
+# 迟迟没有推入新K线的交易对（已移出白名单 / 数据中断），落后这么多根后不再等待
+STALE_CANDLES = 3
+
+
+def _dates_ns(dataframe: DataFrame) -> np.ndarray:
+    return dataframe["date"].values.astype("datetime64[ns]", copy=False).view(np.int64)
+
+
+# ============================================================
+# 流式相关系数
+# ============================================================
+class StreamingCorrelation:
+    """
+    指数加权的收益率协方差矩阵
+
+    每根K线一次秩一更新（West 递推）:
+        delta = x - mean;  mean += a * delta;  cov = (1 - a) (cov + a * delta delta^T)
+    某交易对该K线没有收益率（NaN）时，与它相关的行列保持不变。
+
+    Args:
+        halflife: 半衰期（K线数）
+        min_periods: 两个交易对共同的样本数达到该值前，相关系数视为未知
+    """
+
+    def __init__(self, halflife: float, min_periods: int):
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.min_periods = min_periods
+        self.index: Dict[str, int] = {}
+        self.mean = np.zeros(0)
+        self.cov = np.zeros((0, 0))
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+
+    def add_pair(self, pair: str) -> int:
+        i = self.index.get(pair)
+        if i is None:
+            # 新交易对（动态白名单）: 矩阵扩一行一列，很少发生
+            i = self.index[pair] = len(self.index)
+            self.mean = np.append(self.mean, 0.0)
+            self.cov = np.pad(self.cov, ((0, 1), (0, 1)))
+            self.counts = np.pad(self.counts, ((0, 1), (0, 1)))
+        return i
+
+    def reset(self) -> None:
+        self.mean[:] = 0.0
+        self.cov[:] = 0.0
+        self.counts[:] = 0
+
+    def update(self, returns: np.ndarray) -> None:
+        """推入一根K线各交易对的收益率（按 index 顺序，缺失为 NaN）"""
+        present = ~np.isnan(returns)
+        both = np.outer(present, present)
+        # 第一次出现的交易对以本次收益率为均值起点
+        first = present & (np.diagonal(self.counts) == 0)
+        self.mean[first] = returns[first]
+        delta = np.where(present, returns - self.mean, 0.0)
+        self.mean += self.alpha * delta
+        self.cov = np.where(both, (1.0 - self.alpha) * (self.cov + self.alpha * np.outer(delta, delta)),
+                            self.cov)
+        self.counts += both
+
+    def correlation(self, pair: str, other: str) -> float:
+        """两个交易对的相关系数；样本不足或未知交易对时为 NaN"""
+        i = self.index.get(pair)
+        j = self.index.get(other)
+        if i is None or j is None or self.counts[i, j] < self.min_periods:
+            return math.nan
+        scale = self.cov[i, i] * self.cov[j, j]
+        if scale <= 0:
+            return math.nan
+        return float(self.cov[i, j] / math.sqrt(scale))
+
+
+# ============================================================
+# 按K线时间排队的收益率
+# ============================================================
+class ReturnTape:
+    """
+    各交易对按K线时间对齐的对数收益率，cursor 之前的已并入协方差
+
+    K线断档（与上一根相差不止一个周期）的那根不计收益率。
+    """
+
+    def __init__(self, timeframe: str):
+        self.step = timeframe_to_minutes(timeframe) * _NS_PER_MINUTE
+        self.dates: List[int] = []
+        self.rows: List[Dict[int, float]] = []
+        self.cursor = 0
+        # 每个交易对最后推入的K线 (时间, 收盘价)
+        self.last: Dict[int, tuple] = {}
+
+    def push(self, index: int, dates: np.ndarray, close: np.ndarray) -> None:
+        """推入一个交易对的K线（只处理比上次更新的部分）"""
+        last = self.last.get(index)
+        start = 0 if last is None else int(np.searchsorted(dates, last[0], side="right"))
+        if start >= len(dates):
+            return
+        prev_dates = np.empty(len(dates) - start, dtype=np.int64)
+        prev_close = np.empty(len(dates) - start, dtype=np.float64)
+        prev_dates[1:], prev_close[1:] = dates[start:-1], close[start:-1]
+        if start > 0:
+            prev_dates[0], prev_close[0] = dates[start - 1], close[start - 1]
+        elif last is not None:
+            prev_dates[0], prev_close[0] = last
+        else:
+            prev_dates[0], prev_close[0] = dates[0] - 2 * self.step, math.nan
+        new_dates = dates[start:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.log(close[start:] / prev_close)
+        returns[(new_dates - prev_dates) != self.step] = math.nan
+
+        committed = self.dates[self.cursor - 1] if self.cursor > 0 else None
+        for date, value in zip(new_dates.tolist(), returns.tolist()):
+            if committed is not None and date <= committed:
+                # 该K线已并入协方差（迟到的数据），丢弃
+                continue
+            if not self.dates or date > self.dates[-1]:
+                self.dates.append(date)
+                self.rows.append({})
+                pos = len(self.dates) - 1
+            else:
+                pos = bisect_left(self.dates, date)
+                if self.dates[pos] != date:
+                    self.dates.insert(pos, date)
+                    self.rows.insert(pos, {})
+            if not math.isnan(value):
+                self.rows[pos][index] = value
+        self.last[index] = (int(dates[-1]), float(close[-1]))
+
+    def ready(self, now: int) -> bool:
+        """是否有K线可以并入（O(1)，无新K线时直接返回）"""
+        return self.cursor < len(self.dates) and self.dates[self.cursor] + self.step <= now
+
+    def drain(self, now: int, size: int) -> Iterable[np.ndarray]:
+        """
+        逐根取出 now 时已收盘、且各交易对都已推入的K线（收益率向量）
+
+        落后最新K线 STALE_CANDLES 根以上的交易对不再等待。
+        """
+        newest = max(date for date, _ in self.last.values())
+        frontier = max(min(date for date, _ in self.last.values()),
+                       newest - STALE_CANDLES * self.step)
+        while self.ready(now) and self.dates[self.cursor] <= frontier:
+            vector = np.full(size, math.nan)
+            for index, value in self.rows[self.cursor].items():
+                vector[index] = value
+            self.cursor += 1
+            yield vector
+
+    def rewind(self) -> None:
+        self.cursor = 0
+
+    def trim(self, keep: int) -> None:
+        """丢弃已并入的旧K线（只在实盘使用，回测需要保留整段以便重放）"""
+        if self.cursor > 2 * keep:
+            drop = self.cursor - keep
+            del self.dates[:drop]
+            del self.rows[:drop]
+            self.cursor -= drop
+
+
+# ============================================================
+# 入场闸门
+# ============================================================
+class RiskGate:
+    """
+    组合级入场风控；各项为 None 时不检查
+
+    Args:
+        timeframe: 主周期
+        max_positions: 同时持仓的交易对数上限
+        max_entries_per_day: 滚动 24 小时内的入场次数上限
+        max_correlation: 与任一持仓交易对的收益率相关系数上限
+        halflife: 相关系数的半衰期（K线数），样本数达到半衰期后才检查相关性
+    """
+
+    def __init__(self, timeframe: str, max_positions: Optional[int] = None,
+                 max_entries_per_day: Optional[int] = None,
+                 max_correlation: Optional[float] = None, halflife: int = 72):
+        self.max_positions = max_positions
+        self.max_entries_per_day = max_entries_per_day
+        self.max_correlation = max_correlation
+        self.correlation = StreamingCorrelation(halflife, min_periods=halflife)
+        self.tape = ReturnTape(timeframe)
+        self.open_pairs: Set[str] = set()
+        self.entries: Deque[int] = deque()
+        self._now = -1
+
+    def observe(self, pair: str, dataframe: DataFrame) -> None:
+        """populate_indicators 之后推入该交易对的K线（未启用相关性检查时不记录）"""
+        if self.max_correlation is None or dataframe.empty:
+            return
+        index = self.correlation.add_pair(pair)
+        self.tape.push(index, _dates_ns(dataframe), dataframe["close"].to_numpy(dtype=np.float64))
+
+    def sync(self, pairs: Iterable[str]) -> None:
+        """每轮循环开始时用当前持仓覆盖持仓集合"""
+        self.open_pairs = set(pairs)
+
+    def trim(self) -> None:
+        self.tape.trim(STALE_CANDLES)
+
+    def _advance(self, now: int) -> None:
+        if now < self._now:
+            # 回测时间倒退: 新的一次回测，从头重放
+            self.correlation.reset()
+            self.tape.rewind()
+            self.entries.clear()
+            self.open_pairs.clear()
+        self._now = now
+        if self.tape.ready(now):
+            for vector in self.tape.drain(now, len(self.correlation.index)):
+                self.correlation.update(vector)
+        horizon = now - _NS_PER_DAY
+        while self.entries and self.entries[0] <= horizon:
+            self.entries.popleft()
+
+    def check(self, pair: str, now: int) -> Optional[str]:
+        """now (ns) 时刻 pair 的入场是否放行；拒绝时返回原因"""
+        self._advance(now)
+        held = self.open_pairs - {pair}
+        if self.max_positions is not None and len(held) >= self.max_positions:
+            return f"持仓 {len(held)} 个已达上限 {self.max_positions}"
+        if self.max_entries_per_day is not None and len(self.entries) >= self.max_entries_per_day:
+            return f"24 小时内已入场 {len(self.entries)} 次，上限 {self.max_entries_per_day}"
+        if self.max_correlation is not None:
+            for other in held:
+                corr = self.correlation.correlation(pair, other)
+                if corr > self.max_correlation:
+                    return f"与持仓 {other} 的相关系数 {corr:.2f} 超过 {self.max_correlation:.2f}"
+        return None
+
+    def record(self, pair: str, now: int) -> None:
+        """放行后计入持仓与入场次数"""
+        self.open_pairs.add(pair)
+        self.entries.append(now)
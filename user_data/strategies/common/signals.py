@@ -0,0 +1,153 @@
+"""
+融合信号内核
+
+直接在 dataframe 底层的 NumPy 缓冲区上计算入场 / 出场条件：
+所有比较都用 ufunc 的 out= 写入预分配的暂存数组并原地 AND 合并，
+不再为每个条件生成临时 bool Series、也不再 reduce 合并。
+
+暂存数组按长度复用：超参优化中每个 epoch 对同一交易对重复调用时
+不会产生新的分配。返回的掩码是内部缓冲区的视图，
+需在下一次调用前写入 dataframe（pandas 赋值时会复制）。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from common.compact import categorical_tags
+
+
+def _values(dataframe: DataFrame, column: str) -> np.ndarray:
+    return dataframe[column].to_numpy()
+
+
+class SignalKernel:
+    """入场 / 出场条件的融合计算（每个策略实例持有一个）"""
+
+    def __init__(self):
+        self._buffers: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def _buffer(self, name: str, n: int, dtype=np.bool_) -> np.ndarray:
+        key = (name, n)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            # 长度变化（如新一轮回测）时丢弃旧缓冲区
+            self._buffers = {k: v for k, v in self._buffers.items() if k[1] == n}
+            buffer = np.empty(n, dtype=dtype)
+            self._buffers[key] = buffer
+        return buffer
+
+    def entry(
+        self,
+        dataframe: DataFrame,
+        *,
+        fast_col: str,
+        slope_col: str,
+        slope_threshold: float,
+        pullback_tolerance: float,
+        rsi_oversold: float,
+        rsi_overbought: float,
+        min_adx: Optional[float] = None,
+        advanced: bool = False,
+        trend_filter: bool = False,
+        filter_cols: Sequence[str] = (),
+    ) -> np.ndarray:
+        """
+        回踩入场条件
+
+        uptrend & slope > 阈值 & low <= 快线 * 容忍度 & close > 快线
+        & 超卖 < RSI < 超买 [& ADX > min_adx]
+        [& MACD 柱 > 0 & 量比 > 0.8 [& is_trending]] [& filter_cols 中的布尔列]
+
+        NaN 参与的比较结果为 False，因此指标预热期自动不出信号。
+        """
+        n = len(dataframe)
+        out = self._buffer("entry", n)
+        tmp = self._buffer("tmp", n)
+        scaled = self._buffer("scaled", n, np.float64)
+
+        close = _values(dataframe, "close")
+        ema_fast = _values(dataframe, fast_col)
+        rsi = _values(dataframe, "rsi")
+
+        np.copyto(out, _values(dataframe, "uptrend"), casting="unsafe")
+
+        np.greater(_values(dataframe, slope_col), slope_threshold, out=tmp)
+        out &= tmp
+
+        np.multiply(ema_fast, pullback_tolerance, out=scaled)
+        np.less_equal(_values(dataframe, "low"), scaled, out=tmp)
+        out &= tmp
+
+        np.greater(close, ema_fast, out=tmp)
+        out &= tmp
+
+        np.less(rsi, rsi_overbought, out=tmp)
+        out &= tmp
+        np.greater(rsi, rsi_oversold, out=tmp)
+        out &= tmp
+
+        if min_adx is not None:
+            np.greater(_values(dataframe, "adx"), min_adx, out=tmp)
+            out &= tmp
+
+        if advanced:
+            np.greater(_values(dataframe, "macd_hist"), 0, out=tmp)
+            out &= tmp
+            np.greater(_values(dataframe, "volume_ratio"), 0.8, out=tmp)
+            out &= tmp
+            if trend_filter:
+                np.copyto(tmp, _values(dataframe, "is_trending"), casting="unsafe")
+                out &= tmp
+
+        # 附加过滤（大盘状态 market_ok / 高周期确认 htf_ok 等）
+        for column in filter_cols:
+            np.copyto(tmp, _values(dataframe, column), casting="unsafe")
+            out &= tmp
+
+        return out
+
+    def trend_break(
+        self,
+        dataframe: DataFrame,
+        *,
+        exit_col: str,
+        volatility_ratio: float = 0.0,
+    ) -> np.ndarray:
+        """
+        趋势破坏: 连续两根K线收于出场 EMA 下方 [& 波动率比值 >= 阈值]
+
+        用错位切片代替 shift(1)，不生成平移后的副本。
+        """
+        n = len(dataframe)
+        below = self._buffer("below", n)
+        out = self._buffer("exit", n)
+
+        np.less(_values(dataframe, "close"), _values(dataframe, exit_col), out=below)
+        if n:
+            out[0] = False
+            np.logical_and(below[1:], below[:-1], out=out[1:])
+
+        if volatility_ratio > 0:
+            tmp = self._buffer("tmp", n)
+            np.greater_equal(_values(dataframe, "volatility_ratio"), volatility_ratio, out=tmp)
+            out &= tmp
+
+        return out
+
+
+def write_signal(dataframe: DataFrame, mask: np.ndarray, signal_col: str,
+                 tag_col: Optional[str] = None, tag: Optional[str] = None,
+                 categorical: bool = False) -> DataFrame:
+    """
+    把信号掩码写为 1/0 列，并在信号位置写入标签
+
+    categorical=True 时标签列存为 categorical（精简模式）
+    """
+    dataframe[signal_col] = mask.view(np.int8)
+    if tag_col is not None:
+        dataframe[tag_col] = categorical_tags(mask, tag) if categorical else np.where(mask, tag, None)
+    return dataframe
@@ -0,0 +1,443 @@
+"""
+出场规则快速仿真器（固定止损 + 阶梯止盈 + 追踪止盈 + trend_break）
+
+freqtrade 完整回测逐K线、逐交易调用 Python 回调，对出场参数做大范围
+扫描时太慢。这里在 NumPy 上重放同一族出场规则：
+
+- 输入为带信号列的 dataframe（populate_indicators + populate_entry/exit_trend
+  的输出，按回测区间裁剪后），与 freqtrade 一样信号统一后移一根K线，
+  首行只提供信号、不参与交易
+- 每笔交易按块向量化: 一次性算出块内每根K线的止损候选价、累计最大止损、
+  出场信号 / 长期持仓亏损 / 止损 / ROI / 追踪止损，再按 freqtrade 的优先级
+  取第一个出场事件
+- 出场价格、出场原因、手续费与利润的计算方式与 freqtrade 回测一致
+  （止损在K线最高价处上移，随后用同一根K线的最低价判断是否触发）
+
+与 freqtrade 的差异:
+- 每个交易对独立仿真，不考虑 max_open_trades / 资金占用 / 保护机制；
+  验证时参考回测需令 max_open_trades >= 交易对数量
+- 不做交易所价格精度取整，出场价格可能有极小差异
+
+典型用法（扫描 trend_break 的波动率阈值）::
+
+    kernel = SignalKernel()
+    for ratio in (0.0, 1.2, 1.6, 2.0):
+        exits = kernel.trend_break(df, exit_col="ema_exit", volatility_ratio=ratio)
+        data = SimulationInput.from_dataframe(df, pair, exit=exits)
+        print(ratio, summarize(simulate_pair(data, rules, fee=0.001)))
+"""
+
+from __future__ import annotations
+
+from inspect import signature
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from common.exits import ProfitLockLadder
+
+
+# 单笔交易首个向量化块的长度（未出场则逐块翻倍）
+FIRST_CHUNK = 256
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+TRADE_COLUMNS = (
+    "pair", "open_date", "close_date", "open_rate", "close_rate",
+    "profit_ratio", "exit_reason", "enter_tag", "trade_duration",
+)
+
+
+class ExitRules:
+    """
+    一组出场参数（策略类属性 + 资产阶梯止盈 + 长期持仓规则）
+
+    Args:
+        stoploss: 策略类的固定止损（开仓时的初始止损）
+        ladder: custom_stoploss 使用的阶梯止盈；None 表示不使用自定义止损
+        minimal_roi: {持仓分钟: ROI}
+        refresh_after_fill: custom_stoploss 接受 after_fill 参数时，
+            freqtrade 在开仓成交后立即按开仓价重设止损
+        holding_hours / holding_max_loss: 长期持仓亏损出场（None 表示不启用）
+    """
+
+    __slots__ = (
+        "stoploss", "ladder", "refresh_after_fill",
+        "trailing_stop", "trailing_stop_positive", "trailing_stop_positive_offset",
+        "trailing_only_offset_is_reached",
+        "roi_minutes", "roi_values", "use_exit_signal",
+        "holding_hours", "holding_max_loss",
+    )
+
+    def __init__(
+        self,
+        *,
+        stoploss: float,
+        ladder: Optional[ProfitLockLadder] = None,
+        refresh_after_fill: bool = False,
+        trailing_stop: bool = False,
+        trailing_stop_positive: Optional[float] = None,
+        trailing_stop_positive_offset: float = 0.0,
+        trailing_only_offset_is_reached: bool = False,
+        minimal_roi: Optional[Mapping[Any, float]] = None,
+        use_exit_signal: bool = True,
+        holding_hours: Optional[float] = None,
+        holding_max_loss: Optional[float] = None,
+    ):
+        roi = sorted((int(minutes), float(value)) for minutes, value in (minimal_roi or {}).items())
+        self.stoploss = stoploss
+        self.ladder = ladder
+        self.refresh_after_fill = refresh_after_fill
+        self.trailing_stop = trailing_stop
+        self.trailing_stop_positive = trailing_stop_positive
+        self.trailing_stop_positive_offset = trailing_stop_positive_offset
+        self.trailing_only_offset_is_reached = trailing_only_offset_is_reached
+        self.roi_minutes = np.asarray([m for m, _ in roi], dtype=np.int64)
+        self.roi_values = np.asarray([v for _, v in roi], dtype=np.float64)
+        self.use_exit_signal = use_exit_signal
+        self.holding_hours = holding_hours
+        self.holding_max_loss = holding_max_loss
+
+    @classmethod
+    def from_strategy(cls, strategy: Any, ladder: Optional[ProfitLockLadder] = None,
+                      **overrides: Any) -> "ExitRules":
+        """由策略实例的类属性构造；ladder 为该交易对 custom_stoploss 使用的阶梯"""
+        params: Dict[str, Any] = {
+            "stoploss": strategy.stoploss,
+            "ladder": ladder if strategy.use_custom_stoploss else None,
+            "refresh_after_fill": (
+                strategy.use_custom_stoploss
+                and "after_fill" in signature(strategy.custom_stoploss).parameters
+            ),
+            "trailing_stop": strategy.trailing_stop,
+            "trailing_stop_positive": strategy.trailing_stop_positive,
+            "trailing_stop_positive_offset": strategy.trailing_stop_positive_offset,
+            "trailing_only_offset_is_reached": strategy.trailing_only_offset_is_reached,
+            "minimal_roi": strategy.minimal_roi,
+            "use_exit_signal": strategy.use_exit_signal,
+        }
+        params.update(overrides)
+        return cls(**params)
+
+    def custom_stoploss(self, profits: np.ndarray) -> np.ndarray:
+        return self.ladder.stoploss_array(profits)
+
+    def roi_at(self, minutes: np.ndarray) -> np.ndarray:
+        """各持仓时长对应的 ROI 档位（尚无生效档位时为 inf）"""
+        idx = np.searchsorted(self.roi_minutes, minutes, side="right") - 1
+        if len(self.roi_values) == 0:
+            return np.full(np.shape(minutes), np.inf)
+        return np.where(idx >= 0, self.roi_values[np.maximum(idx, 0)], np.inf)
+
+
+class SimulationInput:
+    """
+    单个交易对的仿真输入（只提取一次，扫描多组出场参数时复用）
+
+    entry_index 为可开仓的K线下标（前一根K线有入场信号且无出场信号，
+    且不是最后一根K线）；exit_signal 为已后移的出场信号。
+    """
+
+    __slots__ = (
+        "pair", "dates", "open", "high", "low", "timeframe_minutes",
+        "entry_index", "exit_signal", "enter_tags", "exit_tags",
+    )
+
+    def __init__(self, pair: str, dates: np.ndarray, open_: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, enter: np.ndarray, exit_: np.ndarray,
+                 enter_tags: Optional[np.ndarray], exit_tags: Optional[np.ndarray],
+                 timeframe_minutes: int):
+        n = len(dates)
+        self.pair = pair
+        self.dates = dates
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.timeframe_minutes = timeframe_minutes
+
+        shifted_enter = np.zeros(n, dtype=np.bool_)
+        shifted_exit = np.zeros(n, dtype=np.bool_)
+        shifted_enter[1:] = enter[:-1]
+        shifted_exit[1:] = exit_[:-1]
+
+        can_enter = shifted_enter & ~shifted_exit
+        if n:
+            can_enter[-1] = False
+        self.entry_index = np.flatnonzero(can_enter)
+        self.exit_signal = shifted_exit & ~shifted_enter
+        self.enter_tags = enter_tags
+        self.exit_tags = exit_tags
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        dataframe: DataFrame,
+        pair: str,
+        *,
+        timeframe_minutes: int = 60,
+        enter: Optional[np.ndarray] = None,
+        exit: Optional[np.ndarray] = None,
+    ) -> "SimulationInput":
+        """
+        Args:
+            dataframe: 已按回测区间裁剪、含 OHLC 与信号列的 dataframe
+            enter / exit: 覆盖 enter_long / exit_long（扫描信号参数时使用）
+        """
+        if enter is None:
+            enter = _signal(dataframe, "enter_long")
+        if exit is None:
+            exit = _signal(dataframe, "exit_long")
+        return cls(
+            pair,
+            pd.DatetimeIndex(dataframe["date"]).as_unit("ns").asi8,
+            dataframe["open"].to_numpy(dtype=np.float64),
+            dataframe["high"].to_numpy(dtype=np.float64),
+            dataframe["low"].to_numpy(dtype=np.float64),
+            np.asarray(enter, dtype=np.bool_),
+            np.asarray(exit, dtype=np.bool_),
+            _tags(dataframe, "enter_tag"),
+            _tags(dataframe, "exit_tag"),
+            timeframe_minutes,
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def _signal(dataframe: DataFrame, column: str) -> np.ndarray:
+    if column not in dataframe.columns:
+        return np.zeros(len(dataframe), dtype=np.bool_)
+    return dataframe[column].fillna(0).to_numpy() == 1
+
+
+def _tags(dataframe: DataFrame, column: str) -> Optional[np.ndarray]:
+    if column not in dataframe.columns:
+        return None
+    return dataframe[column].to_numpy(dtype=object)
+
+
+def _tag(tags: Optional[np.ndarray], index: int) -> Optional[str]:
+    if tags is None or index < 0:
+        return None
+    tag = tags[index]
+    return tag if isinstance(tag, str) and tag else None
+
+
+def _profit(rates: Any, open_value: float, fee: float) -> Any:
+    """与 Trade.calc_profit_ratio 一致（含双边手续费，保留 8 位小数）"""
+    return np.round(rates * (1 - fee) / open_value - 1, 8)
+
+
+def _simulate_trade(data: SimulationInput, j: int, rules: ExitRules,
+                    fee: float) -> Tuple[int, float, str]:
+    """从第 j 根K线开盘价开仓，返回 (出场K线下标, 出场价格, 出场原因)"""
+    n = len(data)
+    open_rate = data.open[j]
+    open_value = open_rate * (1 + fee)
+    open_ns = data.dates[j]
+
+    # 开仓成交后的止损（custom_stoploss 支持 after_fill 时按开仓价刷新）
+    stop_pct = rules.stoploss
+    if rules.refresh_after_fill and rules.ladder is not None:
+        stop_pct = rules.ladder.stoploss_at(float(_profit(open_rate, open_value, fee)))
+    initial_stop = open_rate * (1 - abs(stop_pct))
+
+    offset = rules.trailing_stop_positive_offset
+    holding_ns = (None if rules.holding_hours is None
+                  else open_ns + int(rules.holding_hours * 60 * _NS_PER_MINUTE))
+
+    carry = initial_stop
+    start = j
+    size = FIRST_CHUNK
+    while start < n:
+        stop = min(start + size, n)
+        high = data.high[start:stop]
+        low = data.low[start:stop]
+        opens = data.open[start:stop]
+
+        # ---- 止损上移: 以K线最高价为基准 ----
+        profit_high = _profit(high, open_value, fee)
+        if rules.ladder is not None:
+            candidate = high * (1 - np.abs(rules.custom_stoploss(profit_high)))
+        elif rules.trailing_stop and not rules.trailing_only_offset_is_reached:
+            candidate = high * (1 - abs(rules.stoploss))
+        else:
+            candidate = np.full(len(high), -np.inf)
+        if rules.trailing_stop and rules.trailing_stop_positive is not None:
+            armed = profit_high > offset
+            candidate = np.where(
+                armed, np.maximum(candidate, high * (1 - abs(rules.trailing_stop_positive))), candidate
+            )
+
+        stop_after = np.maximum.accumulate(np.maximum(candidate, carry))
+        stop_before = np.empty_like(stop_after)
+        stop_before[0] = carry
+        stop_before[1:] = stop_after[:-1]
+        # 上一根K线留下的止损已高于最低价时，本根K线不再上移
+        hit_before = stop_before >= low
+        stop_level = np.where(hit_before, stop_before, stop_after)
+        stop_hit = stop_level >= low
+        trailing = stop_level > initial_stop
+
+        # ---- 出场信号 / 长期持仓亏损（按开盘价）----
+        if rules.use_exit_signal:
+            signal_exit = data.exit_signal[start:stop]
+            if holding_ns is not None:
+                custom_exit = (
+                    ~signal_exit
+                    & (data.dates[start:stop] > holding_ns)
+                    & (_profit(opens, open_value, fee) < rules.holding_max_loss)
+                )
+            else:
+                custom_exit = np.zeros(len(high), dtype=np.bool_)
+        else:
+            signal_exit = custom_exit = np.zeros(len(high), dtype=np.bool_)
+
+        # ---- ROI（按最高价）----
+        minutes = (data.dates[start:stop] - open_ns) // _NS_PER_MINUTE
+        roi_hit = profit_high > rules.roi_at(minutes)
+
+        events = np.flatnonzero(signal_exit | custom_exit | stop_hit | roi_hit)
+        if len(events) == 0:
+            carry = stop_after[-1]
+            start = stop
+            size *= 2
+            continue
+
+        k = events[0]
+        m = start + k
+        # 优先级: 出场信号 > 自定义出场 > 固定止损 > ROI > 追踪止损
+        if signal_exit[k]:
+            return m, data.open[m], _tag(data.exit_tags, m - 1) or "exit_signal"
+        if custom_exit[k]:
+            return m, data.open[m], "long_holding_loss"
+        if stop_hit[k] and not trailing[k]:
+            return m, _stop_rate(data, m, stop_level[k]), "stop_loss"
+        if roi_hit[k]:
+            return m, _roi_rate(data, m, rules, minutes[k], open_value, fee), "roi"
+        if m == j:
+            return m, _entry_candle_trailing_rate(data, m, rules, open_value, fee, stop_pct), \
+                "trailing_stop_loss"
+        return m, _stop_rate(data, m, stop_level[k]), "trailing_stop_loss"
+
+    # 区间结束仍未出场: 按最后一根K线开盘价强制平仓
+    return n - 1, data.open[n - 1], "force_exit"
+
+
+def _stop_rate(data: SimulationInput, m: int, stop_level: float) -> float:
+    # 止损价高于整根K线（跳空）时按开盘价成交
+    if stop_level > data.high[m]:
+        return data.open[m]
+    return stop_level
+
+
+def _roi_rate(data: SimulationInput, m: int, rules: ExitRules, minutes: int,
+              open_value: float, fee: float) -> float:
+    idx = np.searchsorted(rules.roi_minutes, minutes, side="right") - 1
+    roi_entry = int(rules.roi_minutes[idx])
+    close_rate = (1 + rules.roi_values[idx]) * open_value / (1 - fee)
+    # 新的 ROI 档位恰在本根K线开盘生效且开盘价已高于目标价
+    if (minutes > 0 and minutes == roi_entry and roi_entry % data.timeframe_minutes == 0
+            and data.open[m] > close_rate):
+        return data.open[m]
+    return min(max(close_rate, data.low[m]), data.high[m])
+
+
+def _entry_candle_trailing_rate(data: SimulationInput, m: int, rules: ExitRules,
+                                open_value: float, fee: float, stop_pct: float) -> float:
+    """开仓K线内即触发追踪止损: 按 freqtrade 的最悲观假设计算出场价"""
+    if (rules.ladder is None and rules.trailing_only_offset_is_reached
+            and rules.trailing_stop_positive):
+        rate = data.open[m] * (1 + abs(rules.trailing_stop_positive_offset)
+                               - abs(rules.trailing_stop_positive))
+        return max(data.low[m], rate)
+
+    # 重放本根K线的止损上移顺序，得到最后一次生效的止损比例
+    high = data.high[m]
+    level = data.open[m] * (1 - abs(stop_pct))
+    profit = float(_profit(high, open_value, fee))
+    if rules.ladder is not None:
+        custom = rules.ladder.stoploss_at(profit)
+        if high * (1 - abs(custom)) > level:
+            level, stop_pct = high * (1 - abs(custom)), custom
+    if rules.trailing_stop_positive is not None and profit > rules.trailing_stop_positive_offset:
+        if high * (1 - abs(rules.trailing_stop_positive)) > level:
+            stop_pct = rules.trailing_stop_positive
+    return max(data.low[m], data.open[m] * (1 - abs(stop_pct)))
+
+
+def simulate_pair(data: SimulationInput, rules: ExitRules, fee: float) -> List[tuple]:
+    """
+    单个交易对的仿真
+
+    同一交易对同时只持有一笔交易；出场K线之后的下一根K线才能再次开仓。
+
+    Returns:
+        交易记录列表，字段顺序同 TRADE_COLUMNS
+    """
+    trades: List[tuple] = []
+    entries = data.entry_index
+    k = 0
+    while k < len(entries):
+        j = int(entries[k])
+        m, close_rate, reason = _simulate_trade(data, j, rules, fee)
+        open_rate = data.open[j]
+        trades.append((
+            data.pair,
+            data.dates[j],
+            data.dates[m],
+            open_rate,
+            close_rate,
+            float(_profit(close_rate, open_rate * (1 + fee), fee)),
+            reason,
+            _tag(data.enter_tags, j - 1),
+            int((data.dates[m] - data.dates[j]) // _NS_PER_MINUTE),
+        ))
+        k = int(np.searchsorted(entries, m + 1))
+    return trades
+
+
+def simulate(
+    frames: Mapping[str, DataFrame],
+    rules_for: Callable[[str], ExitRules],
+    fee: float,
+    timeframe_minutes: int = 60,
+) -> DataFrame:
+    """
+    多交易对仿真，返回与 freqtrade 回测结果同名字段的交易表
+
+    Args:
+        frames: {交易对: 已按回测区间裁剪、含信号列的 dataframe}
+        rules_for: 交易对 → 出场参数（如 strategy.exit_rules）
+    """
+    trades: List[tuple] = []
+    for pair, dataframe in frames.items():
+        data = SimulationInput.from_dataframe(dataframe, pair, timeframe_minutes=timeframe_minutes)
+        trades.extend(simulate_pair(data, rules_for(pair), fee))
+
+    result = DataFrame.from_records(trades, columns=list(TRADE_COLUMNS))
+    for column in ("open_date", "close_date"):
+        result[column] = pd.to_datetime(result[column].astype(np.int64), unit="ns", utc=True)
+    return result.sort_values(["open_date", "pair"], ignore_index=True)
+
+
+def summarize(trades: Any) -> Dict[str, float]:
+    """交易列表 / 交易表的汇总指标（参数扫描时用于排序）"""
+    if isinstance(trades, DataFrame):
+        profits = trades["profit_ratio"].to_numpy(dtype=np.float64)
+    else:
+        profits = np.fromiter((t[5] for t in trades), dtype=np.float64)
+    if len(profits) == 0:
+        return {"trades": 0, "profit_sum": 0.0, "profit_mean": 0.0,
+                "winrate": 0.0, "max_drawdown": 0.0}
+    equity = np.cumsum(profits)
+    drawdown = np.maximum.accumulate(np.maximum(equity, 0.0)) - equity
+    return {
+        "trades": len(profits),
+        "profit_sum": float(equity[-1]),
+        "profit_mean": float(profits.mean()),
+        "winrate": float((profits > 0).mean()),
+        "max_drawdown": float(drawdown.max()),
+    }
@@ -0,0 +1,96 @@
+"""
+流式指标状态快照（实盘 / 模拟盘快速重启）
+
+每次修改策略或配置都要重启容器。没有快照时，重启后的第一轮需要把
+startup_candle_count 根K线逐根推入流式引擎重新预热。
+
+快照把每个交易对的递推状态与已输出的指标历史（含最后一根K线时间）
+写入 user_data/indicator_state 下的单个文件。重启后只要以下内容未变:
+
+- 指标代码（common.streaming 源码摘要）
+- 时间周期与输出列
+- 该交易对的 EMA 周期（由流式引擎在 populate 时逐对校验）
+
+引擎就从快照接着推入停机期间缺失的K线，而不是整段重算。
+停机时间超过 dataframe 覆盖范围、数据断档等情况下照常整段预热。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict
+
+from common import streaming
+from common.streaming import STREAM_COLUMNS, PairIndicatorStream
+
+
+logger = logging.getLogger(__name__)
+
+# 快照文件格式版本（PairIndicatorStream 的序列化结构变化时递增）
+SNAPSHOT_VERSION = 1
+
+
+def source_digest(*modules: ModuleType) -> str:
+    """模块源码摘要：指标递推代码改动后旧快照自动作废"""
+    digest = hashlib.blake2b(digest_size=12)
+    for module in modules:
+        digest.update(Path(module.__file__).read_bytes())
+    return digest.hexdigest()
+
+
+class IndicatorSnapshot:
+    """
+    流式引擎状态的快照文件
+
+    Args:
+        path: 快照文件路径
+        timeframe: 策略时间周期
+    """
+
+    def __init__(self, path: Path, timeframe: str):
+        self.path = Path(path)
+        self.header = {
+            "version": SNAPSHOT_VERSION,
+            "code": source_digest(streaming),
+            "timeframe": timeframe,
+            "columns": STREAM_COLUMNS,
+        }
+
+    def load(self) -> Dict[str, PairIndicatorStream]:
+        """读取快照；不存在、损坏或校验不符时返回空字典"""
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("rb") as handle:
+                payload: Dict[str, Any] = pickle.load(handle)
+        except Exception as exc:  # 文件损坏 / 旧版本类结构
+            logger.warning("指标快照 %s 无法读取，将重新预热: %s", self.path, exc)
+            return {}
+        if payload.get("header") != self.header:
+            logger.info("指标快照 %s 与当前代码或配置不符，将重新预热", self.path)
+            return {}
+        streams = payload.get("streams", {})
+        logger.info("已从快照恢复 %d 个交易对的指标状态", len(streams))
+        return streams
+
+    def save(self, streams: Dict[str, PairIndicatorStream]) -> None:
+        """
+        原子写入（先写临时文件再替换），中途崩溃不会留下半个快照
+
+        写入失败只记录警告，不影响交易（下次重启时整段预热）
+        """
+        temp = self.path.with_suffix(self.path.suffix + ".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with temp.open("wb") as handle:
+                pickle.dump({"header": self.header, "streams": streams}, handle,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, self.path)
+        except OSError as exc:
+            logger.warning("指标快照 %s 写入失败: %s", self.path, exc)
+
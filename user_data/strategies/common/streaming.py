@@ -0,0 +1,554 @@
+"""
+流式增量指标引擎
+
+实盘 / 模拟盘中每根新K线只需把最新一根K线推入各指标的递推状态，
+而不必对整段 350+ 根K线重新调用 talib。
+
+递推公式与 TA-Lib 的实现逐步对应:
+- EMA:   以前 period 根收盘价的 SMA 作为种子，之后 (x - prev) * k + prev
+- RSI:   Wilder 平滑的平均涨幅 / 平均跌幅
+- ATR:   以 TR[1..period] 的均值为种子，之后 Wilder 平滑
+- ADX:   +DM / -DM / TR 的 Wilder 累加，前 period 个 DX 的均值为种子
+- MACD:  快线种子取慢线种子位置前 fast 根收盘价（与 TA_MACD 对齐）
+- 滚动均值 / 标准差: 环形缓冲区 + 滑动累加
+
+因此在同一起点上增量结果与 talib 全量重算一致（仅有浮点累加误差）。
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+
+NAN = float("nan")
+
+# 与 TA-Lib 的 TA_IS_ZERO / TA_IS_ZERO_OR_NEG 保持一致
+_EPSILON = 0.00000001
+
+
+def _is_zero(value: float) -> bool:
+    return -_EPSILON < value < _EPSILON
+
+
+def _div(numerator: float, denominator: float) -> float:
+    """按 pandas 语义做除法：除以 0 得到 inf / nan，而不是抛异常"""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+# ============================================================
+# 基础递推状态
+# ============================================================
+class EmaState:
+    """EMA 递推状态（前导 NaN 跳过，与 talib 的 begidx 处理一致）"""
+
+    __slots__ = ("period", "k", "count", "seed_sum", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = NAN
+
+    def seed(self, value: float) -> None:
+        """直接以给定值作为种子（用于 MACD 快线的对齐种子）"""
+        self.count = self.period
+        self.value = value
+
+    def update(self, x: float) -> float:
+        if self.count < self.period:
+            if math.isnan(x):
+                return NAN
+            self.seed_sum += x
+            self.count += 1
+            if self.count == self.period:
+                self.value = self.seed_sum / self.period
+                return self.value
+            return NAN
+        self.value = (x - self.value) * self.k + self.value
+        return self.value
+
+
+class RsiState:
+    """RSI 递推状态（Wilder 平滑）"""
+
+    __slots__ = ("period", "prev_close", "count", "gain", "loss")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = NAN
+        self.count = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def _value(self) -> float:
+        total = self.gain + self.loss
+        if _is_zero(total):
+            return 0.0
+        return 100.0 * (self.gain / total)
+
+    def update(self, close: float) -> float:
+        if math.isnan(self.prev_close):
+            self.prev_close = close
+            return NAN
+        diff = close - self.prev_close
+        self.prev_close = close
+        period = self.period
+
+        if self.count < period:
+            if diff < 0:
+                self.loss -= diff
+            else:
+                self.gain += diff
+            self.count += 1
+            if self.count < period:
+                return NAN
+            self.gain /= period
+            self.loss /= period
+            return self._value()
+
+        self.loss *= period - 1
+        self.gain *= period - 1
+        if diff < 0:
+            self.loss -= diff
+        else:
+            self.gain += diff
+        self.loss /= period
+        self.gain /= period
+        return self._value()
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    value = high - low
+    value = max(value, abs(high - prev_close))
+    return max(value, abs(low - prev_close))
+
+
+class AtrState:
+    """ATR 递推状态（TR 均值种子 + Wilder 平滑）"""
+
+    __slots__ = ("period", "prev_close", "count", "value")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = NAN
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if math.isnan(self.prev_close):
+            self.prev_close = close
+            return NAN
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_close = close
+        period = self.period
+
+        if self.count < period:
+            self.value += tr
+            self.count += 1
+            if self.count < period:
+                return NAN
+            self.value /= period
+            return self.value
+
+        self.value = (self.value * (period - 1) + tr) / period
+        return self.value
+
+
+class AdxState:
+    """ADX 递推状态（按 TA_ADX 的三段式流程）"""
+
+    __slots__ = (
+        "period", "count", "prev_high", "prev_low", "prev_close",
+        "plus_dm", "minus_dm", "tr", "sum_dx", "value",
+    )
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.sum_dx = 0.0
+        self.value = NAN
+
+    def _dx(self) -> Optional[float]:
+        if _is_zero(self.tr):
+            return None
+        minus_di = 100.0 * (self.minus_dm / self.tr)
+        plus_di = 100.0 * (self.plus_dm / self.tr)
+        total = minus_di + plus_di
+        if _is_zero(total):
+            return None
+        return 100.0 * (abs(minus_di - plus_di) / total)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        count = self.count
+        self.count += 1
+        if count == 0:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return NAN
+
+        period = self.period
+        diff_p = high - self.prev_high
+        diff_m = self.prev_low - low
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        # 阶段1: 前 period-1 根直接累加
+        if count < period:
+            if diff_m > 0 and diff_p < diff_m:
+                self.minus_dm += diff_m
+            elif diff_p > 0 and diff_p > diff_m:
+                self.plus_dm += diff_p
+            self.tr += tr
+            return NAN
+
+        # 阶段2 / 3: Wilder 平滑
+        self.minus_dm -= self.minus_dm / period
+        self.plus_dm -= self.plus_dm / period
+        if diff_m > 0 and diff_p < diff_m:
+            self.minus_dm += diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            self.plus_dm += diff_p
+        self.tr = self.tr - self.tr / period + tr
+        dx = self._dx()
+
+        if count < 2 * period:
+            if dx is not None:
+                self.sum_dx += dx
+            if count < 2 * period - 1:
+                return NAN
+            self.value = self.sum_dx / period
+            return self.value
+
+        if dx is not None:
+            self.value = (self.value * (period - 1) + dx) / period
+        return self.value
+
+
+class RollingMean:
+    """
+    滚动均值（等价于 pandas rolling(window).mean()）
+
+    窗口内只要有 NaN 即输出 NaN；累加和每绕环一圈从缓冲区重算一次，
+    避免长时间运行的浮点漂移，均摊成本仍为 O(1)。
+    """
+
+    __slots__ = ("window", "buffer", "pos", "filled", "total", "nan_count")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = [NAN] * window
+        self.pos = 0
+        self.filled = 0
+        self.total = 0.0
+        self.nan_count = 0
+
+    def update(self, x: float) -> float:
+        old = self.buffer[self.pos]
+        if self.filled == self.window:
+            if math.isnan(old):
+                self.nan_count -= 1
+            else:
+                self.total -= old
+        else:
+            self.filled += 1
+        self.buffer[self.pos] = x
+        if math.isnan(x):
+            self.nan_count += 1
+        else:
+            self.total += x
+
+        self.pos += 1
+        if self.pos == self.window:
+            self.pos = 0
+            self.total = math.fsum(v for v in self.buffer if not math.isnan(v))
+
+        if self.filled < self.window or self.nan_count:
+            return NAN
+        return self.total / self.window
+
+
+class BollingerState:
+    """布林带（SMA 中轨 + 总体标准差），返回 (upper, middle, lower)"""
+
+    __slots__ = ("window", "nbdev", "buffer", "pos", "filled", "total", "total_sq")
+
+    def __init__(self, window: int = 20, nbdev: float = 2.0):
+        self.window = window
+        self.nbdev = nbdev
+        self.buffer = [0.0] * window
+        self.pos = 0
+        self.filled = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        old = self.buffer[self.pos]
+        if self.filled == self.window:
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.filled += 1
+        self.buffer[self.pos] = x
+        self.total += x
+        self.total_sq += x * x
+
+        self.pos += 1
+        if self.pos == self.window:
+            self.pos = 0
+            self.total = math.fsum(self.buffer)
+            self.total_sq = math.fsum(v * v for v in self.buffer)
+
+        if self.filled < self.window:
+            return NAN, NAN, NAN
+        middle = self.total / self.window
+        variance = self.total_sq / self.window - middle * middle
+        std = math.sqrt(variance) if variance >= _EPSILON else 0.0
+        return middle + self.nbdev * std, middle, middle - self.nbdev * std
+
+
+class MacdState:
+    """
+    MACD 递推状态，返回 (macd, signal, hist)
+
+    TA_MACD 的快线并非从第 0 根开始，而是在慢线出种子的那根K线上
+    取最近 fast 根收盘价的 SMA 作为种子；信号线则以最早 signal 根 MACD
+    的 SMA 为种子。三个输出在信号线就绪前均为 NaN。
+    """
+
+    __slots__ = ("slow_period", "closes", "fast_ema", "slow_ema", "signal_ema")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.slow_period = slow
+        self.closes: deque = deque(maxlen=fast)
+        self.fast_ema = EmaState(fast)
+        self.slow_ema = EmaState(slow)
+        self.signal_ema = EmaState(signal)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        seeded = self.slow_ema.count >= self.slow_period
+        self.closes.append(close)
+        slow = self.slow_ema.update(close)
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+        if not seeded:
+            self.fast_ema.seed(math.fsum(self.closes) / len(self.closes))
+            fast = self.fast_ema.value
+        else:
+            fast = self.fast_ema.update(close)
+
+        macd = fast - slow
+        signal = self.signal_ema.update(macd)
+        if math.isnan(signal):
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+
+# ============================================================
+# 单个交易对的完整指标流
+# ============================================================
+# 流式引擎输出的列（顺序固定，对应 history 的列）
+STREAM_COLUMNS: Tuple[str, ...] = (
+    "ema_fast", "ema_slow", "ema_trend", "ema_exit",
+    "rsi", "atr", "atr_pct", "volatility_ratio", "slope",
+    "adx", "bb_width", "bb_width_sma", "adx_sma",
+    "macd", "macd_signal", "macd_hist",
+    "volume_sma", "volume_ratio",
+)
+
+
+class PairIndicatorStream:
+    """
+    单个交易对的指标递推状态 + 已输出的指标历史
+
+    Args:
+        periods: (ema_fast, ema_slow, ema_trend, ema_exit) 周期
+    """
+
+    def __init__(self, periods: Tuple[int, int, int, int]):
+        self.periods = periods
+        self.emas = [EmaState(p) for p in periods]
+        self.rsi = RsiState(14)
+        self.atr = AtrState(14)
+        self.adx = AdxState(14)
+        self.atr_pct_sma = RollingMean(50)
+        self.slow_history: deque = deque([NAN] * 11, maxlen=11)
+        self.bbands = BollingerState(20, 2.0)
+        self.bb_width_sma = RollingMean(50)
+        self.adx_sma = RollingMean(10)
+        self.macd = MacdState(12, 26, 9)
+        self.volume_sma = RollingMean(20)
+
+        # 已输出指标的历史（按K线时间对齐到 dataframe）
+        self.dates = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, len(STREAM_COLUMNS)), dtype=np.float64)
+        self._size = 0
+
+    def __getstate__(self):
+        # 快照只保存有效部分，不保存预留容量
+        state = self.__dict__.copy()
+        state["dates"] = self.dates[:self._size].copy()
+        state["values"] = self.values[:self._size].copy()
+        return state
+
+    @property
+    def last_date(self) -> Optional[int]:
+        return int(self.dates[self._size - 1]) if self._size else None
+
+    def update(self, high: float, low: float, close: float, volume: float) -> Tuple[float, ...]:
+        """推入一根K线，返回 STREAM_COLUMNS 顺序的指标值"""
+        ema_fast, ema_slow, ema_trend, ema_exit = (ema.update(close) for ema in self.emas)
+        rsi = self.rsi.update(close)
+        atr = self.atr.update(high, low, close)
+        atr_pct = _div(atr, close) * 100
+        volatility_ratio = _div(atr_pct, self.atr_pct_sma.update(atr_pct))
+
+        self.slow_history.append(ema_slow)
+        slow_prev = self.slow_history[0]
+        slope = _div(ema_slow - slow_prev, slow_prev) * 100
+
+        adx = self.adx.update(high, low, close)
+        upper, middle, lower = self.bbands.update(close)
+        bb_width = _div(upper - lower, middle)
+        bb_width_sma = self.bb_width_sma.update(bb_width)
+        adx_sma = self.adx_sma.update(adx)
+
+        macd, macd_signal, macd_hist = self.macd.update(close)
+        volume_sma = self.volume_sma.update(volume)
+        volume_ratio = _div(volume, volume_sma)
+
+        return (
+            ema_fast, ema_slow, ema_trend, ema_exit,
+            rsi, atr, atr_pct, volatility_ratio, slope,
+            adx, bb_width, bb_width_sma, adx_sma,
+            macd, macd_signal, macd_hist,
+            volume_sma, volume_ratio,
+        )
+
+    def extend(self, dates: np.ndarray, high: np.ndarray, low: np.ndarray,
+               close: np.ndarray, volume: np.ndarray, keep: int) -> None:
+        """依次推入多根K线，并把历史裁剪到最近 keep 根"""
+        n = len(dates)
+        if n == 0:
+            return
+        self._reserve(n, keep)
+        update = self.update
+        for i in range(n):
+            self.values[self._size + i] = update(
+                float(high[i]), float(low[i]), float(close[i]), float(volume[i])
+            )
+        self.dates[self._size:self._size + n] = dates
+        self._size += n
+
+    def _reserve(self, n: int, keep: int) -> None:
+        # 写满时把最近 keep 根搬到头部；容量按 2 * keep 预留（均摊 O(1)）
+        if self._size + n > len(self.dates) and self._size > keep:
+            drop = self._size - keep
+            self.dates[:keep] = self.dates[drop:self._size]
+            self.values[:keep] = self.values[drop:self._size]
+            self._size = keep
+        capacity = max(2 * keep, self._size + n)
+        if len(self.dates) < capacity:
+            dates = np.empty(capacity, dtype=np.int64)
+            values = np.empty((capacity, len(STREAM_COLUMNS)), dtype=np.float64)
+            dates[:self._size] = self.dates[:self._size]
+            values[:self._size] = self.values[:self._size]
+            self.dates, self.values = dates, values
+
+    def window(self, dates: np.ndarray) -> Optional[np.ndarray]:
+        """取出与给定K线时间完全对齐的指标历史，无法对齐时返回 None"""
+        n = len(dates)
+        start = self._size - n
+        if n == 0 or start < 0:
+            return None
+        if not np.array_equal(self.dates[start:self._size], dates):
+            return None
+        return self.values[start:self._size]
+
+
+# ============================================================
+# 多交易对流式引擎
+# ============================================================
+class StreamingIndicatorEngine:
+    """
+    按交易对维护 PairIndicatorStream
+
+    每次调用时只把 dataframe 中比上次更新的K线推入递推状态；
+    若周期变化、数据出现断档或历史无法对齐，则对整段数据重新预热。
+    """
+
+    def __init__(self):
+        self._streams: Dict[str, PairIndicatorStream] = {}
+        # 自上次 snapshot() 以来是否推入过新K线
+        self.dirty = False
+
+    def reset(self, pair: Optional[str] = None) -> None:
+        if pair is None:
+            self._streams.clear()
+        else:
+            self._streams.pop(pair, None)
+        self.dirty = True
+
+    def stream(self, pair: str) -> Optional[PairIndicatorStream]:
+        """该交易对当前的递推状态（只读使用）"""
+        return self._streams.get(pair)
+
+    def snapshot(self) -> Dict[str, PairIndicatorStream]:
+        """当前各交易对的状态（供 common.snapshot 持久化）"""
+        self.dirty = False
+        return dict(self._streams)
+
+    def restore(self, streams: Dict[str, PairIndicatorStream]) -> None:
+        """载入快照中的状态；周期或K线无法对齐的交易对在 populate 时自动重新预热"""
+        self._streams.update(streams)
+
+    def populate(self, pair: str, dataframe: DataFrame,
+                 periods: Tuple[int, int, int, int]) -> DataFrame:
+        """把 STREAM_COLUMNS 写入 dataframe（原地修改并返回）"""
+        dates = dataframe["date"].values.astype("datetime64[ns]").view(np.int64)
+        high = dataframe["high"].to_numpy(dtype=np.float64)
+        low = dataframe["low"].to_numpy(dtype=np.float64)
+        close = dataframe["close"].to_numpy(dtype=np.float64)
+        volume = dataframe["volume"].to_numpy(dtype=np.float64)
+        keep = len(dataframe)
+
+        stream = self._streams.get(pair)
+        start = None
+        if stream is not None and stream.periods == periods and stream.last_date is not None:
+            pos = int(np.searchsorted(dates, stream.last_date))
+            if pos < len(dates) and dates[pos] == stream.last_date:
+                start = pos + 1
+
+        if start is None or start < len(dates):
+            self.dirty = True
+
+        if start is not None:
+            stream.extend(dates[start:], high[start:], low[start:],
+                          close[start:], volume[start:], keep)
+            values = stream.window(dates)
+        else:
+            values = None
+
+        if values is None:
+            stream = PairIndicatorStream(periods)
+            stream.extend(dates, high, low, close, volume, keep)
+            self._streams[pair] = stream
+            values = stream.window(dates)
+
+        for j, column in enumerate(STREAM_COLUMNS):
+            dataframe[column] = values[:, j]
+        return dataframe
@@ -0,0 +1,290 @@
+"""
+预先算好的触发价带（实盘 / 模拟盘）
+
+回踩入场与 trend_break 出场的条件几乎都只通过收盘价依赖新K线:
+EMA、RSI（Wilder）、MACD 的递推对收盘价是线性 / 分段线性的，可以反解。
+因此在上一根K线分析完后，就能由流式指标的递推状态算出下一根K线的
+收盘价区间 (close_min, close_max):
+
+- close > EMA_fast'          ⇔ close > EMA_fast（EMA' = EMA + k (close - EMA)）
+- EMA_fast' > EMA_slow' > EMA_trend'、slope' > 阈值、MACD 柱' > 0
+                             ⇔ 收盘价的线性不等式
+- 超卖 < RSI' < 超买          ⇔ 收盘价的上下界（RSI' 随收盘价单调递增）
+- low <= EMA_fast' * 容忍度   ⇔ low <= a + b * close
+- 量比' > 0.8                 ⇔ volume > 阈值（只与成交量有关）
+
+ADX / is_trending / 波动率比值 还依赖最高价、最低价，无法只用收盘价反解，
+收盘时直接读流式引擎刚更新的那一行；大盘过滤 / 高周期确认列同样只读一次。
+
+收盘时最后一根K线的信号就只是几次比较；之前各K线的信号沿用上一次分析
+写出的结果（窗口前移一根时直接复用），不再对整段运行信号内核。
+状态未就绪、档案变化或窗口无法对齐时返回 None，由调用方回退到信号内核。
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from common.streaming import PairIndicatorStream
+
+
+INF = math.inf
+
+
+def _dates_ns(dataframe: DataFrame) -> np.ndarray:
+    return dataframe["date"].values.astype("datetime64[ns]", copy=False).view(np.int64)
+
+
+def _last(dataframe: DataFrame, column: str) -> float:
+    return float(dataframe[column].iat[-1])
+
+
+class _Interval:
+    """收盘价的开区间，逐个叠加线性约束 a + b * close > 0"""
+
+    __slots__ = ("low", "high")
+
+    def __init__(self):
+        self.low = -INF
+        self.high = INF
+
+    def above(self, a: float, b: float) -> None:
+        if b > 0:
+            self.low = max(self.low, -a / b)
+        elif b < 0:
+            self.high = min(self.high, -a / b)
+        elif not a > 0:
+            self.low, self.high = INF, -INF
+
+    def between(self, low: float, high: float) -> None:
+        self.low = max(self.low, low)
+        self.high = min(self.high, high)
+
+
+def _ema_line(state) -> Tuple[float, float]:
+    """EMA' = value + k (close - value) = 截距 + 斜率 * close"""
+    return state.value * (1.0 - state.k), state.k
+
+
+def _rsi_close(state, ratio: float) -> float:
+    """RSI' = 100 * ratio 时的收盘价（Wilder 平滑，RSI' 随收盘价单调递增）"""
+    if ratio <= 0:
+        return -INF
+    if ratio >= 1:
+        return INF
+    period = state.period
+    gain = state.gain * (period - 1)
+    loss = state.loss * (period - 1)
+    if gain / (gain + loss) <= ratio:
+        diff = ratio * loss / (1.0 - ratio) - gain
+    else:
+        diff = gain + loss - gain / ratio
+    return state.prev_close + diff
+
+
+def _seeded(*states) -> bool:
+    return all(state.count >= state.period and not math.isnan(state.value) for state in states)
+
+
+# ============================================================
+# 触发价带
+# ============================================================
+class EntryBand:
+    """
+    下一根K线的回踩入场条件
+
+    fires(dataframe) 只读最后一行: close / low / volume 与价带比较，
+    其余无法反解的条件读刚更新的指标列。
+    """
+
+    __slots__ = ("date", "profile", "close_min", "close_max", "low_base", "low_slope",
+                 "volume_min", "min_adx", "trend_filter", "filter_cols")
+
+    def fires(self, dataframe: DataFrame) -> bool:
+        close = _last(dataframe, "close")
+        if not self.close_min < close < self.close_max:
+            return False
+        if not _last(dataframe, "low") <= self.low_base + self.low_slope * close:
+            return False
+        if self.volume_min is not None and not _last(dataframe, "volume") > self.volume_min:
+            return False
+        if self.min_adx is not None and not _last(dataframe, "adx") > self.min_adx:
+            return False
+        if self.trend_filter and not dataframe["is_trending"].iat[-1]:
+            return False
+        return all(dataframe[column].iat[-1] for column in self.filter_cols)
+
+
+class ExitBand:
+    """下一根K线的 trend_break: 上一根已收于出场 EMA 下方，且本根 close < EMA_exit"""
+
+    __slots__ = ("date", "profile", "below", "close_max", "volatility_ratio")
+
+    def fires(self, dataframe: DataFrame) -> bool:
+        if not (self.below and _last(dataframe, "close") < self.close_max):
+            return False
+        if self.volatility_ratio > 0:
+            return _last(dataframe, "volatility_ratio") >= self.volatility_ratio
+        return True
+
+
+def entry_band(stream: PairIndicatorStream, date: int, profile,
+               filter_cols: Sequence[str] = ()) -> Optional[EntryBand]:
+    """
+    由上一根K线后的递推状态算出 date 这根K线的入场价带；状态未就绪时返回 None
+
+    profile 提供 slope_threshold / pullback_tolerance / rsi_* / min_adx /
+    use_advanced_filter / use_trend_filter（与信号内核的参数一致）。
+    """
+    fast, slow, trend, _ = stream.emas
+    slope_base = stream.slow_history[1]
+    if not _seeded(fast, slow, trend) or stream.rsi.count < stream.rsi.period:
+        return None
+    if math.isnan(slope_base) or slope_base <= 0 or math.isnan(stream.rsi.prev_close):
+        return None
+    if (stream.rsi.gain + stream.rsi.loss) <= 0:
+        return None
+
+    fast_a, fast_b = _ema_line(fast)
+    slow_a, slow_b = _ema_line(slow)
+    trend_a, trend_b = _ema_line(trend)
+
+    band = _Interval()
+    # uptrend: 快 > 慢 > 趋势，且收盘在快线上方
+    band.above(fast_a - slow_a, fast_b - slow_b)
+    band.above(slow_a - trend_a, slow_b - trend_b)
+    band.above(-fast_a, 1.0 - fast_b)
+    # 动能: (慢线' - 10 根前慢线) / 10 根前慢线 * 100 > 阈值
+    band.above(slow_a - slope_base * (1.0 + profile.slope_threshold / 100), slow_b)
+    # RSI 区间
+    band.between(_rsi_close(stream.rsi, profile.rsi_oversold / 100),
+                 _rsi_close(stream.rsi, profile.rsi_overbought / 100))
+
+    volume_min = None
+    if profile.use_advanced_filter:
+        macd = stream.macd
+        signal = macd.signal_ema
+        if not _seeded(macd.fast_ema, macd.slow_ema, signal):
+            return None
+        # 柱' = (1 - k9) (MACD' - 信号线) > 0
+        macd_fast_a, macd_fast_b = _ema_line(macd.fast_ema)
+        macd_slow_a, macd_slow_b = _ema_line(macd.slow_ema)
+        band.above(macd_fast_a - macd_slow_a - signal.value, macd_fast_b - macd_slow_b)
+        # 量比' = volume / ((窗口和 - 最旧 + volume) / w) > 0.8
+        sma = stream.volume_sma
+        oldest = sma.buffer[sma.pos]
+        if sma.filled < sma.window or sma.nan_count - math.isnan(oldest) > 0:
+            return None
+        # 窗口和不含 NaN；最旧值为 NaN 时滑出窗口不改变窗口和
+        rest = sma.total if math.isnan(oldest) else sma.total - oldest
+        volume_min = 0.8 * rest / (sma.window - 0.8)
+
+    result = EntryBand()
+    result.date = date
+    result.profile = profile
+    result.close_min, result.close_max = band.low, band.high
+    result.low_base = profile.pullback_tolerance * fast_a
+    result.low_slope = profile.pullback_tolerance * fast_b
+    result.volume_min = volume_min
+    result.min_adx = profile.min_adx
+    result.trend_filter = profile.use_advanced_filter and profile.use_trend_filter
+    result.filter_cols = tuple(filter_cols)
+    return result
+
+
+def exit_band(stream: PairIndicatorStream, date: int, profile) -> Optional[ExitBand]:
+    """date 这根K线的 trend_break 价带；未启用趋势出场或状态未就绪时返回 None"""
+    if not profile.use_trend_exit:
+        return None
+    ema_exit = stream.emas[3]
+    close = stream.rsi.prev_close
+    if not _seeded(ema_exit) or math.isnan(close):
+        return None
+    result = ExitBand()
+    result.date = date
+    result.profile = profile
+    result.below = close < ema_exit.value
+    # close < EMA' ⇔ (1 - k) (close - EMA) < 0 ⇔ close < EMA
+    result.close_max = ema_exit.value
+    result.volatility_ratio = profile.trend_exit_volatility_ratio
+    return result
+
+
+# ============================================================
+# 每个交易对的价带 + 上一次的信号
+# ============================================================
+class SignalTape:
+    """上一次分析写出的信号列（按K线时间）"""
+
+    __slots__ = ("dates", "mask")
+
+    def __init__(self, dates: np.ndarray, mask: np.ndarray):
+        self.dates = dates
+        self.mask = mask
+
+    def carry(self, dates: np.ndarray, last: bool) -> Optional[np.ndarray]:
+        """新窗口 = 上次窗口前移（末尾新增一根）时，复用之前的信号并补上最后一根"""
+        n, m = len(dates), len(self.dates)
+        start = m - (n - 1)
+        if n < 2 or start < 0 or self.dates[-1] != dates[-2] or self.dates[start] != dates[0]:
+            return None
+        mask = np.empty(n, dtype=np.bool_)
+        mask[:-1] = self.mask[start:]
+        mask[-1] = last
+        return mask
+
+
+class PairTriggers:
+    """单个交易对: 下一根K线的入场 / 出场价带，以及上一次的信号"""
+
+    __slots__ = ("entry", "exit", "entry_tape", "exit_tape")
+
+    def __init__(self):
+        self.entry: Optional[EntryBand] = None
+        self.exit: Optional[ExitBand] = None
+        self.entry_tape: Optional[SignalTape] = None
+        self.exit_tape: Optional[SignalTape] = None
+
+    def prepare(self, stream: Optional[PairIndicatorStream], next_date: int, profile,
+                filter_cols: Sequence[str] = ()) -> None:
+        """分析完一根K线后算好下一根的价带"""
+        if stream is None:
+            self.entry = self.exit = None
+            return
+        self.entry = entry_band(stream, next_date, profile, filter_cols)
+        self.exit = exit_band(stream, next_date, profile)
+
+    @staticmethod
+    def _decide(band, tape: Optional[SignalTape], dataframe: DataFrame,
+                profile) -> Optional[np.ndarray]:
+        if band is None or tape is None or band.profile is not profile or len(dataframe) < 2:
+            return None
+        dates = _dates_ns(dataframe)
+        if dates[-1] != band.date:
+            return None
+        return tape.carry(dates, band.fires(dataframe))
+
+    def entry_signal(self, dataframe: DataFrame, profile,
+                     filter_cols: Sequence[str] = ()) -> Optional[np.ndarray]:
+        """入场掩码（最后一根由价带判断）；无法使用价带时返回 None"""
+        if self.entry is None or self.entry.filter_cols != tuple(filter_cols):
+            return None
+        return self._decide(self.entry, self.entry_tape, dataframe, profile)
+
+    def exit_signal(self, dataframe: DataFrame, profile) -> Optional[np.ndarray]:
+        """trend_break 掩码（最后一根由价带判断）；无法使用价带时返回 None"""
+        mask = self._decide(self.exit, self.exit_tape, dataframe, profile)
+        if mask is not None:
+            # 与信号内核一致: 窗口第一根没有前一根K线，不出信号
+            mask[0] = False
+        return mask
+
+    def record(self, dataframe: DataFrame, entry: np.ndarray, exit: Optional[np.ndarray]) -> None:
+        """保存本次写出的信号（信号内核的缓冲区会被复用，这里复制）"""
+        dates = _dates_ns(dataframe).copy()
+        self.entry_tape = SignalTape(dates, np.array(entry, dtype=np.bool_))
+        self.exit_tape = SignalTape(dates, np.array(exit, dtype=np.bool_)) if exit is not None else None
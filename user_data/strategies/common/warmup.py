@@ -0,0 +1,86 @@
+"""
+按交易对的预热K线数
+
+startup_candle_count 是 freqtrade 的全局设置，由需要最长预热的交易对决定
+（DOGE 的 ema_exit 为 300）。这里按交易对实际使用的指标周期估算所需预热:
+
+- 滚动窗口（SMA / 布林带 / 滚动均值）: 窗口填满即为精确值
+- 递推平滑（EMA / Wilder）: 首个值之后初始种子的权重按 (1 - alpha)^n 衰减，
+  衰减到 tolerance 以下才视为收敛；EMA 的 alpha = 2 / (period + 1)，
+  Wilder 平滑（RSI / ATR / ADX）的 alpha = 1 / period
+- 串联的指标（ATR → atr_pct 均值、ADX → adx_sma、MACD → 信号线）预热相加
+
+结果是估算值（偏保守），用于 bot_start 的预热不足提示与 tools/warmup_report.py 报告。
+不用来裁剪指标计算: 已加载的K线全部参与递推，实盘数值才与 talib 全量计算一致；
+freqtrade 也只按全局 startup_candle_count 加载数据，无法按交易对加载。
+"""
+
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Dict, Tuple
+
+
+# 默认收敛容差: 初始种子的剩余权重不超过 5%
+DEFAULT_TOLERANCE = 0.05
+
+
+def smoothing_convergence(alpha: float, tolerance: float) -> int:
+    """递推平滑 y = alpha * x + (1 - alpha) * y 中种子权重降到 tolerance 以下所需K线数"""
+    if not 0 < tolerance < 1:
+        raise ValueError("tolerance 需在 (0, 1) 之间")
+    return math.ceil(math.log(tolerance) / math.log(1.0 - alpha))
+
+
+def ema_warmup(period: int, tolerance: float) -> int:
+    return period + smoothing_convergence(2.0 / (period + 1), tolerance)
+
+
+def wilder_warmup(period: int, tolerance: float) -> int:
+    return period + smoothing_convergence(1.0 / period, tolerance)
+
+
+def indicator_warmups(periods: Tuple[int, int, int, int],
+                      tolerance: float = DEFAULT_TOLERANCE) -> Dict[str, int]:
+    """
+    各指标列所需的预热K线数（列名同 common.streaming.STREAM_COLUMNS）
+
+    Args:
+        periods: (ema_fast, ema_slow, ema_trend, ema_exit) 周期
+        tolerance: 递推指标的收敛容差
+    """
+    ema_fast, ema_slow, ema_trend, ema_exit = (ema_warmup(p, tolerance) for p in periods)
+    atr = wilder_warmup(14, tolerance)
+    # ADX: +DM/-DM/TR 与 DX 各经一次 Wilder 平滑
+    adx = 2 * wilder_warmup(14, tolerance)
+    macd = max(ema_warmup(12, tolerance), ema_warmup(26, tolerance))
+    macd_signal = macd + ema_warmup(9, tolerance)
+
+    return {
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "ema_trend": ema_trend,
+        "ema_exit": ema_exit,
+        "rsi": wilder_warmup(14, tolerance),
+        "atr": atr,
+        "atr_pct": atr,
+        "volatility_ratio": atr + 50,
+        "slope": ema_slow + 10,
+        "adx": adx,
+        "bb_width": 20,
+        "bb_width_sma": 20 + 50,
+        "adx_sma": adx + 10,
+        "macd": macd,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_signal,
+        "volume_sma": 20,
+        "volume_ratio": 20,
+    }
+
+
+@lru_cache(maxsize=None)
+def pair_warmup(periods: Tuple[int, int, int, int],
+                tolerance: float = DEFAULT_TOLERANCE) -> int:
+    """交易对所需预热K线数（各指标的最大值）"""
+    return max(indicator_warmups(periods, tolerance).values())
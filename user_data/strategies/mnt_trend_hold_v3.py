@@ -13,16 +13,21 @@ MNT 趋势持有策略 V3 版本
 
 from __future__ import annotations
 
-from functools import reduce
-from typing import Any, Optional
+from typing import Any, Optional, Tuple
 
 import pandas as pd
 from pandas import DataFrame
 
-import talib.abstract as ta
+from freqtrade.enums import RunMode
 from freqtrade.persistence import Trade
 from freqtrade.strategy import IStrategy
 
+from common.exits import ProfitLockLadder
+from common.higher_timeframe import HigherTimeframeEngine, HigherTimeframeSpec, populate_confirmation
+from common.indicator_cache import CachedIndicators
+from common.signals import SignalKernel, write_signal
+from common.simulator import ExitRules
+
 
 class MntTrendHoldV3Strategy(IStrategy):
     """
@@ -59,19 +64,39 @@ class MntTrendHoldV3Strategy(IStrategy):
     ema_fast = 20
     ema_slow = 50
     ema_trend = 100
+    
+    # 阶梯式利润保护: (达到利润, 最低锁定)
+    PROFIT_LOCK_LEVELS = (
+        (0.50, 0.40),                   # 50% 利润 → 锁定 40%
+        (0.30, 0.20),                   # 30% 利润 → 锁定 20%
+        (0.20, 0.10),                   # 20% 利润 → 锁定 10%
+        (0.10, 0.05),                   # 10% 利润 → 锁定 5%
+        (0.05, 0.01),                   # 5% 利润  → 锁定 1%
+    )
+
+    # 高周期确认: 由 1h K线重采样出 4h / 1d，趋势确认后才允许入场（空元组关闭）
+    # 如 common.higher_timeframe.DEFAULT_CONFIRMATION
+    higher_timeframe_confirmation: Tuple[HigherTimeframeSpec, ...] = ()
+
+    # 信号内核 / 高周期增量状态（bot_start 中初始化）/ 编译后的阶梯（见 profit_ladder）
+    _signal_kernel: Optional[SignalKernel] = None
+    _ladder: Optional[ProfitLockLadder] = None
+    _htf_engine: Optional[HigherTimeframeEngine] = None
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        """计算技术指标"""
+        """计算技术指标（经共享缓存，与其他策略复用同一交易对的指标）"""
+        ind = CachedIndicators(dataframe, metadata.get("pair", ""), self.timeframe)
+        
         # EMA 指标
-        dataframe["ema20"] = ta.EMA(dataframe, timeperiod=self.ema_fast)
-        dataframe["ema50"] = ta.EMA(dataframe, timeperiod=self.ema_slow)
-        dataframe["ema100"] = ta.EMA(dataframe, timeperiod=self.ema_trend)
+        dataframe["ema20"] = ind.ema(self.ema_fast)
+        dataframe["ema50"] = ind.ema(self.ema_slow)
+        dataframe["ema100"] = ind.ema(self.ema_trend)
         
         # RSI
-        dataframe["rsi"] = ta.RSI(dataframe, timeperiod=14)
+        dataframe["rsi"] = ind.rsi(14)
         
         # ATR (波动率)
-        dataframe["atr"] = ta.ATR(dataframe, timeperiod=14)
+        dataframe["atr"] = ind.atr(14)
 
         # 上升趋势判断: 快线 > 慢线 > 趋势线，价格在快线上方
         dataframe["uptrend"] = (
@@ -85,40 +110,46 @@ class MntTrendHoldV3Strategy(IStrategy):
             dataframe["ema50"] - dataframe["ema50"].shift(10)
         ) / dataframe["ema50"].shift(10) * 100
 
+        # 高周期确认（实盘/模拟盘增量合成，其余模式整段重采样）
+        if self._htf_engine is not None:
+            self._htf_engine.populate(metadata.get("pair", ""), dataframe)
+        elif self.higher_timeframe_confirmation:
+            populate_confirmation(dataframe, self.timeframe, self.higher_timeframe_confirmation)
+
         return dataframe
 
+    def bot_start(self, **kwargs) -> None:
+        """初始化信号内核"""
+        self._signal_kernel = SignalKernel()
+        live = self.dp is not None and self.dp.runmode in (RunMode.LIVE, RunMode.DRY_RUN)
+        if self.higher_timeframe_confirmation and live:
+            self._htf_engine = HigherTimeframeEngine(self.timeframe, self.higher_timeframe_confirmation)
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        """入场信号 - 严格条件"""
-        conditions = [
-            # 趋势确认
-            dataframe["uptrend"],
-            
-            # 趋势动能 > 0.5%
-            dataframe["ema50_slope"] > 0.5,
-            
-            # 回踩买入: 最低价触及 EMA20 附近 (容忍 2%)
-            dataframe["low"] <= dataframe["ema20"] * 1.02,
-            
-            # 收盘价仍在 EMA20 上方
-            dataframe["close"] > dataframe["ema20"],
-            
-            # RSI 过滤
-            dataframe["rsi"] < 70,  # 不追高
-            dataframe["rsi"] > 40,  # 不抄底
-        ]
-
-        valid = dataframe["ema20"].notna() & dataframe["rsi"].notna()
-        dataframe.loc[reduce(lambda x, y: x & y, conditions) & valid, "enter_long"] = 1
+        """
+        入场信号 - 严格条件
+        
+        趋势确认 + 趋势动能 > 0.5% + 回踩 EMA20（容忍 2%，收盘仍在上方）
+        + RSI 40~70（不抄底、不追高）[+ 高周期确认]
+        """
+        entry = self._signal_kernel.entry(
+            dataframe,
+            fast_col="ema20",
+            slope_col="ema50_slope",
+            slope_threshold=0.5,
+            pullback_tolerance=1.02,
+            rsi_oversold=40,
+            rsi_overbought=70,
+            filter_cols=["htf_ok"] if "htf_ok" in dataframe.columns else (),
+        )
+        write_signal(dataframe, entry, "enter_long")
         return dataframe
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """出场信号 - 趋势破坏"""
         # 连续两根K线收于 EMA100 下方
-        dataframe.loc[
-            (dataframe["close"] < dataframe["ema100"]) &
-            (dataframe["close"].shift(1) < dataframe["ema100"].shift(1)),
-            "exit_long"
-        ] = 1
+        trend_break = self._signal_kernel.trend_break(dataframe, exit_col="ema100")
+        write_signal(dataframe, trend_break, "exit_long")
         return dataframe
 
     def custom_stoploss(
@@ -133,27 +164,23 @@ class MntTrendHoldV3Strategy(IStrategy):
         """
         阶梯式利润保护
         
-        盈利越高，锁定的利润越多
+        盈利越高，锁定的利润越多；未盈利时使用固定止损。
+        阶梯见 PROFIT_LOCK_LEVELS（预编译为升序数组，二分查找档位）
         """
-        # 50% 利润 → 锁定 40%
-        if current_profit >= 0.50:
-            return -(current_profit - 0.40)
-        
-        # 30% 利润 → 锁定 20%
-        if current_profit >= 0.30:
-            return -(current_profit - 0.20)
-        
-        # 20% 利润 → 锁定 10%
-        if current_profit >= 0.20:
-            return -(current_profit - 0.10)
-        
-        # 10% 利润 → 锁定 5%
-        if current_profit >= 0.10:
-            return -(current_profit - 0.05)
-        
-        # 5% 利润 → 锁定 1%
-        if current_profit >= 0.05:
-            return -(current_profit - 0.01)
-        
-        # 未盈利，使用固定止损
-        return self.stoploss
+        return self.profit_ladder().stoploss_at(current_profit)
+
+    def profit_ladder(self) -> ProfitLockLadder:
+        """
+        编译后的阶梯止盈
+
+        stoploss 可能被配置覆盖，超参优化 (--spaces stoploss) 还会在每个 epoch 改写它，
+        因此与编译时的 stoploss 不同就重新编译（只是几个元素的数组，开销可忽略）。
+        """
+        ladder = self._ladder
+        if ladder is None or ladder.stoploss != self.stoploss:
+            ladder = self._ladder = ProfitLockLadder(self.PROFIT_LOCK_LEVELS, self.stoploss)
+        return ladder
+
+    def exit_rules(self, pair: str) -> ExitRules:
+        """出场参数（供 common.simulator 快速仿真使用）"""
+        return ExitRules.from_strategy(self, self.profit_ladder())
@@ -0,0 +1,65 @@
+"""
+流式指标引擎与 talib 全量计算的一致性（common.streaming）
+
+实盘 / 模拟盘默认走流式引擎，回测走 _compute_indicators；同一起点上两者必须一致。
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from adaptive_institutional_strategy import PROFILES
+from common.snapshot import IndicatorSnapshot
+from common.streaming import STREAM_COLUMNS, StreamingIndicatorEngine
+from conftest import PAIRS, assert_columns_close, synthetic_candles
+
+
+CANDLES = 1200
+
+
+def talib_frame(strategy, pair, candles):
+    return strategy._compute_indicators(candles.copy(), pair, PROFILES.resolve(pair).ema_periods)
+
+
+def stream_frame(engine, pair, candles):
+    return engine.populate(pair, candles.copy(), PROFILES.resolve(pair).ema_periods)
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+@pytest.mark.parametrize("pair", PAIRS)
+def test_full_warmup_matches_talib(strategy, pair, seed):
+    candles = synthetic_candles(CANDLES, seed)
+    actual = stream_frame(StreamingIndicatorEngine(), pair, candles)
+    assert_columns_close(actual, talib_frame(strategy, pair, candles), STREAM_COLUMNS)
+
+
+@pytest.mark.parametrize("pair", PAIRS)
+def test_append_one_candle_matches_talib(strategy, pair):
+    candles = synthetic_candles(CANDLES, 3)
+    engine = StreamingIndicatorEngine()
+    stream_frame(engine, pair, candles.iloc[:CANDLES - 5])
+    stream = engine.stream(pair)
+    for end in range(CANDLES - 4, CANDLES + 1):
+        window = candles.iloc[:end]
+        actual = stream_frame(engine, pair, window)
+        # 只推入了新K线，没有整段重新预热
+        assert engine.stream(pair) is stream
+        assert_columns_close(actual, talib_frame(strategy, pair, window), STREAM_COLUMNS)
+
+
+@pytest.mark.parametrize("pair", PAIRS)
+def test_snapshot_restore_resumes(strategy, pair, tmp_path):
+    candles = synthetic_candles(CANDLES, 4)
+    engine = StreamingIndicatorEngine()
+    stream_frame(engine, pair, candles.iloc[:CANDLES - 24])
+    snapshot = IndicatorSnapshot(tmp_path / "state.pkl", "1h")
+    snapshot.save(engine.snapshot())
+
+    restored = StreamingIndicatorEngine()
+    streams = snapshot.load()
+    assert pair in streams
+    restored.restore(streams)
+    # 停机期间缺失的 24 根K线从快照状态接着推入
+    actual = stream_frame(restored, pair, candles)
+    assert restored.stream(pair) is streams[pair]
+    assert_columns_close(actual, talib_frame(strategy, pair, candles), STREAM_COLUMNS)
@@ -0,0 +1,148 @@
+"""
+预先算好的触发价带与信号内核的一致性（common.triggers）
+
+实盘 / 模拟盘由 PairTriggers 判断最后一根K线、沿用上一次的信号，
+回测与回退路径由 SignalKernel 整段计算；两者在每一根K线上必须给出相同的掩码。
+
+价带端点处的相等比较取决于舍入，合成K线的收盘价 / 最低价 / 成交量
+改到端点两侧 EPS 的相对距离（RSI 超卖 / 超买、EMA 与斜率阈值、回踩线、量比），
+两侧的判断都要与信号内核一致。
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from adaptive_institutional_strategy import PROFILES
+from common.streaming import StreamingIndicatorEngine
+from common.triggers import PairTriggers, _rsi_close
+from conftest import PAIRS, synthetic_candles
+
+
+WINDOW = 800
+STEPS = 330
+EPS = 1e-7
+# 端点离上一根收盘价太远时不改（避免把合成行情扭成异常K线）
+MAX_MOVE = 0.2
+
+# 逐根轮换的改法: (改动, 相对偏移)
+EDGES = (
+    (None, 0.0),
+    ("close_min", EPS), ("close_min", -EPS),
+    ("close_max", -EPS), ("close_max", EPS),
+    ("rsi_oversold", EPS), ("rsi_oversold", -EPS),
+    ("rsi_overbought", -EPS), ("rsi_overbought", EPS),
+    ("pullback", -EPS), ("pullback", EPS),
+    ("volume", EPS), ("volume", -EPS),
+    ("exit", -EPS), ("exit", EPS),
+)
+
+PROFILE_CASES = {
+    "basic": {"use_advanced_filter": False},
+    "advanced": {"use_advanced_filter": True},
+    "advanced_trend_filter": {"use_advanced_filter": True, "use_trend_filter": True},
+}
+
+
+def _near(target: float, reference: float) -> bool:
+    return math.isfinite(target) and abs(target / reference - 1.0) <= MAX_MOVE
+
+
+def _edge_candle(candles, row: int, edge: str, offset: float, triggers: PairTriggers,
+                 stream, profile) -> bool:
+    """把第 row 根K线改到价带端点一侧；端点不存在或太远时不改并返回 False"""
+    entry, exit_ = triggers.entry, triggers.exit
+    prev_close = stream.rsi.prev_close
+    close = candles.at[row, "close"]
+    low = candles.at[row, "low"]
+    volume = candles.at[row, "volume"]
+
+    if edge in ("close_min", "close_max"):
+        target = getattr(entry, edge)
+    elif edge in ("rsi_oversold", "rsi_overbought"):
+        target = _rsi_close(stream.rsi, getattr(profile, edge) / 100)
+    elif edge == "exit":
+        target = exit_.close_max if exit_ is not None else math.nan
+    else:
+        target = close
+
+    if edge == "pullback":
+        line = entry.low_base + entry.low_slope * close
+        low = line * (1.0 + offset)
+        if low > min(candles.at[row, "open"], close):
+            return False
+    elif edge == "volume":
+        if entry.volume_min is None:
+            return False
+        volume = entry.volume_min * (1.0 + offset)
+    else:
+        if not _near(target, prev_close):
+            return False
+        close = target * (1.0 + offset)
+        # 回踩条件成立，收盘价的端点才决定信号
+        low = min(low, entry.low_base + entry.low_slope * close)
+
+    open_ = candles.at[row, "open"]
+    candles.at[row, "close"] = close
+    candles.at[row, "low"] = min(low, open_, close)
+    candles.at[row, "high"] = max(candles.at[row, "high"], open_, close)
+    candles.at[row, "volume"] = volume
+    return True
+
+
+def _analyze(strategy, engine, pair, window, profile):
+    frame = engine.populate(pair, window.copy(), profile.ema_periods)
+    return strategy._add_trend_flags(frame)
+
+
+@pytest.mark.parametrize("case", sorted(PROFILE_CASES))
+@pytest.mark.parametrize("pair", PAIRS)
+def test_triggers_match_signal_kernel(strategy, pair, case):
+    profile = PROFILES.resolve(pair).replace(**PROFILE_CASES[case])
+    candles = synthetic_candles(WINDOW + STEPS, 5)
+    # 附加过滤列（大盘状态）同样只由价带读最后一行
+    candles["market_ok"] = np.random.default_rng(5).random(len(candles)) < 0.9
+
+    engine = StreamingIndicatorEngine()
+    triggers = PairTriggers()
+    step_ns = int(candles["date"].iat[1].value - candles["date"].iat[0].value)
+    decided = edges = 0
+
+    for end in range(WINDOW, len(candles) + 1):
+        row = end - 1
+        if triggers.entry is not None:
+            edge, offset = EDGES[row % len(EDGES)]
+            if edge is not None:
+                edges += _edge_candle(candles, row, edge, offset, triggers,
+                                      engine.stream(pair), profile)
+
+        frame = _analyze(strategy, engine, pair, candles.iloc[end - WINDOW:end], profile)
+        filters = strategy._entry_filters(frame)
+        entry = strategy._entry_signal(frame, profile)[0].copy()
+        trend_break = strategy._exit_signal(frame, profile)
+        if trend_break is not None:
+            trend_break = trend_break.copy()
+
+        if triggers.entry is not None:
+            date = frame["date"].iat[-1]
+            actual = triggers.entry_signal(frame, profile, filters)
+            assert actual is not None, date
+            np.testing.assert_array_equal(actual, entry, err_msg=f"entry {date}")
+            actual = triggers.exit_signal(frame, profile)
+            if trend_break is None:
+                assert actual is None
+            else:
+                assert actual is not None, date
+                np.testing.assert_array_equal(actual, trend_break, err_msg=f"exit {date}")
+            decided += 1
+
+        triggers.record(frame, entry, trend_break)
+        triggers.prepare(engine.stream(pair), frame["date"].iat[-1].value + step_ns,
+                         profile, filters)
+
+    # 预热完成后每一根都由价带判断，且确实改出了端点两侧的K线
+    assert decided == STEPS
+    assert edges > 0
@@ -0,0 +1,242 @@
+"""
+策略性能基准
+
+对 AdaptiveInstitutionalStrategy / MntTrendHoldV3Strategy 的各阶段
+（populate_indicators / populate_entry_trend / populate_exit_trend /
+custom_stoploss / custom_exit）在合成K线上计时，覆盖不同K线数量与交易对数量，
+输出 墙钟时间、峰值内存、阶段结束时仍存活的新分配块数，并与保存的基线对比。
+
+完全离线运行（合成数据、不连接交易所），只需安装 freqtrade 与 TA-Lib:
+
+    python user_data/tools/benchmark.py                      # 默认矩阵，与基线对比
+    python user_data/tools/benchmark.py --save-baseline      # 记录新基线
+    python user_data/tools/benchmark.py --candles 1000000 --pairs 1 --stages populate_indicators
+
+默认矩阵: 单交易对 1k / 10k / 100k / 1M 根K线，外加 10k 根K线下 1 / 10 / 50 个交易对。
+基线与本机相关，需在同一台机器上记录和对比。
+任一项的时间或峰值内存超过基线 (1 + --threshold) 倍时以退出码 1 结束。
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from offline import STRATEGIES, USER_DATA, make_strategy
+from synthetic import generate
+
+
+STAGES = (
+    "populate_indicators",
+    "populate_entry_trend",
+    "populate_exit_trend",
+    "custom_stoploss",
+    "custom_exit",
+)
+
+DEFAULT_BASELINE = USER_DATA / "benchmarks" / "baseline.json"
+
+# 默认矩阵: (K线数, 交易对数)
+DEFAULT_MATRIX = (
+    (1_000, 1), (10_000, 1), (100_000, 1), (1_000_000, 1),
+    (10_000, 10), (10_000, 50),
+)
+
+# 前两个交易对使用已配置的资产档案，其余走默认档案
+_NAMED_ASSETS = ("DOGE", "MNT")
+
+
+# ============================================================
+# 合成数据
+# ============================================================
+# 1M 根 1h K线从 2000 年起，止于 2114 年（pandas 纳秒时间戳上限为 2262 年）
+SYNTHETIC_START = "2000-01-01"
+
+
+def pair_names(count: int) -> List[str]:
+    names = [f"{asset}/USDT" for asset in _NAMED_ASSETS[:count]]
+    names += [f"SYN{i}/USDT" for i in range(count - len(names))]
+    return names
+
+
+# ============================================================
+# 各阶段
+# ============================================================
+def _callback_inputs(frame: DataFrame) -> Tuple[List[Any], List[float], Any]:
+    """回调输入: 每根K线一次调用，利润在 -15% ~ +60% 间游走以覆盖阶梯各档"""
+    times = list(frame["date"].dt.to_pydatetime())
+    profits = np.clip(np.cumsum(np.random.default_rng(7).normal(0, 0.01, len(frame))), -0.15, 0.6)
+    trade = SimpleNamespace(open_date_utc=times[0] - timedelta(hours=200))
+    return times, profits.tolist(), trade
+
+
+def run_stage(strategy: Any, stage: str, raw: Dict[str, DataFrame],
+              analyzed: Dict[str, DataFrame]) -> Callable[[], None]:
+    """返回执行一次该阶段的函数（输入在此准备好，不计入测量）"""
+    if stage == "populate_indicators":
+        def run() -> None:
+            strategy.advise_all_indicators(raw)
+        return run
+
+    if stage in ("populate_entry_trend", "populate_exit_trend"):
+        method = getattr(strategy, stage)
+        frames = {pair: frame.copy() for pair, frame in analyzed.items()}
+
+        def run() -> None:
+            for pair, frame in frames.items():
+                method(frame, {"pair": pair})
+        return run
+
+    inputs = {pair: _callback_inputs(frame) for pair, frame in raw.items()}
+    if stage == "custom_stoploss":
+        def run() -> None:
+            for pair, (times, profits, trade) in inputs.items():
+                callback = strategy.custom_stoploss
+                for now, profit in zip(times, profits):
+                    callback(pair, trade, now, 1.0, profit, after_fill=False)
+        return run
+
+    def run() -> None:
+        for pair, (times, profits, trade) in inputs.items():
+            callback = strategy.custom_exit
+            for now, profit in zip(times, profits):
+                callback(pair, trade, now, 1.0, profit)
+    return run
+
+
+def measure(run: Callable[[], None], repeat: int) -> Dict[str, float]:
+    """
+    最快一次的墙钟时间；另跑一次在 tracemalloc 下统计峰值内存与存活块数
+
+    retained_blocks 是阶段结束后仍未释放的新增内存块数（前后快照之差），
+    不是阶段内的分配次数: 临时数组分配后又释放的不计入，其开销体现在峰值内存中。
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+    return {"seconds": best, "peak_mb": peak / 2**20, "retained_blocks": retained}
+
+
+def benchmark(strategy_names: Iterable[str], matrix: Iterable[Tuple[int, int]],
+              stages: Iterable[str], repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    stages = list(stages)
+    for candles, pair_count in matrix:
+        pairs = pair_names(pair_count)
+        raw = {pair: generate(candles, seed, SYNTHETIC_START) for seed, pair in enumerate(pairs)}
+        for name in strategy_names:
+            strategy = make_strategy(STRATEGIES[name], pairs)
+            analyzed = strategy.advise_all_indicators(raw)
+            for stage in stages:
+                key = f"{name}|{stage}|{candles}|{pair_count}"
+                results[key] = measure(run_stage(strategy, stage, raw, analyzed), repeat)
+                _print_row(key, results[key])
+            del analyzed
+    return results
+
+
+# ============================================================
+# 基线对比
+# ============================================================
+def _print_row(key: str, row: Dict[str, float], note: str = "") -> None:
+    name, stage, candles, pairs = key.split("|")
+    print(f"{name:<30} {stage:<22} {int(candles):>9} {int(pairs):>3}  "
+          f"{row['seconds'] * 1000:>10.1f} ms {row['peak_mb']:>9.1f} MB "
+          f"{int(row['retained_blocks']):>9} blk  {note}", flush=True)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_seconds: float) -> List[str]:
+    """返回超出阈值的项（耗时过短的项只比较内存，避免计时噪声）"""
+    regressions = []
+    for key, row in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        time_ratio = row["seconds"] / base["seconds"] if base["seconds"] else 1.0
+        memory_ratio = row["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+        slow = time_ratio > 1 + threshold and row["seconds"] >= min_seconds
+        heavy = memory_ratio > 1 + threshold and row["peak_mb"] >= 1.0
+        if slow or heavy:
+            regressions.append(f"{key}: 时间 x{time_ratio:.2f}, 峰值内存 x{memory_ratio:.2f}")
+    return regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="策略性能基准")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--candles", nargs="+", type=int,
+                        help="K线数量（与 --pairs 组成矩阵，替代默认矩阵）")
+    parser.add_argument("--pairs", nargs="+", type=int, default=[1], help="交易对数量")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数，取最快一次")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写为基线")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="允许的退化比例（默认 0.25，即慢 25%% 以上判为退化）")
+    parser.add_argument("--min-seconds", type=float, default=0.01,
+                        help="短于该耗时的项不做时间对比（默认 0.01s）")
+    parser.add_argument("--output", type=Path, help="把本次结果另存为 JSON")
+    options = parser.parse_args(argv)
+
+    if options.candles:
+        matrix = [(candles, pairs) for candles in options.candles for pairs in options.pairs]
+    else:
+        matrix = list(DEFAULT_MATRIX)
+
+    print(f"{'strategy':<30} {'stage':<22} {'candles':>9} {'pr':>3}  "
+          f"{'wall':>13} {'peak':>12} {'retained':>13}")
+    results = benchmark(options.strategies, matrix, options.stages, options.repeat)
+
+    if options.output:
+        options.output.parent.mkdir(parents=True, exist_ok=True)
+        options.output.write_text(json.dumps(results, indent=2, sort_keys=True))
+
+    if options.save_baseline:
+        baseline = {}
+        if options.baseline.exists():
+            baseline = json.loads(options.baseline.read_text())
+        baseline.update(results)
+        options.baseline.parent.mkdir(parents=True, exist_ok=True)
+        options.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        print(f"基线已写入 {options.baseline}")
+        return 0
+
+    if not options.baseline.exists():
+        print(f"未找到基线 {options.baseline}，使用 --save-baseline 记录")
+        return 0
+
+    regressions = compare(results, json.loads(options.baseline.read_text()),
+                          options.threshold, options.min_seconds)
+    for line in regressions:
+        print(f"退化: {line}")
+    print(f"{len(regressions)} 项超出基线 {options.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
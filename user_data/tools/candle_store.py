@@ -0,0 +1,390 @@
+"""
+列式内存映射K线库
+
+同一批 DOGE/MNT（以及 19 币筛选集）1h 数据每天被反复回测，每次运行、
+每个 worker 都要把 feather 文件解压、解析成新的 DataFrame。
+
+K线库把每个 (交易对, 周期) 存成一组定长的原始列文件:
+
+    user_data/data/<exchange>/columnar/<PAIR>-<timeframe>/
+        meta.json          行数、来源文件标记
+        date.i8            int64 纳秒时间戳（UTC，严格递增）
+        open.f8 ... volume.f8
+
+- 只存现货K线（本仓库策略均为现货做多）
+- 读取时按列 np.memmap（只读）映射，不解压、不解析；多个进程打开同一文件时
+  共享操作系统页缓存，常驻内存不随 worker 数量增长
+- 按时间范围读取只是对映射数组切片（二分查找），不复制数据
+- 追加新K线只写入比最后一根更新的行；行数最后写入 meta.json（原子替换），
+  读者看到的永远是完整的前缀
+- 只供离线工具使用（tools/offline.py 的 CandleLoader），不接管 freqtrade 自身的加载，
+  因此放在工具目录而不是策略的 common 包中；来源文件比K线库新（下载了新数据但未同步）时
+  CandleLoader 回退到数据文件
+
+维护命令:
+
+    # 把 freqtrade 下载的数据同步进K线库（首次全量导入，之后只追加新K线）
+    python user_data/tools/candle_store.py sync --datadir user_data/data/bybit
+    python user_data/tools/candle_store.py sync --datadir user_data/data/bybit --pairs DOGE/USDT --timeframes 1h
+
+    # 查看K线库内容
+    python user_data/tools/candle_store.py info --datadir user_data/data/bybit
+
+    # 对比 freqtrade 原始加载与K线库加载（N 个进程并行时的耗时与常驻内存）
+    python user_data/tools/candle_store.py bench --datadir user_data/data/bybit --workers 1 4 8
+
+download-data 之后运行一次 sync 即可；来源文件在 sync 之后又有变化时，
+离线工具对该交易对回退到数据文件并给出警告。来源数据不是原K线库的延续（例如用更早的起点重新下载）时，该交易对整体重建。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.data.history.datahandlers import get_datahandler
+from freqtrade.enums import CandleType, TradingMode
+
+from cli import positive_int
+
+
+# ============================================================
+# K线库
+# ============================================================
+STORE_DIRNAME = "columnar"
+
+# 列名 → 磁盘类型（定长小端）
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("date", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+)
+
+_SUFFIX = {"<i8": "i8", "<f8": "f8"}
+
+_UTC_NS = pd.DatetimeTZDtype("ns", "UTC")
+
+
+def _pair_key(pair: str) -> str:
+    """与 freqtrade 数据文件名一致: DOGE/USDT -> DOGE_USDT"""
+    return pair.replace("/", "_").replace(":", "_")
+
+
+def _dates_ns(dates: Any) -> np.ndarray:
+    """任意时间列 → UTC 纳秒 int64"""
+    series = pd.to_datetime(pd.Series(dates), utc=True)
+    return series.dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+class CandleStore:
+    """
+    一个数据目录（如 user_data/data/bybit）下的列式K线库
+
+    Args:
+        datadir: freqtrade 的数据目录（config["datadir"]）
+    """
+
+    def __init__(self, datadir: Path):
+        self.datadir = Path(datadir).resolve()
+        self.root = self.datadir / STORE_DIRNAME
+        # (目录, 行数) → 各列的只读映射；追加后行数变化自然失效
+        self._maps: Dict[Tuple[Path, int], Dict[str, np.ndarray]] = {}
+
+    # ------------------------------------------------------------
+    # 元数据
+    # ------------------------------------------------------------
+    def _dir(self, pair: str, timeframe: str) -> Path:
+        return self.root / f"{_pair_key(pair)}-{timeframe}"
+
+    def meta(self, pair: str, timeframe: str) -> Optional[Dict[str, Any]]:
+        path = self._dir(pair, timeframe) / "meta.json"
+        try:
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self, directory: Path, meta: Dict[str, Any]) -> None:
+        temp = directory / "meta.json.tmp"
+        temp.write_text(json.dumps(meta, sort_keys=True))
+        os.replace(temp, directory / "meta.json")
+
+    def entries(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """[(交易对, 周期, meta)]"""
+        if not self.root.exists():
+            return []
+        result = []
+        for meta_path in sorted(self.root.glob("*/meta.json")):
+            meta = json.loads(meta_path.read_text())
+            result.append((meta["pair"], meta["timeframe"], meta))
+        return result
+
+    # ------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------
+    def append(self, pair: str, timeframe: str, candles: DataFrame,
+               source: Optional[Dict[str, Any]] = None) -> int:
+        """
+        追加比已有最后一根更新的K线，返回追加的行数
+
+        Args:
+            candles: 含 date/open/high/low/close/volume 的K线（按时间升序）
+            source: 来源文件标记（mtime_ns / size），用于判断K线库是否过期
+        """
+        directory = self._dir(pair, timeframe)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = self.meta(pair, timeframe) or {"pair": pair, "timeframe": timeframe, "rows": 0}
+        rows = meta["rows"]
+
+        dates = _dates_ns(candles["date"])
+        if len(dates) and np.any(np.diff(dates) <= 0):
+            raise ValueError(f"{pair} {timeframe} 的K线时间必须严格递增")
+        if rows:
+            last = int(self._column(directory, "date", "<i8", rows)[-1])
+            start = int(np.searchsorted(dates, last, side="right"))
+        else:
+            start = 0
+        added = len(dates) - start
+
+        if added:
+            for column, dtype in COLUMNS:
+                path = directory / f"{column}.{_SUFFIX[dtype]}"
+                values = dates[start:] if column == "date" else candles[column].to_numpy()[start:]
+                # 截掉上次中断留下的半截写入，再追加
+                with open(path, "ab") as handle:
+                    handle.truncate(rows * np.dtype(dtype).itemsize)
+                    handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+                    handle.flush()
+                    os.fsync(handle.fileno())
+            meta["rows"] = rows + added
+        if source is not None:
+            meta["source"] = source
+        if added or source is not None:
+            self._write_meta(directory, meta)
+        return added
+
+    def remove(self, pair: str, timeframe: str) -> None:
+        """删除一个交易对（来源数据被改写、不再是追加关系时重建用）"""
+        directory = self._dir(pair, timeframe)
+        if not directory.exists():
+            return
+        (directory / "meta.json").unlink(missing_ok=True)
+        for path in directory.iterdir():
+            path.unlink()
+        directory.rmdir()
+        self._maps = {k: v for k, v in self._maps.items() if k[0] != directory}
+
+    # ------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------
+    def _column(self, directory: Path, column: str, dtype: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(directory / f"{column}.{_SUFFIX[dtype]}", dtype=dtype, mode="r", shape=(rows,))
+
+    def arrays(self, pair: str, timeframe: str) -> Optional[Dict[str, np.ndarray]]:
+        """各列的只读内存映射（不存在时返回 None）"""
+        meta = self.meta(pair, timeframe)
+        if meta is None:
+            return None
+        directory = self._dir(pair, timeframe)
+        key = (directory, meta["rows"])
+        maps = self._maps.get(key)
+        if maps is None:
+            maps = {
+                column: self._column(directory, column, dtype, meta["rows"])
+                for column, dtype in COLUMNS
+            }
+            self._maps = {k: v for k, v in self._maps.items() if k[0] != directory}
+            self._maps[key] = maps
+        return maps
+
+    def load(self, pair: str, timeframe: str,
+             start: Optional[pd.Timestamp] = None,
+             end: Optional[pd.Timestamp] = None) -> Optional[DataFrame]:
+        """
+        按时间范围 [start, end] 读取为 DataFrame（价格列直接引用内存映射，不复制）
+
+        返回的 DataFrame 只读共享底层文件；对列的修改按 pandas 写时复制生效，
+        不会写回K线库。
+        """
+        maps = self.arrays(pair, timeframe)
+        if maps is None:
+            return None
+        dates = maps["date"]
+        lo = int(np.searchsorted(dates, pd.Timestamp(start).value)) if start is not None else 0
+        hi = int(np.searchsorted(dates, pd.Timestamp(end).value, side="right")) if end is not None else len(dates)
+
+        # 带时区的时间列需要转换一次（8 字节/行）；价格与成交量列直接引用映射
+        columns = {
+            "date": pd.DatetimeIndex(dates[lo:hi].view("datetime64[ns]"), dtype=_UTC_NS),
+        }
+        for column, _ in COLUMNS[1:]:
+            columns[column] = maps[column][lo:hi]
+        return DataFrame(columns, copy=False)
+
+
+# ============================================================
+# 来源文件标记
+# ============================================================
+def source_stamp(path: Path) -> Optional[Dict[str, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+# ============================================================
+# 同步
+# ============================================================
+def _available(handler, pairs: Optional[List[str]],
+               timeframes: Optional[List[str]]) -> List[Tuple[str, str]]:
+    result = []
+    for pair, timeframe, candle_type in handler.ohlcv_get_available_data(
+        handler._datadir, TradingMode.SPOT
+    ):
+        if candle_type != CandleType.SPOT:
+            continue
+        if pairs and pair not in pairs:
+            continue
+        if timeframes and timeframe not in timeframes:
+            continue
+        result.append((pair, timeframe))
+    return sorted(result)
+
+
+def sync_pair(store: CandleStore, handler, pair: str, timeframe: str) -> str:
+    """同步一个交易对，返回结果说明"""
+    source = handler._pair_data_filename(handler._datadir, pair, timeframe, CandleType.SPOT)
+    stamp = source_stamp(source)
+    meta = store.meta(pair, timeframe)
+    if meta is not None and meta.get("source") == stamp:
+        return "未变化"
+
+    candles = handler.ohlcv_load(pair, timeframe, CandleType.SPOT,
+                                 fill_missing=False, warn_no_data=False)
+    if candles.empty:
+        return "无数据"
+
+    # 来源数据必须是K线库的延续（同一起点、已有部分逐行一致），否则重建
+    rebuilt = False
+    arrays = store.arrays(pair, timeframe)
+    if arrays is not None and len(arrays["date"]):
+        rows = len(arrays["date"])
+        dates = candles["date"].dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64)
+        head = candles.iloc[:rows]
+        continuous = (
+            len(dates) >= rows
+            and np.array_equal(dates[:rows], arrays["date"])
+            and all(np.array_equal(head[column].to_numpy(), arrays[column], equal_nan=True)
+                    for column in ("open", "high", "low", "close", "volume"))
+        )
+        if not continuous:
+            store.remove(pair, timeframe)
+            rebuilt = True
+
+    added = store.append(pair, timeframe, candles, source=stamp)
+    return f"{'重建' if rebuilt else '追加'} {added} 根"
+
+
+def cmd_sync(options) -> int:
+    store = CandleStore(options.datadir)
+    handler = get_datahandler(options.datadir, options.data_format)
+    entries = _available(handler, options.pairs, options.timeframes)
+    if not entries:
+        print(f"{options.datadir} 下没有匹配的现货K线数据")
+        return 1
+    for pair, timeframe in entries:
+        print(f"{pair:<16} {timeframe:<4} {sync_pair(store, handler, pair, timeframe)}")
+    return 0
+
+
+def cmd_info(options) -> int:
+    store = CandleStore(options.datadir)
+    entries = store.entries()
+    if not entries:
+        print(f"{store.root} 下没有K线库数据")
+        return 0
+    for pair, timeframe, meta in entries:
+        dates = store.arrays(pair, timeframe)["date"]
+        first = pd.Timestamp(int(dates[0]), tz="UTC") if len(dates) else None
+        last = pd.Timestamp(int(dates[-1]), tz="UTC") if len(dates) else None
+        print(f"{pair:<16} {timeframe:<4} {meta['rows']:>9} 根  {first} ~ {last}")
+    return 0
+
+
+# ============================================================
+# 加载对比
+# ============================================================
+def _load_worker(args: Tuple[str, str, str, List[Tuple[str, str]]]) -> Tuple[float, float]:
+    """子进程: 加载全部交易对并对收盘价求和（触及全部数据），返回 (耗时, 常驻内存 MB)"""
+    mode, datadir, data_format, entries = args
+    started = time.perf_counter()
+    total = 0.0
+    if mode == "store":
+        store = CandleStore(Path(datadir))
+        for pair, timeframe in entries:
+            total += float(store.load(pair, timeframe)["close"].sum())
+    else:
+        handler = get_datahandler(Path(datadir), data_format)
+        for pair, timeframe in entries:
+            total += float(handler.ohlcv_load(pair, timeframe, CandleType.SPOT)["close"].sum())
+    elapsed = time.perf_counter() - started
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cmd_bench(options) -> int:
+    store = CandleStore(options.datadir)
+    entries = [(pair, timeframe) for pair, timeframe, _ in store.entries()]
+    if not entries:
+        print("K线库为空，先运行 sync")
+        return 1
+    print(f"{len(entries)} 个交易对/周期")
+    for workers in options.workers:
+        for mode in ("freqtrade", "store"):
+            job = (mode, str(options.datadir), options.data_format, entries)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                started = time.perf_counter()
+                results = list(pool.map(_load_worker, [job] * workers))
+                wall = time.perf_counter() - started
+            load = max(seconds for seconds, _ in results)
+            rss = max(memory for _, memory in results)
+            print(f"workers={workers:<3} {mode:<10} 加载 {load * 1000:>8.1f} ms  "
+                  f"总耗时 {wall * 1000:>8.1f} ms  单进程峰值 RSS {rss:>7.1f} MB")
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="列式K线库维护工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("sync", "info", "bench"):
+        command = sub.add_parser(name)
+        command.add_argument("--datadir", type=Path, required=True,
+                             help="freqtrade 数据目录，如 user_data/data/bybit")
+        command.add_argument("--data-format", default="feather",
+                             help="来源数据格式（默认 feather）")
+        if name == "sync":
+            command.add_argument("--pairs", nargs="+")
+            command.add_argument("--timeframes", nargs="+")
+        if name == "bench":
+            command.add_argument("--workers", nargs="+", type=positive_int, default=[1, 4])
+    options = parser.parse_args(argv)
+    return {"sync": cmd_sync, "info": cmd_info, "bench": cmd_bench}[options.command](options)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
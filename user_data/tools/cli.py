@@ -0,0 +1,34 @@
+"""
+离线工具命令行参数的公共校验（作为 argparse 的 type 使用）
+
+非法值在解析参数时即报错（argparse 的用法提示 + 退出码 2），
+不会等到创建进程池、切分区间时才抛出 ValueError 或死循环。
+"""
+
+from __future__ import annotations
+
+import argparse
+
+
+def positive_int(text: str) -> int:
+    """>= 1 的整数（进程数、交易对数、K线数 ...）"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"需为正整数: {text}")
+    return value
+
+
+def non_negative_int(text: str) -> int:
+    """>= 0 的整数"""
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"不能为负数: {text}")
+    return value
+
+
+def open_unit_float(text: str) -> float:
+    """(0, 1) 之间的小数（置信度、比例 ...）"""
+    value = float(text)
+    if not 0 < value < 1:
+        raise argparse.ArgumentTypeError(f"需在 0 与 1 之间（不含端点）: {text}")
+    return value
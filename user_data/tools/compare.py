@@ -0,0 +1,287 @@
+"""
+多策略 / 多参数版本对比: 一次加载、共享指标、并行仿真
+
+MntTrendHoldV3Strategy 与 AdaptiveInstitutionalStrategy（以及 ASSET_CONFIGS 的不同版本）
+原本各跑一次 freqtrade 回测，每次都重新加载并重算同一段K线。本工具:
+
+1. 每个交易对只加载一次K线（预热取各版本 startup_candle_count 的最大值），
+   所有版本拿到同一段K线
+2. 主进程依次为各版本计算指标: 窗口相同，EMA / RSI / ATR / ADX 等经共享指标缓存
+   （common.indicator_cache.shared_indicators，算完即释放）只算一次，各版本只拼装自己的列
+3. 各 (版本, 交易对) 的信号与出场仿真在 fork 出的 worker 中并行，
+   指标 dataframe 随 fork 写时复制共享，不经 pickle
+4. 并排输出各版本的组合表现、各交易对收益与出场原因
+
+    python user_data/tools/compare.py --datadir user_data/data/bybit \\
+        --pairs DOGE MNT --timerange 20250101-20260101
+    python user_data/tools/compare.py --datadir user_data/data/bybit --pairs DOGE MNT \\
+        --timerange 20250101-20260101 --variants MntTrendHoldV3Strategy \\
+        AdaptiveInstitutionalStrategy tight=AdaptiveInstitutionalStrategy@user_data/asset_configs_tight.json
+
+版本写作 [标签=]策略[@参数文件]；参数文件为 asset_configs.json 格式（见 common.profile_reload），
+只适用于 AdaptiveInstitutionalStrategy。仿真与 screener 相同: 按交易对独立、全仓复利，
+组合权益为各交易对日终权益的等权平均（不受 max_open_trades 约束）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from pandas import DataFrame
+
+from cli import positive_int
+from offline import (
+    STRATEGIES,
+    CandleLoader,
+    backtest_frames,
+    calmar,
+    daily,
+    equity_curve,
+    make_strategy,
+    max_drawdown,
+    pair_names,
+    parse_timerange,
+    warmup_start,
+)
+
+from adaptive_institutional_strategy import ASSET_CONFIGS, DEFAULT_CONFIG
+from common.indicator_cache import shared_indicators
+from common.profile_reload import ProfileWatcher
+
+
+DEFAULT_VARIANTS = ["MntTrendHoldV3Strategy", "AdaptiveInstitutionalStrategy"]
+
+
+# ============================================================
+# 版本
+# ============================================================
+class Variant:
+    """一个参与对比的版本: 策略类 + 可选的资产参数文件"""
+
+    __slots__ = ("label", "strategy_name", "asset_file")
+
+    def __init__(self, label: str, strategy_name: str, asset_file: Optional[Path]):
+        self.label = label
+        self.strategy_name = strategy_name
+        self.asset_file = asset_file
+
+    @classmethod
+    def parse(cls, text: str) -> "Variant":
+        """[标签=]策略[@参数文件]"""
+        label, _, spec = text.rpartition("=")
+        name, _, path = spec.partition("@")
+        if name not in STRATEGIES:
+            raise ValueError(f"未知策略 {name}（可选: {', '.join(STRATEGIES)}）")
+        asset_file = Path(path) if path else None
+        if not label:
+            label = name if asset_file is None else f"{name}@{asset_file.stem}"
+        return cls(label, name, asset_file)
+
+    def build(self, pairs: List[str], timeframe: str) -> Any:
+        strategy = make_strategy(STRATEGIES[self.strategy_name], pairs, timeframe)
+        if self.asset_file is None:
+            return strategy
+        if not hasattr(strategy, "_reload_profiles"):
+            raise ValueError(f"{self.strategy_name} 没有按资产的参数，不能使用参数文件")
+        if not self.asset_file.is_file():
+            raise ValueError(f"参数文件 {self.asset_file} 不存在")
+        # 与实盘热加载同一路径: 文件中的键逐项覆盖代码中的 ASSET_CONFIGS
+        before = strategy._profiles
+        strategy._profile_watcher = ProfileWatcher(self.asset_file, ASSET_CONFIGS, DEFAULT_CONFIG)
+        strategy._reload_profiles()
+        if strategy._profiles is before:
+            raise ValueError(f"参数文件 {self.asset_file} 无效（详见日志）")
+        return strategy
+
+
+# ============================================================
+# 数据与指标（主进程）
+# ============================================================
+def load_candles(loader: CandleLoader, pairs: List[str], timeframe: str,
+                 start: Optional[pd.Timestamp], end: Optional[pd.Timestamp],
+                 strategies: List[Any]) -> Dict[str, DataFrame]:
+    """每个交易对加载一次，预热满足所有版本"""
+    deepest = max(strategies, key=lambda strategy: strategy.startup_candle_count)
+    needed = deepest.startup_candle_count
+    candles = {}
+    for pair in pairs:
+        frame = loader.load(pair, timeframe, warmup_start(deepest, start), end)
+        if len(frame) > needed:
+            candles[pair] = frame
+    return candles
+
+
+def indicator_frames(strategy: Any, candles: Dict[str, DataFrame]) -> Dict[str, DataFrame]:
+    """该版本的指标 dataframe（与其他版本窗口相同，共用的指标命中缓存）"""
+    return {pair: strategy.advise_all_indicators({pair: frame})[pair]
+            for pair, frame in candles.items()}
+
+
+# ============================================================
+# worker
+# ============================================================
+# 主进程在创建进程池之前写入，worker 经 fork 继承（写时复制）
+_shared: Dict[str, Any] = {}
+
+
+def _run(task: Tuple[int, str]) -> Tuple[int, str, DataFrame, pd.Series]:
+    """一个 (版本, 交易对): 信号 → 出场仿真 → 逐K线权益"""
+    index, pair = task
+    strategy = _shared["strategies"][index]
+    start, fee = _shared["start"], _shared["fee"]
+    frame = strategy.ft_advise_signals(_shared["indicators"][index][pair], {"pair": pair})
+    if start is not None:
+        frame = frame.loc[frame["date"] >= start].reset_index(drop=True)
+    trades = backtest_frames(strategy, {pair: frame}, fee)
+    return index, pair, trades, equity_curve(frame, trades, fee)
+
+
+# ============================================================
+# 报告
+# ============================================================
+def _winrate(trades: DataFrame) -> float:
+    return float((trades["profit_ratio"] > 0).mean()) if len(trades) else 0.0
+
+
+def summary_table(labels: List[str], trades: Dict[str, DataFrame],
+                  equity: Dict[str, DataFrame]) -> DataFrame:
+    """各版本的组合表现（等权组合的日终权益）"""
+    rows = []
+    for label in labels:
+        portfolio = equity[label].mean(axis=1).to_numpy()
+        days = len(portfolio)
+        rows.append((
+            label,
+            len(trades[label]),
+            _winrate(trades[label]),
+            portfolio[-1] - 1.0,
+            float(max_drawdown(portfolio)),
+            float(calmar(portfolio, days)),
+        ))
+    return DataFrame(rows, columns=["variant", "trades", "winrate", "profit", "max_drawdown", "calmar"])
+
+
+def pair_table(labels: List[str], trades: Dict[str, DataFrame],
+               equity: Dict[str, DataFrame]) -> DataFrame:
+    """各交易对: 行为交易对，列为 版本 的收益 / 交易数"""
+    columns = {}
+    for label in labels:
+        curves = equity[label]
+        counts = trades[label]["pair"].value_counts() if len(trades[label]) else pd.Series(dtype=int)
+        columns[(label, "profit")] = curves.iloc[-1] - 1.0
+        columns[(label, "trades")] = counts.reindex(curves.columns, fill_value=0)
+    return DataFrame(columns)
+
+
+def exit_table(labels: List[str], trades: Dict[str, DataFrame]) -> DataFrame:
+    """各版本按出场原因的交易数与平均收益"""
+    frames = []
+    for label in labels:
+        if not len(trades[label]):
+            continue
+        grouped = trades[label].groupby("exit_reason")["profit_ratio"].agg(["count", "mean"])
+        grouped.columns = pd.MultiIndex.from_product([[label], ["count", "mean"]])
+        frames.append(grouped)
+    if not frames:
+        return DataFrame()
+    table = pd.concat(frames, axis=1)
+    counts = [column for column in table.columns if column[1] == "count"]
+    table[counts] = table[counts].fillna(0).astype(int)
+    return table.fillna(0.0)
+
+
+def _format(frame: DataFrame) -> str:
+    percent = {"winrate", "profit", "max_drawdown", "mean"}
+    formatters = {}
+    for column in frame.columns:
+        if frame[column].dtype.kind != "f":
+            continue
+        name = column[-1] if isinstance(column, tuple) else column
+        formatters[column] = (lambda v: f"{v:8.1%}") if name in percent else (lambda v: f"{v:7.2f}")
+    return frame.to_string(formatters=formatters, index=not isinstance(frame.index, pd.RangeIndex))
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="多策略 / 多参数版本对比")
+    parser.add_argument("--datadir", type=Path, required=True,
+                        help="freqtrade 数据目录，如 user_data/data/bybit")
+    parser.add_argument("--data-format", default="feather")
+    parser.add_argument("--variants", nargs="+", default=DEFAULT_VARIANTS,
+                        help="参与对比的版本: [标签=]策略[@参数文件]")
+    parser.add_argument("--pairs", nargs="+", default=["DOGE", "MNT"])
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--timerange", help="回测区间，如 20250101-20260101")
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--workers", type=positive_int, default=4)
+    options = parser.parse_args(argv)
+
+    try:
+        variants = [Variant.parse(text) for text in options.variants]
+    except ValueError as exc:
+        parser.error(str(exc))
+    labels = [variant.label for variant in variants]
+    if len(set(labels)) != len(labels):
+        parser.error("版本标签重复，请用 标签=策略 区分")
+
+    pairs = pair_names(options.pairs)
+    start, end = parse_timerange(options.timerange)
+    try:
+        strategies = [variant.build(pairs, options.timeframe) for variant in variants]
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    started = time.perf_counter()
+    loader = CandleLoader(options.datadir, options.data_format)
+    candles = load_candles(loader, pairs, options.timeframe, start, end, strategies)
+    skipped = sorted(set(pairs) - set(candles))
+    if skipped:
+        print(f"数据不足，跳过: {', '.join(skipped)}")
+    if not candles:
+        return 1
+    loaded = time.perf_counter()
+
+    with shared_indicators() as cache:
+        indicators = [indicator_frames(strategy, candles) for strategy in strategies]
+    stats = cache.stats()
+    cache.clear()
+    computed = time.perf_counter()
+    print(f"{len(candles)} 个交易对加载 {loaded - started:.1f}s，"
+          f"{len(variants)} 个版本的指标 {computed - loaded:.1f}s"
+          f"（共享缓存命中 {stats['hits']}/{stats['hits'] + stats['misses']}）")
+
+    _shared.update(strategies=strategies, indicators=indicators, start=start, fee=options.fee)
+    tasks = [(index, pair) for index in range(len(variants)) for pair in candles]
+    with ProcessPoolExecutor(
+        max_workers=min(options.workers, len(tasks)),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as pool:
+        results = list(pool.map(_run, tasks))
+    print(f"{len(tasks)} 组信号与出场仿真 {time.perf_counter() - computed:.1f}s"
+          f"（{options.workers} 个进程）\n")
+
+    trades: Dict[str, DataFrame] = {}
+    equity: Dict[str, DataFrame] = {}
+    for index, label in enumerate(labels):
+        mine = [(pair, t, curve) for i, pair, t, curve in results if i == index]
+        trades[label] = pd.concat([t for _, t, _ in mine], ignore_index=True)
+        equity[label] = daily({pair: curve for pair, _, curve in mine})
+
+    print(_format(summary_table(labels, trades, equity)))
+    print("\n各交易对:")
+    print(_format(pair_table(labels, trades, equity)))
+    exits = exit_table(labels, trades)
+    if not exits.empty:
+        print("\n出场原因:")
+        print(_format(exits))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
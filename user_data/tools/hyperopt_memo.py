@@ -0,0 +1,128 @@
+"""
+带信号指纹记忆化的超参优化运行器（见 common.fingerprint）
+
+参数与 freqtrade hyperopt 相同:
+
+    python user_data/tools/hyperopt_memo.py --config user_data/config.json \\
+        --strategy AdaptiveInstitutionalStrategy --hyperopt-loss SharpeHyperOptLoss \\
+        --spaces buy sell --epochs 500 -j 8
+
+运行器按 freqtrade hyperopt 的方式构造超参优化对象，把它持有的 Backtesting 实例换成
+MemoBacktesting: 每个 epoch 回测前先算策略的 signal_fingerprint，指纹命中则直接返回
+之前的回测结果。实例在 worker 启动前替换，随超参优化对象一起 pickle 到各 worker，
+第一个 epoch 起即生效；策略代码与 freqtrade 本身都不做修改。
+
+- 命中时仍执行 prepare_backtest，回测对象的状态与真实跑过一遍时一致
+- 回测结果缓存在 user_data/hyperopt_results/signal_fingerprints.sqlite，每次运行开始时清空
+- 依赖 freqtrade 的内部接口: Backtesting.backtest(processed, start_date, end_date)、
+  prepare_backtest、超参优化对象的 backtesting（较新版本为 hyperopter.backtesting）属性。
+  启动前逐项检查，不符时报错退出；运行结束时没有任何 epoch 经过记忆化回测也报错，
+  不会在不生效的情况下静默运行。freqtrade 升级后请先用小 epoch 数对比直接运行
+  freqtrade hyperopt 的结果
+- 只支持提供 signal_fingerprint(processed) 的策略（AdaptiveInstitutionalStrategy）
+"""
+
+from __future__ import annotations
+
+import inspect
+import sys
+from pathlib import Path
+from typing import Any, List
+
+USER_DATA = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(USER_DATA / "strategies"))
+
+from freqtrade import __version__ as FREQTRADE_VERSION  # noqa: E402
+from freqtrade.commands import Arguments  # noqa: E402
+from freqtrade.commands.optimize_commands import setup_optimize_configuration  # noqa: E402
+from freqtrade.enums import RunMode  # noqa: E402
+from freqtrade.optimize.backtesting import Backtesting  # noqa: E402
+from freqtrade.optimize.hyperopt import Hyperopt  # noqa: E402
+
+from common.fingerprint import FingerprintStore, register_report  # noqa: E402
+
+
+STORE_NAME = "signal_fingerprints.sqlite"
+
+# MemoBacktesting 依赖的 Backtesting.backtest 参数（self 之后，按顺序）
+BACKTEST_PARAMETERS = ("processed", "start_date", "end_date")
+
+
+class MemoBacktesting(Backtesting):
+    """按信号指纹记忆化 backtest() 的 Backtesting（实例由运行器替换，不单独构造）"""
+
+    signal_store: FingerprintStore
+
+    def backtest(self, processed, start_date, end_date, *args, **kwargs):
+        key = f"{self.strategy.signal_fingerprint(processed)}:{start_date}:{end_date}"
+        cached = self.signal_store.get(key)
+        if cached is not None:
+            # 与未命中时一样重置交易记录、钱包与保护状态
+            self.prepare_backtest(self.enable_protections)
+            return cached
+
+        result = super().backtest(processed, start_date, end_date, *args, **kwargs)
+        self.signal_store.put(key, result)
+        return result
+
+
+class IncompatibleFreqtrade(RuntimeError):
+    """当前 freqtrade 版本的内部接口与 MemoBacktesting 的假设不符"""
+
+
+def _incompatible(reason: str) -> IncompatibleFreqtrade:
+    return IncompatibleFreqtrade(
+        f"freqtrade {FREQTRADE_VERSION} 与记忆化运行器不兼容: {reason}；请直接使用 freqtrade hyperopt"
+    )
+
+
+def _check_backtesting() -> None:
+    parameters = list(inspect.signature(Backtesting.backtest).parameters)[1:]
+    if tuple(parameters[:len(BACKTEST_PARAMETERS)]) != BACKTEST_PARAMETERS:
+        raise _incompatible(f"Backtesting.backtest 的参数为 {parameters}")
+    if not callable(getattr(Backtesting, "prepare_backtest", None)):
+        raise _incompatible("Backtesting 没有 prepare_backtest")
+
+
+def install(hyperopt: Any, store: FingerprintStore) -> Backtesting:
+    """把超参优化对象持有的 Backtesting 实例换成 MemoBacktesting"""
+    _check_backtesting()
+    # 较新的 freqtrade 由 HyperOptimizer 持有回测实例
+    owner = getattr(hyperopt, "hyperopter", hyperopt)
+    backtesting = getattr(owner, "backtesting", None)
+    if type(backtesting) is not Backtesting:
+        raise _incompatible(f"超参优化对象持有的回测实例为 {type(backtesting).__name__}")
+    if not hasattr(backtesting, "enable_protections"):
+        raise _incompatible("Backtesting 实例没有 enable_protections")
+    if not hasattr(backtesting.strategy, "signal_fingerprint"):
+        raise ValueError(f"{type(backtesting.strategy).__name__} 没有 signal_fingerprint，无法记忆化")
+    backtesting.__class__ = MemoBacktesting
+    backtesting.signal_store = store
+    return backtesting
+
+
+def main(argv: List[str]) -> int:
+    args = Arguments(["hyperopt", *argv]).get_parsed_arg()
+    config = setup_optimize_configuration(args, RunMode.HYPEROPT)
+    store = FingerprintStore(Path(config["user_data_dir"]) / "hyperopt_results" / STORE_NAME)
+    # 清空上次运行的结果，退出时汇总各进程的命中率
+    register_report(store)
+
+    hyperopt = Hyperopt(config)
+    try:
+        install(hyperopt, store)
+    except (ValueError, IncompatibleFreqtrade) as error:
+        print(error, file=sys.stderr)
+        return 2
+    hyperopt.start()
+
+    stats = store.stats()
+    if stats["hits"] + stats["misses"] == 0:
+        # worker 中的回测实例不是 MemoBacktesting（例如 freqtrade 在 worker 中重新构造）
+        print(str(_incompatible("没有任何 epoch 经过记忆化回测")), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,214 @@
+"""
+回测交易列表的蒙特卡洛稳健性分析
+
+一年 78 笔交易的 Calmar 2.39 / Sortino 2.38 只是一条路径上的结果。本工具读取
+freqtrade 回测导出的交易列表，对交易做两类重采样:
+
+- bootstrap: 有放回地抽取同样数量的交易（收益分布本身的不确定性）
+- shuffle:   打乱交易顺序（总收益不变，只看回撤 / Calmar 对先后顺序的敏感程度）
+
+每条路径计算 收益、最大回撤（相对账户）、Calmar、Sortino，输出置信区间。
+
+    python user_data/tools/monte_carlo.py                                  # 最近一次回测结果
+    python user_data/tools/monte_carlo.py --results user_data/backtest_results/backtest-result-xxx.zip \\
+        --strategy AdaptiveInstitutionalStrategy --resamples 100000 --workers 8
+
+- 指标定义与 freqtrade 的回测报告一致（freqtrade.data.metrics 的 calculate_calmar /
+  calculate_sortino / 相对最大回撤），原始顺序的结果即回测报告中的数值
+- 每笔交易换算为平仓时相对账户的收益: stake_amount 为 unlimited（复利）时相对
+  当时的账户余额并按复利重组，固定仓位时相对初始资金并累加（--mode 可强制指定）
+- 重采样按固定大小的块生成（每块独立的随机种子，块内整批 NumPy 计算），
+  块数较多时分到多个进程；同一 --seed 的结果与进程数无关
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.data.btanalysis import load_backtest_data, load_backtest_stats
+
+from cli import open_unit_float, positive_int
+from offline import DAYS_PER_YEAR, USER_DATA, max_drawdown
+
+
+METHODS = ("bootstrap", "shuffle")
+METRICS = ("profit", "max_drawdown", "calmar", "sortino")
+
+# 每块的元素上限（路径数 x 交易数），控制单块临时数组大小
+BLOCK_ELEMENTS = 2_000_000
+
+# freqtrade 对分母为 0 的年化比率记为 -100
+_UNDEFINED_RATIO = -100.0
+
+
+# ============================================================
+# 交易列表
+# ============================================================
+def load_trades(results: Path, strategy: Optional[str]) -> Tuple[DataFrame, dict]:
+    """回测导出 → (按平仓时间排序的交易表, 该策略的统计)"""
+    stats = load_backtest_stats(results)["strategy"]
+    if strategy is None:
+        if len(stats) != 1:
+            raise ValueError(f"结果中有多个策略，需用 --strategy 指定: {', '.join(stats)}")
+        strategy = next(iter(stats))
+    trades = load_backtest_data(results, strategy)
+    return trades.sort_values("close_date").reset_index(drop=True), stats[strategy]
+
+
+def account_returns(profit_abs: np.ndarray, starting_balance: float, compound: bool) -> np.ndarray:
+    """
+    每笔交易平仓时相对账户的收益
+
+    复利时相对平仓前的余额，按原顺序复利重组即得到原始权益曲线；
+    固定仓位时相对初始资金，累加即为原始权益曲线。
+    """
+    if not compound:
+        return profit_abs / starting_balance
+    balance = starting_balance + np.concatenate([[0.0], np.cumsum(profit_abs)[:-1]])
+    return profit_abs / balance
+
+
+# ============================================================
+# 批量指标
+# ============================================================
+def equity_paths(returns: np.ndarray, compound: bool) -> np.ndarray:
+    """路径 x 交易 的收益 → 路径 x (交易 + 1) 的权益（初始资金为 1）"""
+    steps = np.cumprod(1.0 + returns, axis=-1) if compound else 1.0 + np.cumsum(returns, axis=-1)
+    start = np.ones(steps.shape[:-1] + (1,))
+    return np.concatenate([start, steps], axis=-1)
+
+
+def path_metrics(equity: np.ndarray, days: int) -> Dict[str, np.ndarray]:
+    """
+    各路径的 收益 / 最大回撤 / Calmar / Sortino（freqtrade 口径）
+
+    Calmar = 日均收益(%) / 相对最大回撤 x sqrt(365)
+    Sortino = 日均收益 / 亏损交易收益的标准差 x sqrt(365)
+    收益与亏损均相对初始资金。
+    """
+    days = max(days, 1)
+    annualize = np.sqrt(DAYS_PER_YEAR)
+    profit = equity[..., -1] - 1.0
+    drawdown = max_drawdown(equity)
+
+    changes = np.diff(equity, axis=-1)
+    losses = np.where(changes < 0, changes, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        down_std = np.nanstd(losses, axis=-1)
+        calmar = np.where(drawdown > 0, profit / days * 100 / drawdown * annualize, _UNDEFINED_RATIO)
+        sortino = np.where(down_std > 0, profit / days / down_std * annualize, _UNDEFINED_RATIO)
+    sortino = np.where(np.isnan(sortino), _UNDEFINED_RATIO, sortino)
+    return {"profit": profit, "max_drawdown": drawdown, "calmar": calmar, "sortino": sortino}
+
+
+def _resample(returns: np.ndarray, method: str, count: int,
+              rng: np.random.Generator) -> np.ndarray:
+    n = len(returns)
+    if method == "bootstrap":
+        return returns[rng.integers(0, n, size=(count, n))]
+    return rng.permuted(np.broadcast_to(returns, (count, n)), axis=1)
+
+
+def _run_block(args: Tuple[np.ndarray, bool, int, str, int, np.random.SeedSequence]
+               ) -> Dict[str, np.ndarray]:
+    returns, compound, days, method, count, seed = args
+    paths = _resample(returns, method, count, np.random.default_rng(seed))
+    return path_metrics(equity_paths(paths, compound), days)
+
+
+def simulate(returns: np.ndarray, compound: bool, days: int, method: str, resamples: int,
+             seed: int, workers: int) -> Dict[str, np.ndarray]:
+    """按块重采样并计算指标，块数多于 1 且 workers > 1 时用进程池"""
+    block = max(1, BLOCK_ELEMENTS // max(len(returns), 1))
+    sizes = [min(block, resamples - start) for start in range(0, resamples, block)]
+    seeds = np.random.SeedSequence([seed, METHODS.index(method)]).spawn(len(sizes))
+    jobs = [(returns, compound, days, method, size, s) for size, s in zip(sizes, seeds)]
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            parts = list(pool.map(_run_block, jobs))
+    else:
+        parts = [_run_block(job) for job in jobs]
+    return {metric: np.concatenate([part[metric] for part in parts]) for metric in METRICS}
+
+
+# ============================================================
+# 报告
+# ============================================================
+def summary(samples: Dict[str, np.ndarray], original: Dict[str, float],
+            confidence: float) -> DataFrame:
+    tail = (1.0 - confidence) / 2 * 100
+    rows = []
+    for metric in METRICS:
+        values = samples[metric]
+        low, median, high = np.percentile(values, [tail, 50, 100 - tail])
+        rows.append((metric, original[metric], float(values.mean()), low, median, high))
+    return DataFrame(rows, columns=["metric", "original", "mean",
+                                    f"p{tail:g}", "median", f"p{100 - tail:g}"]).set_index("metric")
+
+
+def _format(table: DataFrame) -> str:
+    lines = [f"{'':<14}" + "".join(f"{column:>12}" for column in table.columns)]
+    for metric, row in table.iterrows():
+        if metric in ("profit", "max_drawdown"):
+            cells = "".join(f"{value:>12.1%}" for value in row)
+        else:
+            cells = "".join(f"{value:>12.2f}" for value in row)
+        lines.append(f"{metric:<14}{cells}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="回测交易列表的蒙特卡洛稳健性分析")
+    parser.add_argument("--results", type=Path, default=USER_DATA / "backtest_results",
+                        help="回测结果文件，或结果目录（取最近一次）")
+    parser.add_argument("--strategy", help="结果中有多个策略时指定")
+    parser.add_argument("--resamples", type=positive_int, default=10_000)
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--confidence", type=open_unit_float, default=0.90)
+    parser.add_argument("--mode", choices=("auto", "compound", "fixed"), default="auto",
+                        help="交易收益的重组方式（auto: 按回测的 stake_amount 判断）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=positive_int, default=4)
+    options = parser.parse_args(argv)
+
+    try:
+        trades, stats = load_trades(options.results, options.strategy)
+    except ValueError as error:
+        parser.error(str(error))
+    if len(trades) < 2:
+        parser.error("交易数不足，无法重采样")
+
+    compound = (stats["stake_amount"] == "unlimited") if options.mode == "auto" else options.mode == "compound"
+    days = max((pd.Timestamp(stats["backtest_end"]) - pd.Timestamp(stats["backtest_start"])).days, 1)
+    returns = account_returns(trades["profit_abs"].to_numpy(dtype=np.float64),
+                              float(stats["starting_balance"]), compound)
+    original = {metric: float(value) for metric, value in
+                path_metrics(equity_paths(returns, compound), days).items()}
+
+    print(f"{stats['strategy_name']}: {len(trades)} 笔交易，{days} 天，"
+          f"{'复利' if compound else '固定仓位'}，回测报告 Calmar {stats.get('calmar', 0):.2f} / "
+          f"Sortino {stats.get('sortino', 0):.2f}")
+    for method in options.methods:
+        started = time.perf_counter()
+        samples = simulate(returns, compound, days, method, options.resamples,
+                           options.seed, options.workers)
+        elapsed = time.perf_counter() - started
+        print(f"\n{method}: {options.resamples} 条路径，用时 {elapsed:.2f}s")
+        print(_format(summary(samples, original, options.confidence)))
+        print(f"亏损概率 {np.mean(samples['profit'] < 0):.1%}，"
+              f"最大回撤超过原始路径的概率 {np.mean(samples['max_drawdown'] > original['max_drawdown']):.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
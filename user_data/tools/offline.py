@@ -0,0 +1,211 @@
+"""
+离线研究工具的公共部分（基准、筛选、滚动优化 ...）
+
+- 不连接交易所实例化策略
+- 从列式K线库（tools/candle_store.py）或 freqtrade 数据文件加载K线
+- 生成带信号的 dataframe，交给 common.simulator 重放出场
+- 逐K线盯市的权益曲线与回撤 / Calmar 等组合指标
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+USER_DATA = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(USER_DATA / "strategies"))
+
+from freqtrade.configuration import TimeRange  # noqa: E402
+from freqtrade.data.dataprovider import DataProvider  # noqa: E402
+from freqtrade.data.history.datahandlers import get_datahandler  # noqa: E402
+from freqtrade.enums import CandleType, RunMode, TradingMode  # noqa: E402
+from freqtrade.exchange import timeframe_to_minutes  # noqa: E402
+
+from adaptive_institutional_strategy import AdaptiveInstitutionalStrategy  # noqa: E402
+from candle_store import CandleStore, source_stamp  # noqa: E402
+from common.simulator import simulate  # noqa: E402
+from mnt_trend_hold_v3 import MntTrendHoldV3Strategy  # noqa: E402
+
+
+STRATEGIES = {
+    "AdaptiveInstitutionalStrategy": AdaptiveInstitutionalStrategy,
+    "MntTrendHoldV3Strategy": MntTrendHoldV3Strategy,
+}
+
+DAYS_PER_YEAR = 365
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# 策略与数据
+# ============================================================
+def make_strategy(cls: type, pairs: List[str], timeframe: str = "1h") -> Any:
+    config = {
+        "user_data_dir": USER_DATA,
+        "timeframe": timeframe,
+        "stake_currency": "USDT",
+        "dry_run": True,
+        "exchange": {"pair_whitelist": pairs},
+        "runmode": RunMode.BACKTEST,
+    }
+    strategy = cls(config)
+    # 无交易所的 DataProvider: 策略按回测模式走全量向量化路径
+    strategy.dp = DataProvider(config, None)
+    strategy.ft_bot_start()
+    return strategy
+
+
+class CandleLoader:
+    """
+    按交易对加载K线: 优先列式K线库（多进程共享页缓存），否则读 freqtrade 数据文件
+
+    数据文件在同步K线库之后又有变化（下载了新数据但未 sync）时读数据文件。
+
+    Args:
+        datadir: freqtrade 数据目录，如 user_data/data/bybit
+        data_format: 数据文件格式（K线库中没有该交易对时使用）
+    """
+
+    def __init__(self, datadir: Path, data_format: str = "feather"):
+        self.datadir = Path(datadir)
+        self.data_format = data_format
+        self.store = CandleStore(self.datadir)
+        self._handler = None
+
+    def available_pairs(self, timeframe: str) -> List[str]:
+        pairs = {pair for pair, tf, _ in self.store.entries() if tf == timeframe}
+        handler = self.handler()
+        for pair, tf, candle_type in handler.ohlcv_get_available_data(self.datadir, TradingMode.SPOT):
+            if tf == timeframe and candle_type == CandleType.SPOT:
+                pairs.add(pair)
+        return sorted(pairs)
+
+    def handler(self):
+        if self._handler is None:
+            self._handler = get_datahandler(self.datadir, self.data_format)
+        return self._handler
+
+    def _fresh(self, pair: str, timeframe: str) -> bool:
+        """K线库中有该交易对，且来源文件未在同步后变化"""
+        meta = self.store.meta(pair, timeframe)
+        if meta is None:
+            return False
+        handler = self.handler()
+        stamp = source_stamp(handler._pair_data_filename(self.datadir, pair, timeframe, CandleType.SPOT))
+        if stamp is not None and stamp != meta.get("source"):
+            logger.warning("%s %s 的数据文件在同步K线库后有更新，本次从原文件加载"
+                           "（运行 tools/candle_store.py sync 以更新K线库）", pair, timeframe)
+            return False
+        return True
+
+    def load(self, pair: str, timeframe: str, start: Optional[pd.Timestamp] = None,
+             end: Optional[pd.Timestamp] = None) -> DataFrame:
+        """[start, end] 区间的K线（不存在时返回空 dataframe）"""
+        if self._fresh(pair, timeframe):
+            candles = self.store.load(pair, timeframe, start, end)
+            if candles is not None:
+                return candles
+        candles = self.handler().ohlcv_load(pair, timeframe, CandleType.SPOT, warn_no_data=False)
+        if candles.empty:
+            return candles
+        mask = np.ones(len(candles), dtype=np.bool_)
+        if start is not None:
+            mask &= (candles["date"] >= start).to_numpy()
+        if end is not None:
+            mask &= (candles["date"] <= end).to_numpy()
+        return candles.loc[mask].reset_index(drop=True)
+
+
+def parse_timerange(text: Optional[str]) -> tuple:
+    """freqtrade 格式的时间范围 → (start, end)，未给出的一端为 None"""
+    if not text:
+        return None, None
+    timerange = TimeRange.parse_timerange(text)
+    start = pd.Timestamp(timerange.startts, unit="s", tz="UTC") if timerange.startts else None
+    end = pd.Timestamp(timerange.stopts, unit="s", tz="UTC") if timerange.stopts else None
+    return start, end
+
+
+def signal_frame(strategy: Any, pair: str, candles: DataFrame,
+                 start: Optional[pd.Timestamp]) -> DataFrame:
+    """指标 + 入场/出场信号，裁掉 start 之前的预热K线"""
+    frame = strategy.advise_all_indicators({pair: candles})[pair]
+    frame = strategy.ft_advise_signals(frame, {"pair": pair})
+    if start is not None:
+        frame = frame.loc[frame["date"] >= start].reset_index(drop=True)
+    return frame
+
+
+def warmup_start(strategy: Any, start: Optional[pd.Timestamp]) -> Optional[pd.Timestamp]:
+    if start is None:
+        return None
+    minutes = timeframe_to_minutes(strategy.timeframe) * strategy.startup_candle_count
+    return start - pd.Timedelta(minutes=minutes)
+
+
+def backtest_frames(strategy: Any, frames: Dict[str, DataFrame], fee: float) -> DataFrame:
+    """按交易对独立仿真（见 common.simulator），返回交易表"""
+    return simulate(frames, strategy.exit_rules, fee, timeframe_to_minutes(strategy.timeframe))
+
+
+# ============================================================
+# 权益曲线与组合指标
+# ============================================================
+def equity_curve(frame: DataFrame, trades: DataFrame, fee: float) -> pd.Series:
+    """
+    单个交易对逐K线盯市的权益（初始 1.0，全仓复利）
+
+    持仓期间按收盘价计算浮动盈亏（已扣开仓手续费与假设的平仓手续费），
+    平仓K线起按交易的实际利润结算。
+    """
+    dates = pd.DatetimeIndex(frame["date"])
+    close = frame["close"].to_numpy(dtype=np.float64)
+    equity = np.ones(len(frame))
+    level = 1.0
+    filled = 0
+    if len(trades):
+        opens = dates.searchsorted(pd.DatetimeIndex(trades["open_date"]))
+        closes = dates.searchsorted(pd.DatetimeIndex(trades["close_date"]))
+        for j, m, rate, profit in zip(opens, closes, trades["open_rate"].to_numpy(),
+                                      trades["profit_ratio"].to_numpy()):
+            equity[filled:j] = level
+            equity[j:m] = level * close[j:m] * (1 - fee) / (rate * (1 + fee))
+            level *= 1 + profit
+            filled = m
+    equity[filled:] = level
+    return pd.Series(equity, index=dates)
+
+
+def daily(curves: Dict[str, pd.Series]) -> DataFrame:
+    """各交易对权益曲线对齐到同一日历（日终值；上市前记为 1.0）"""
+    frame = pd.DataFrame({pair: curve.resample("1D").last() for pair, curve in curves.items()})
+    return frame.ffill().fillna(1.0)
+
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    """最大回撤比例，沿最后一维计算（支持批量）"""
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return np.max(1.0 - equity / peak, axis=-1)
+
+
+def annual_return(equity: np.ndarray, days: int) -> np.ndarray:
+    years = max(days, 1) / DAYS_PER_YEAR
+    return np.power(np.maximum(equity[..., -1] / equity[..., 0], 1e-12), 1.0 / years) - 1.0
+
+
+def calmar(equity: np.ndarray, days: int) -> np.ndarray:
+    drawdown = max_drawdown(equity)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(drawdown > 0, annual_return(equity, days) / drawdown, np.inf)
+
+
+def pair_names(values: Sequence[str]) -> List[str]:
+    """命令行交易对: 允许只写基础资产（DOGE -> DOGE/USDT）"""
+    return [value if "/" in value else f"{value.upper()}/USDT" for value in values]
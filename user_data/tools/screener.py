@@ -0,0 +1,234 @@
+"""
+交易对筛选: 全市场并行回测 + 相关性感知的组合选择
+
+选出 DOGE + MNT 的过程（19 个币逐个回测，再手工比较组合回撤）自动化:
+
+1. 进程池中逐交易对生成信号并用 common.simulator 重放出场
+   （K线优先读列式K线库，worker 间共享页缓存）
+2. 每个交易对逐K线盯市的权益曲线 → 日终值 → 日收益相关系数矩阵
+3. 对每个组合规模 k 枚举全部子集（等权分配资金、不再平衡），
+   批量计算组合权益的最大回撤 / Calmar，按目标排序
+
+    python user_data/tools/screener.py --datadir user_data/data/bybit \\
+        --timerange 20250101-20260101 --k 2 3 --workers 8
+    python user_data/tools/screener.py --datadir user_data/data/bybit \\
+        --pairs DOGE MNT SOL XRP ADA --k 2 --objective drawdown --max-correlation 0.6
+
+仿真按交易对独立进行（不受 max_open_trades 约束），组合权益为各交易对权益的等权平均。
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from cli import positive_int
+from offline import (
+    STRATEGIES,
+    CandleLoader,
+    backtest_frames,
+    calmar,
+    daily,
+    equity_curve,
+    make_strategy,
+    max_drawdown,
+    pair_names,
+    parse_timerange,
+    signal_frame,
+    warmup_start,
+)
+
+
+# 每批评估的子集数（控制 子集数 x 天数 的临时数组大小）
+SUBSET_BATCH = 4096
+
+
+# ============================================================
+# worker
+# ============================================================
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(strategy_name: str, pairs: List[str], timeframe: str,
+                 datadir: str, data_format: str) -> None:
+    _worker["strategy"] = make_strategy(STRATEGIES[strategy_name], pairs, timeframe)
+    _worker["loader"] = CandleLoader(Path(datadir), data_format)
+    _worker["timeframe"] = timeframe
+
+
+def _screen_pair(args: Tuple[str, Optional[pd.Timestamp], Optional[pd.Timestamp], float]
+                 ) -> Optional[Tuple[str, DataFrame, pd.Series]]:
+    """单个交易对: (交易对, 交易表, 逐K线权益)；数据不足时返回 None"""
+    pair, start, end, fee = args
+    strategy = _worker["strategy"]
+    candles = _worker["loader"].load(pair, _worker["timeframe"], warmup_start(strategy, start), end)
+    if len(candles) <= strategy.startup_candle_count:
+        return None
+    frame = signal_frame(strategy, pair, candles, start)
+    if frame.empty:
+        return None
+    trades = backtest_frames(strategy, {pair: frame}, fee)
+    return pair, trades, equity_curve(frame, trades, fee)
+
+
+# ============================================================
+# 组合选择
+# ============================================================
+def correlation(equity: DataFrame) -> DataFrame:
+    """日收益相关系数矩阵（无波动的交易对记为 0）"""
+    returns = equity.pct_change().fillna(0.0).to_numpy().T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = np.corrcoef(returns)
+    matrix = np.nan_to_num(np.atleast_2d(matrix))
+    return DataFrame(matrix, index=equity.columns, columns=equity.columns)
+
+
+def search_subsets(equity: DataFrame, corr: DataFrame, k: int, objective: str,
+                   max_correlation: Optional[float], top: int) -> DataFrame:
+    """
+    枚举规模为 k 的全部子集，批量计算等权组合的回撤与 Calmar
+
+    Returns:
+        按目标排序的前 top 个子集
+    """
+    values = equity.to_numpy().T                     # 交易对 x 天
+    days = len(equity)
+    pairs = np.array(equity.columns)
+    corr_matrix = corr.to_numpy()
+    upper = np.triu_indices(k, 1)
+
+    rows = []
+    subsets = combinations(range(len(pairs)), k)
+    while True:
+        batch = np.array(list(_take(subsets, SUBSET_BATCH)), dtype=np.int64)
+        if batch.size == 0:
+            break
+        mean_corr = (
+            corr_matrix[batch[:, upper[0]], batch[:, upper[1]]].mean(axis=1)
+            if k > 1 else np.zeros(len(batch))
+        )
+        if max_correlation is not None:
+            keep = mean_corr <= max_correlation
+            batch, mean_corr = batch[keep], mean_corr[keep]
+            if not len(batch):
+                continue
+        portfolio = values[batch].mean(axis=1)       # 子集 x 天
+        drawdown = max_drawdown(portfolio)
+        ratio = calmar(portfolio, days)
+        total = portfolio[:, -1] - 1.0
+        for index, dd, cr, profit, rho in zip(batch, drawdown, ratio, total, mean_corr):
+            rows.append((" + ".join(pairs[index]), profit, dd, cr, rho))
+
+    result = DataFrame(rows, columns=["pairs", "profit", "max_drawdown", "calmar", "mean_corr"])
+    if objective == "drawdown":
+        result = result.sort_values(["max_drawdown", "calmar"], ascending=[True, False])
+    else:
+        result = result.sort_values(["calmar", "max_drawdown"], ascending=[False, True])
+    return result.head(top).reset_index(drop=True)
+
+
+def _take(iterator, count: int):
+    for _, item in zip(range(count), iterator):
+        yield item
+
+
+# ============================================================
+# 报告
+# ============================================================
+def pair_table(results: Dict[str, Tuple[DataFrame, pd.Series]], equity: DataFrame) -> DataFrame:
+    days = len(equity)
+    rows = []
+    for pair, (trades, _) in results.items():
+        curve = equity[pair].to_numpy()
+        rows.append((
+            pair,
+            len(trades),
+            float((trades["profit_ratio"] > 0).mean()) if len(trades) else 0.0,
+            curve[-1] - 1.0,
+            float(max_drawdown(curve)),
+            float(calmar(curve, days)),
+        ))
+    table = DataFrame(rows, columns=["pair", "trades", "winrate", "profit", "max_drawdown", "calmar"])
+    return table.sort_values("calmar", ascending=False, ignore_index=True)
+
+
+def _format(frame: DataFrame) -> str:
+    percent = {"winrate", "profit", "max_drawdown"}
+    formatters = {
+        column: (lambda v: f"{v:8.1%}") if column in percent else (lambda v: f"{v:7.2f}")
+        for column in frame.columns if frame[column].dtype.kind == "f"
+    }
+    return frame.to_string(formatters=formatters, index=False)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="交易对筛选与组合选择")
+    parser.add_argument("--datadir", type=Path, required=True,
+                        help="freqtrade 数据目录，如 user_data/data/bybit")
+    parser.add_argument("--data-format", default="feather")
+    parser.add_argument("--strategy", default="AdaptiveInstitutionalStrategy", choices=list(STRATEGIES))
+    parser.add_argument("--pairs", nargs="+", help="候选交易对（默认数据目录中的全部交易对）")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--timerange", help="回测区间，如 20250101-20260101")
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--workers", type=positive_int, default=4)
+    parser.add_argument("--k", nargs="+", type=positive_int, default=[2], help="组合规模")
+    parser.add_argument("--objective", choices=("calmar", "drawdown"), default="calmar")
+    parser.add_argument("--max-correlation", type=float,
+                        help="组合内平均日收益相关系数上限（超过则不考虑）")
+    parser.add_argument("--top", type=positive_int, default=10)
+    options = parser.parse_args(argv)
+
+    loader = CandleLoader(options.datadir, options.data_format)
+    pairs = pair_names(options.pairs) if options.pairs else loader.available_pairs(options.timeframe)
+    if not pairs:
+        parser.error(f"{options.datadir} 下没有 {options.timeframe} 数据")
+    start, end = parse_timerange(options.timerange)
+
+    started = time.perf_counter()
+    jobs = [(pair, start, end, options.fee) for pair in pairs]
+    with ProcessPoolExecutor(
+        max_workers=min(options.workers, len(pairs)),
+        initializer=_init_worker,
+        initargs=(options.strategy, pairs, options.timeframe,
+                  str(options.datadir), options.data_format),
+    ) as pool:
+        screened = [result for result in pool.map(_screen_pair, jobs) if result is not None]
+    elapsed = time.perf_counter() - started
+
+    skipped = sorted(set(pairs) - {pair for pair, _, _ in screened})
+    if skipped:
+        print(f"数据不足，跳过: {', '.join(skipped)}")
+    if not screened:
+        return 1
+    results = {pair: (trades, curve) for pair, trades, curve in screened}
+    equity = daily({pair: curve for pair, (_, curve) in results.items()})
+    corr = correlation(equity)
+
+    print(f"\n{len(results)} 个交易对回测完成，用时 {elapsed:.1f}s（{options.workers} 个进程）\n")
+    print(_format(pair_table(results, equity)))
+    print("\n日收益相关系数:")
+    print(corr.round(2).to_string())
+
+    for k in options.k:
+        if not 1 <= k <= len(results):
+            continue
+        started = time.perf_counter()
+        best = search_subsets(equity, corr, k, options.objective, options.max_correlation, options.top)
+        print(f"\nk={k}: {math.comb(len(results), k)} 个组合，用时 {time.perf_counter() - started:.2f}s")
+        print(_format(best))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+"""
+合成K线生成器（规模 / 压力测试用）
+
+真实的 DOGE/MNT 1h 历史太短、交易对太少，找不出指标层、回测与各离线工具的规模上限。
+本工具按种子生成任意长度、任意数量的合成交易对，直接写成 freqtrade 的数据文件:
+
+    python user_data/tools/synthetic.py --datadir user_data/data/synthetic \\
+        --pairs 200 --candles 100000 --workers 8
+    python user_data/tools/synthetic.py --datadir user_data/data/synthetic \\
+        --pairs 20 --candles 1000000 --start 20000101 --prefix STRESS
+
+之后即可照常使用（交易对名为 SYN000/USDT、SYN001/USDT ...）:
+
+    python user_data/tools/candle_store.py sync --datadir user_data/data/synthetic
+    python user_data/tools/screener.py --datadir user_data/data/synthetic --k 2
+
+价格模型（按小时标定，其他周期按时长缩放）:
+
+- 市场状态为马尔可夫链: trend / chop / downtrend / crash，各状态有自己的漂移、
+  波动率与成交量倍数，持续时间按指数分布抽取（crash 短而剧烈）
+- 波动率聚集: 对数波动率为 AR(1) 过程（pandas ewm 递推，不做 Python 逐根循环）
+- 收益为厚尾的 Student-t 冲击（单位方差），与状态漂移一起在对数价格上累积
+  （几何布朗运动；对数价格带极弱的均值回复，长序列也停留在合理的价格区间）
+- 影线长度随当前波动率缩放；成交量随状态、冲击大小放大，带对数正态噪声
+
+同一 --seed 生成的数据完全相同；各交易对的种子由 --seed 与序号派生。
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.data.history.datahandlers import get_datahandler
+from freqtrade.enums import CandleType
+from freqtrade.exchange import timeframe_to_minutes
+
+from cli import positive_int
+
+
+# ============================================================
+# 模型参数（每小时）
+# ============================================================
+REGIMES = ("trend", "chop", "downtrend", "crash")
+
+# 状态 → (漂移, 波动率倍数, 成交量倍数, 平均持续小时)
+REGIME_PARAMS = {
+    "trend": (0.0006, 1.0, 1.2, 400),
+    "chop": (0.0, 0.8, 0.8, 300),
+    "downtrend": (-0.0004, 1.1, 1.0, 300),
+    "crash": (-0.004, 2.5, 3.0, 36),
+}
+
+# 状态转移概率（行: 当前状态，列: 下一状态，顺序同 REGIMES）
+TRANSITIONS = np.array([
+    [0.00, 0.50, 0.30, 0.20],
+    [0.45, 0.00, 0.35, 0.20],
+    [0.30, 0.50, 0.00, 0.20],
+    [0.10, 0.60, 0.30, 0.00],
+])
+
+# 每个交易对的基础小时波动率范围、初始价格范围（对数均匀）
+BASE_VOLATILITY = (0.006, 0.016)
+START_PRICE = (0.01, 100.0)
+
+# 对数波动率 AR(1): 平滑系数（半衰期约 35 小时）与平稳标准差
+VOL_ALPHA = 0.02
+VOL_OF_VOL = 0.5
+
+# 对数价格向初始价格的均值回复速度（半衰期约 4 年）:
+# 短期内与随机游走无异，百万根K线的长序列价格也不会漂到 0 或天文数字
+MEAN_REVERSION = 2e-5
+
+# Student-t 冲击的自由度（越小尾部越厚）
+TAIL_DOF = 4
+
+
+# ============================================================
+# 生成
+# ============================================================
+def regime_path(candles: int, hours_per_candle: float, rng: np.random.Generator) -> np.ndarray:
+    """逐K线的市场状态下标（按段抽取，段数约为 K线数 / 平均持续K线数）"""
+    durations = np.array([REGIME_PARAMS[name][3] for name in REGIMES]) / hours_per_candle
+    states: List[int] = []
+    lengths: List[int] = []
+    state = int(rng.integers(len(REGIMES)))
+    total = 0
+    while total < candles:
+        length = max(1, int(rng.exponential(durations[state])))
+        states.append(state)
+        lengths.append(length)
+        total += length
+        state = int(rng.choice(len(REGIMES), p=TRANSITIONS[state]))
+    return np.repeat(np.array(states, dtype=np.int8), lengths)[:candles]
+
+
+def _log_volatility(candles: int, rng: np.random.Generator) -> np.ndarray:
+    """平稳标准差为 VOL_OF_VOL 的 AR(1)，并去掉 exp 的均值偏移"""
+    scale = VOL_OF_VOL * np.sqrt((2 - VOL_ALPHA) / VOL_ALPHA)
+    noise = rng.normal(0.0, scale, candles)
+    # ewm(adjust=False) 以第一个值为初值: 直接从平稳分布抽取
+    noise[0] = rng.normal(0.0, VOL_OF_VOL)
+    path = pd.Series(noise).ewm(alpha=VOL_ALPHA, adjust=False).mean().to_numpy()
+    return path - VOL_OF_VOL ** 2 / 2
+
+
+def generate(candles: int, seed: int, start: str = "2020-01-01",
+             timeframe: str = "1h") -> DataFrame:
+    """
+    一个合成交易对的 OHLCV（freqtrade 的列与时间格式）
+
+    Args:
+        candles: K线数
+        seed: 随机种子（同一种子结果完全相同）
+        start: 第一根K线的时间（UTC）
+        timeframe: K线周期，漂移 / 波动率 / 状态持续时间按周期时长缩放
+    """
+    rng = np.random.default_rng(seed)
+    minutes = timeframe_to_minutes(timeframe)
+    hours = minutes / 60
+
+    drift, vol_mult, volume_mult, _ = (
+        np.array([REGIME_PARAMS[name][i] for name in REGIMES]) for i in range(4)
+    )
+    regime = regime_path(candles, hours, rng)
+    base = np.exp(rng.uniform(*np.log(BASE_VOLATILITY)))
+    sigma = base * np.sqrt(hours) * vol_mult[regime] * np.exp(_log_volatility(candles, rng))
+
+    shock = rng.standard_t(TAIL_DOF, candles) / np.sqrt(TAIL_DOF / (TAIL_DOF - 2))
+    log_return = drift[regime] * hours + sigma * shock
+    # 偏离 x_t = (1 - k) * x_{t-1} + r_t，即 alpha = k、输入 r_t / k 的 ewm（初值 x_0 = r_0）
+    reversion = MEAN_REVERSION * hours
+    inputs = log_return / reversion
+    inputs[0] = log_return[0]
+    deviation = pd.Series(inputs).ewm(alpha=reversion, adjust=False).mean().to_numpy()
+    anchor = rng.uniform(*np.log(START_PRICE))
+    close = np.exp(anchor + deviation)
+    open_ = np.empty(candles)
+    open_[0] = np.exp(anchor)
+    open_[1:] = close[:-1]
+
+    wick = np.abs(rng.normal(0.0, 0.5, (2, candles))) * sigma
+    volume = (
+        np.exp(rng.uniform(np.log(1e5), np.log(1e7)))
+        * volume_mult[regime]
+        * (0.5 + np.abs(shock))
+        * np.exp(rng.normal(0.0, 0.4, candles))
+    )
+    return DataFrame({
+        "date": pd.date_range(start, periods=candles, freq=f"{minutes}min", tz="UTC"),
+        "open": open_,
+        "high": np.maximum(open_, close) * np.exp(wick[0]),
+        "low": np.minimum(open_, close) * np.exp(-wick[1]),
+        "close": close,
+        "volume": volume,
+    })
+
+
+def synthetic_pairs(count: int, prefix: str = "SYN") -> List[str]:
+    width = max(3, len(str(count - 1)))
+    return [f"{prefix}{i:0{width}d}/USDT" for i in range(count)]
+
+
+def _write_pair(args: Tuple[str, str, str, int, int, str, str]) -> Tuple[str, int, float]:
+    datadir, data_format, pair, candles, seed, start, timeframe = args
+    started = time.perf_counter()
+    frame = generate(candles, seed, start, timeframe)
+    get_datahandler(Path(datadir), data_format).ohlcv_store(pair, timeframe, frame, CandleType.SPOT)
+    return pair, len(frame), time.perf_counter() - started
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="合成K线生成器")
+    parser.add_argument("--datadir", type=Path, required=True,
+                        help="输出数据目录（建议与真实数据分开，如 user_data/data/synthetic）")
+    parser.add_argument("--data-format", default="feather")
+    parser.add_argument("--pairs", type=positive_int, default=10, help="交易对数量")
+    parser.add_argument("--prefix", default="SYN", help="交易对名前缀")
+    parser.add_argument("--candles", type=positive_int, default=100_000, help="每个交易对的K线数")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--start", default="20200101", help="第一根K线的日期（UTC）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=positive_int, default=4)
+    options = parser.parse_args(argv)
+
+    start = str(pd.Timestamp(options.start))
+    pairs = synthetic_pairs(options.pairs, options.prefix.upper())
+    seeds = np.random.SeedSequence(options.seed).generate_state(len(pairs))
+    jobs = [
+        (str(options.datadir), options.data_format, pair, options.candles, int(seed),
+         start, options.timeframe)
+        for pair, seed in zip(pairs, seeds)
+    ]
+
+    # 先建好目录，避免多个 worker 同时创建
+    options.datadir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(options.workers, len(jobs))) as pool:
+        for pair, rows, seconds in pool.map(_write_pair, jobs):
+            print(f"{pair:<16} {rows:>10} 根  {seconds * 1000:>8.1f} ms")
+    elapsed = time.perf_counter() - started
+    total = options.candles * len(pairs)
+    print(f"\n{len(pairs)} 个交易对、共 {total} 根K线写入 {options.datadir}，"
+          f"用时 {elapsed:.1f}s（{total / elapsed / 1e6:.1f} M 根/s）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+"""
+出场仿真器验证工具
+
+在参考数据上先用 freqtrade 回测引擎跑一遍策略，再用 common.simulator
+对同一批带信号的 dataframe 重放出场规则，按 (交易对, 开仓时间) 逐笔对比
+出场时间、出场原因与出场价格。
+
+用法（容器内）:
+    docker compose run --rm --entrypoint python freqtrade \\
+        /freqtrade/user_data/tools/validate_simulator.py \\
+        --config /freqtrade/user_data/config.json \\
+        --strategy AdaptiveInstitutionalStrategy \\
+        --timerange 20250101-20260101 \\
+        --pairs DOGE/USDT MNT/USDT
+
+- 除 --max-mismatch / --rate-tolerance 外的参数原样交给 freqtrade backtesting
+- 仿真器按交易对独立运行，参考回测的 max_open_trades 会被设为交易对数量
+- 不一致比例超过 --max-mismatch 时以退出码 1 结束
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "strategies"))
+
+from freqtrade.commands import Arguments  # noqa: E402
+from freqtrade.commands.optimize_commands import setup_optimize_configuration  # noqa: E402
+from freqtrade.data.converter import trim_dataframes  # noqa: E402
+from freqtrade.data.history import get_timerange  # noqa: E402
+from freqtrade.enums import RunMode  # noqa: E402
+from freqtrade.exchange import timeframe_to_minutes  # noqa: E402
+from freqtrade.optimize.backtesting import Backtesting  # noqa: E402
+
+from common.simulator import simulate  # noqa: E402
+
+
+logger = logging.getLogger("validate_simulator")
+
+_KEY = ["pair", "open_date"]
+_COMPARED = ["close_date", "close_rate", "exit_reason"]
+
+
+def run_reference(config: dict) -> Tuple[object, Dict[str, DataFrame], DataFrame, float, float]:
+    """freqtrade 回测，返回 (策略, 裁剪后含信号的 dataframe, 交易表, 手续费, 耗时)"""
+    backtesting = Backtesting(config)
+    data, timerange = backtesting.load_bt_data()
+    backtesting._set_strategy(backtesting.strategylist[0])
+    strategy = backtesting.strategy
+
+    processed = strategy.advise_all_indicators(data)
+    min_date, max_date = get_timerange(
+        trim_dataframes(processed, timerange, backtesting.required_startup)
+    )
+    started = time.perf_counter()
+    result = backtesting.backtest(processed=processed, start_date=min_date, end_date=max_date)
+    elapsed = time.perf_counter() - started
+    # backtest() 会把 processed 替换为按回测区间裁剪、已生成信号的 dataframe
+    return strategy, processed, result["results"], backtesting.fee, elapsed
+
+
+def compare(reference: DataFrame, simulated: DataFrame, rate_tolerance: float) -> DataFrame:
+    """逐笔对比，返回不一致的交易（两边各自独有的交易也算不一致）"""
+    merged = reference[_KEY + _COMPARED].merge(
+        simulated[_KEY + _COMPARED], on=_KEY, how="outer",
+        suffixes=("_ft", "_sim"), indicator=True,
+    )
+    both = (merged["_merge"] == "both").to_numpy()
+    same = (
+        both
+        & (merged["close_date_ft"] == merged["close_date_sim"]).to_numpy()
+        & (merged["exit_reason_ft"] == merged["exit_reason_sim"]).to_numpy()
+        & np.isclose(
+            merged["close_rate_ft"].to_numpy(dtype=np.float64),
+            merged["close_rate_sim"].to_numpy(dtype=np.float64),
+            rtol=rate_tolerance, atol=0.0,
+        )
+    )
+    return merged.loc[~same].drop(columns="_merge")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--max-mismatch", type=float, default=0.02,
+                        help="允许的不一致交易比例（默认 0.02）")
+    parser.add_argument("--rate-tolerance", type=float, default=1e-3,
+                        help="出场价格的相对误差容忍度（价格精度取整导致，默认 1e-3）")
+    options, backtest_args = parser.parse_known_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    args = Arguments(["backtesting", *backtest_args]).get_parsed_arg()
+    config = setup_optimize_configuration(args, RunMode.BACKTEST)
+    # 参考回测不能因仓位上限拒绝信号，否则无法与按交易对独立的仿真对比
+    config["max_open_trades"] = max(len(config["exchange"]["pair_whitelist"]), 1)
+
+    strategy, frames, reference, fee, backtest_seconds = run_reference(config)
+    exit_rules = getattr(strategy, "exit_rules", None)
+    if exit_rules is None:
+        logger.error("策略 %s 未提供 exit_rules(pair)，无法仿真", type(strategy).__name__)
+        return 2
+
+    started = time.perf_counter()
+    simulated = simulate(frames, exit_rules, fee, timeframe_to_minutes(strategy.timeframe))
+    simulate_seconds = time.perf_counter() - started
+
+    mismatches = compare(reference, simulated, options.rate_tolerance)
+    total = max(len(reference), len(simulated), 1)
+    ratio = len(mismatches) / total
+
+    logger.info("freqtrade 回测: %d 笔交易, %.2fs", len(reference), backtest_seconds)
+    logger.info("仿真器:        %d 笔交易, %.3fs", len(simulated), simulate_seconds)
+    if len(simulated):
+        logger.info("出场原因（仿真）:\n%s", simulated["exit_reason"].value_counts().to_string())
+    if len(mismatches):
+        logger.info("不一致的交易（最多 20 笔）:\n%s", mismatches.head(20).to_string())
+    logger.info("不一致: %d / %d (%.2f%%)，允许 %.2f%%",
+                len(mismatches), total, 100 * ratio, 100 * options.max_mismatch)
+
+    return 1 if ratio > options.max_mismatch else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,423 @@
+"""
+滚动前推（walk-forward）优化: ASSET_CONFIGS 的样本外检验
+
+ASSET_CONFIGS 中 DOGE 的季度表现（Q2 +11%、Q3 +38%、Q4 -12%）是手工逐段回测得到的，
+参数也是在同一段数据上调出来的。本工具把区间切成滚动的 训练 / 测试 折:
+
+    |---- 训练 90 天 ----|-- 测试 30 天 --|
+              |---- 训练 90 天 ----|-- 测试 30 天 --|
+                        ...（步长 = 测试长度，测试段首尾相接）
+
+每一折在训练段上对该资产的超参（common.hyperopt_params 的搜索空间）随机搜索，
+取目标最优的一组参数到紧接着的测试段上回测；所有测试段拼接成样本外结果，
+并与当前参数（代码中的配置或已加载的超参结果）在同样测试段上的表现对比。
+
+    python user_data/tools/walk_forward.py --datadir user_data/data/bybit \\
+        --pairs DOGE MNT --timerange 20250101-20260101 --workers 8
+    python user_data/tools/walk_forward.py --datadir user_data/data/bybit --pairs DOGE \\
+        --timerange 20250101-20260101 --train-days 120 --test-days 30 --spaces buy \\
+        --objective calmar --samples 500 --export user_data/asset_configs.json
+
+- 指标只算一次: 每个交易对在整个区间（含预热）上预计算一次指标和搜索范围内的
+  全部 EMA（与超参优化相同的 ema_grid 列），各折、各候选参数只切片并重算信号，不调用 talib
+- 折在 fork 出的 worker 进程中并行运行，预计算结果随 fork 写时复制共享，不经 pickle
+- 仿真使用 common.simulator（与 freqtrade 回测逐笔一致），按交易对独立、全仓复利；
+  持仓在每段末尾强制平仓
+- --export 把最后一折训练得到的参数合并进 asset_configs.json（只写与文件中当前生效值
+  不同的项，其余内容保留），可直接交给实盘热加载（见 common.profile_reload）
+
+仅适用于 AdaptiveInstitutionalStrategy（MntTrendHoldV3Strategy 没有按资产的参数）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from freqtrade.enums import HyperoptState
+from freqtrade.optimize.hyperopt_tools import HyperoptStateContainer
+from freqtrade.strategy import DecimalParameter
+
+from cli import non_negative_int, positive_int
+from offline import (
+    STRATEGIES,
+    CandleLoader,
+    backtest_frames,
+    calmar,
+    equity_curve,
+    make_strategy,
+    max_drawdown,
+    pair_names,
+    parse_timerange,
+    warmup_start,
+)
+
+from adaptive_institutional_strategy import ASSET_PARAMETERS, PROFILES
+
+
+STRATEGY = "AdaptiveInstitutionalStrategy"
+
+# 信号层需要回看的K线数（slope 的 shift(10)、trend_break 的前一根），
+# 每个窗口向前多取这些K线再裁掉，使窗口内的信号与整段计算一致
+SIGNAL_LOOKBACK = 16
+
+Fold = Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]   # (训练起点, 测试起点, 测试终点)
+
+
+# ============================================================
+# 折与指标预计算
+# ============================================================
+def make_folds(start: pd.Timestamp, end: pd.Timestamp,
+               train_days: int, test_days: int) -> List[Fold]:
+    """滚动切分；最后一个测试段不足 test_days 时截到 end"""
+    if train_days <= 0 or test_days <= 0:
+        # test_days 为 0 时测试起点永远不前进
+        raise ValueError("训练段与测试段长度需为正数")
+    folds = []
+    test_start = start + pd.Timedelta(days=train_days)
+    while test_start < end:
+        test_end = min(test_start + pd.Timedelta(days=test_days), end)
+        folds.append((test_start - pd.Timedelta(days=train_days), test_start, test_end))
+        test_start = test_end
+    return folds
+
+
+def enable_search(strategy: Any, asset: str, spaces: List[str]) -> Dict[str, Any]:
+    """把该资产在 spaces 中的参数纳入搜索，返回 {参数名: 参数对象}"""
+    searched = {}
+    for name, parameter in ASSET_PARAMETERS[asset].parameters.items():
+        parameter = getattr(strategy, name)
+        if parameter.space in spaces:
+            parameter.in_space = True
+            parameter.optimize = True
+            searched[name] = parameter
+    return searched
+
+
+@contextmanager
+def _indicator_state():
+    """
+    按超参优化的指标阶段计算: 参数的 .range 返回完整搜索范围，
+    populate_indicators 因此预计算 ema_grid 列
+    """
+    # 网格已覆盖搜索范围，freqtrade 关于"指标阶段使用参数静态值"的警告不适用
+    parameter_logger = logging.getLogger("freqtrade.strategy.parameters")
+    disabled = parameter_logger.disabled
+    parameter_logger.disabled = True
+    HyperoptStateContainer.set_state(HyperoptState.INDICATORS)
+    try:
+        yield
+    finally:
+        HyperoptStateContainer.set_state(HyperoptState.OPTIMIZE)
+        parameter_logger.disabled = disabled
+
+
+def precompute(strategy: Any, loader: CandleLoader, pair: str, start: pd.Timestamp,
+               end: pd.Timestamp) -> DataFrame:
+    """整个区间（含预热）的指标与 EMA 网格，一个交易对只算一次"""
+    candles = loader.load(pair, strategy.timeframe, warmup_start(strategy, start), end)
+    if len(candles) <= strategy.startup_candle_count:
+        return DataFrame()
+    with _indicator_state():
+        return strategy.advise_all_indicators({pair: candles})[pair]
+
+
+# ============================================================
+# worker
+# ============================================================
+# 主进程在创建进程池之前写入，worker 经 fork 继承（写时复制）
+_shared: Dict[str, Any] = {}
+
+
+def _window(frame: DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> Tuple[DataFrame, int]:
+    """[start, end) 区间加上信号回看K线的副本，以及需要裁掉的前置行数"""
+    dates = pd.DatetimeIndex(frame["date"])
+    lo, hi = dates.searchsorted(start), dates.searchsorted(end)
+    first = max(lo - SIGNAL_LOOKBACK, 0)
+    return frame.iloc[first:hi].copy(), lo - first
+
+
+def _evaluate(strategy: Any, pair: str, window: DataFrame, skip: int,
+              values: Dict[str, Any], fee: float) -> Tuple[DataFrame, DataFrame]:
+    """
+    用给定参数值重算窗口内的信号并仿真，返回 (裁剪后的信号 dataframe, 交易表)
+
+    同一窗口在各候选参数之间复用: 信号列与 EMA 选择列每次整体覆盖写入。
+    """
+    for name, value in values.items():
+        getattr(strategy, name).value = value
+    frame = strategy.ft_advise_signals(window, {"pair": pair}).iloc[skip:]
+    return frame, backtest_frames(strategy, {pair: frame}, fee)
+
+
+def _score(frame: DataFrame, trades: DataFrame, fee: float, objective: str,
+           min_trades: int, days: int) -> float:
+    if len(trades) < max(min_trades, 1):
+        return -np.inf
+    if objective == "profit":
+        return float(np.prod(1.0 + trades["profit_ratio"].to_numpy()) - 1.0)
+    return float(calmar(equity_curve(frame, trades, fee).to_numpy(), days))
+
+
+def _draw(parameter: Any, rng: np.random.Generator) -> Any:
+    if isinstance(parameter, DecimalParameter):
+        return round(float(rng.uniform(parameter.low, parameter.high)), parameter.decimals)
+    return int(rng.integers(parameter.low, parameter.high + 1))
+
+
+def _run_fold(task: Tuple[str, int, Fold]) -> Dict[str, Any]:
+    """一折: 训练段随机搜索 → 测试段回测最优参数与当前参数"""
+    pair, index, (train_start, test_start, test_end) = task
+    strategy = _shared["strategy"]
+    options = _shared["options"]
+    frame = _shared["frames"][pair]
+    searched = _shared["searched"][pair]
+    current = _shared["current"][pair]
+
+    rng = np.random.default_rng([options.seed, _shared["pairs"].index(pair), index])
+    candidates = [current] + [
+        {name: _draw(parameter, rng) for name, parameter in searched.items()}
+        for _ in range(options.samples)
+    ]
+
+    train_days = (test_start - train_start).days
+    window, skip = _window(frame, train_start, test_start)
+    best, best_score, best_trades = current, -np.inf, 0
+    for values in candidates:
+        signals, trades = _evaluate(strategy, pair, window, skip, values, options.fee)
+        score = _score(signals, trades, options.fee, options.objective, options.min_trades, train_days)
+        if score > best_score:
+            best, best_score, best_trades = values, score, len(trades)
+
+    window, skip = _window(frame, test_start, test_end)
+    result = {
+        "pair": pair, "fold": index,
+        "train_start": train_start, "test_start": test_start, "test_end": test_end,
+        "params": best, "train_score": best_score, "train_trades": best_trades,
+    }
+    for label, values in (("wf", best), ("current", current)):
+        signals, trades = _evaluate(strategy, pair, window, skip, values, options.fee)
+        result[f"{label}_trades"] = trades
+        result[f"{label}_curve"] = equity_curve(signals, trades, options.fee)
+    return result
+
+
+# ============================================================
+# 汇总
+# ============================================================
+def stitch(curves: List[pd.Series]) -> pd.Series:
+    """首尾相接的测试段权益曲线连成一条（每段从上一段的终值继续复利）"""
+    level, parts = 1.0, []
+    for curve in curves:
+        if curve.empty:
+            continue
+        parts.append(curve * level)
+        level *= float(curve.iloc[-1])
+    return pd.concat(parts) if parts else pd.Series(dtype=np.float64)
+
+
+def _curve_stats(curve: pd.Series, days: int) -> Tuple[float, float, float]:
+    """(收益, 最大回撤, Calmar)"""
+    if curve.empty:
+        return 0.0, 0.0, 0.0
+    values = np.concatenate([[1.0], curve.to_numpy()])
+    return values[-1] - 1.0, float(max_drawdown(values)), float(calmar(values, days))
+
+
+def fold_table(results: List[Dict[str, Any]]) -> DataFrame:
+    rows = []
+    for r in results:
+        days = max((r["test_end"] - r["test_start"]).days, 1)
+        wf_profit, wf_dd, _ = _curve_stats(r["wf_curve"], days)
+        cur_profit, cur_dd, _ = _curve_stats(r["current_curve"], days)
+        rows.append((
+            r["pair"], r["fold"], r["test_start"].strftime("%Y-%m-%d"),
+            r["test_end"].strftime("%Y-%m-%d"), r["train_trades"], r["train_score"],
+            len(r["wf_trades"]), wf_profit, wf_dd, cur_profit, cur_dd,
+        ))
+    return DataFrame(rows, columns=[
+        "pair", "fold", "test_start", "test_end", "train_trades", "train_score",
+        "trades", "profit", "max_drawdown", "current_profit", "current_drawdown",
+    ])
+
+
+def out_of_sample(results: List[Dict[str, Any]], days: int) -> DataFrame:
+    """各交易对拼接后的样本外表现: 滚动优化参数 vs 当前参数"""
+    rows = []
+    for pair in dict.fromkeys(r["pair"] for r in results):
+        folds = sorted((r for r in results if r["pair"] == pair), key=lambda r: r["fold"])
+        for label, name in (("wf", "walk-forward"), ("current", "current")):
+            trades = pd.concat([r[f"{label}_trades"] for r in folds], ignore_index=True)
+            profit, drawdown, ratio = _curve_stats(stitch([r[f"{label}_curve"] for r in folds]), days)
+            winrate = float((trades["profit_ratio"] > 0).mean()) if len(trades) else 0.0
+            rows.append((pair, name, len(trades), winrate, profit, drawdown, ratio))
+    return DataFrame(rows, columns=["pair", "params", "trades", "winrate", "profit",
+                                    "max_drawdown", "calmar"])
+
+
+def param_table(results: List[Dict[str, Any]], pair: str) -> DataFrame:
+    """该交易对各折选出的参数（行: 参数，列: 折），用于观察参数是否稳定"""
+    folds = sorted((r for r in results if r["pair"] == pair), key=lambda r: r["fold"])
+    table = DataFrame({f"fold{r['fold']}": r["params"] for r in folds})
+    table.insert(0, "current", pd.Series(_shared["current"][pair]))
+    return table
+
+
+def _plain(value: Any) -> Any:
+    """JSON 形式（元组 → 列表），用于与文件中的值比较"""
+    return json.loads(json.dumps(value))
+
+
+def _searched_keys(asset: str, names: Iterable[str]) -> List[str]:
+    """参数名（doge_rsi_oversold / doge_lock1_profit）→ 档案配置键"""
+    prefix = f"{asset.lower()}_"
+    keys = (name[len(prefix):] for name in names)
+    return list(dict.fromkeys("profit_lock_levels" if key.startswith("lock") else key for key in keys))
+
+
+def export_profile(strategy: Any, results: List[Dict[str, Any]], path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    最后一折的参数合并进 asset_configs.json
+
+    只写入与当前生效值（文件中的覆盖项，没有则为代码配置）不同的搜索项；
+    文件中的 "default"、其他资产与未搜索的项保持不变，没有变化时不写文件。
+
+    Returns:
+        本次写入的 {资产: {参数: 值}}
+    """
+    content = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    if not isinstance(content, dict) or not isinstance(content.get("assets", {}), dict):
+        raise ValueError(f"{path} 不是 asset_configs.json 格式")
+    assets = content.setdefault("assets", {})
+
+    changed: Dict[str, Dict[str, Any]] = {}
+    for pair in dict.fromkeys(r["pair"] for r in results):
+        last = max((r for r in results if r["pair"] == pair), key=lambda r: r["fold"])
+        code = PROFILES.resolve(pair)
+        for name, value in last["params"].items():
+            getattr(strategy, name).value = value
+        overrides = ASSET_PARAMETERS[code.name].overrides(strategy)
+        # 文件中的资产名不区分大小写（见 common.profile_reload）
+        entry = next((name for name in assets if name.upper() == code.name), code.name)
+        current = assets.get(entry, {})
+        for key in _searched_keys(code.name, last["params"]):
+            value = _plain(overrides[key])
+            if value != _plain(current.get(key, getattr(code, key))):
+                changed.setdefault(entry, {})[key] = value
+
+    if changed:
+        for entry, values in changed.items():
+            assets.setdefault(entry, {}).update(values)
+        path.write_text(json.dumps(content, indent=4, ensure_ascii=False) + "\n", encoding="utf-8")
+    return changed
+
+
+def _format(frame: DataFrame) -> str:
+    percent = {"winrate", "profit", "max_drawdown", "current_profit", "current_drawdown"}
+    formatters = {
+        column: (lambda v: f"{v:8.1%}") if column in percent else (lambda v: f"{v:7.2f}")
+        for column in frame.columns if frame[column].dtype.kind == "f"
+    }
+    return frame.to_string(formatters=formatters, index=False)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="按资产档案的滚动前推优化")
+    parser.add_argument("--datadir", type=Path, required=True,
+                        help="freqtrade 数据目录，如 user_data/data/bybit")
+    parser.add_argument("--data-format", default="feather")
+    parser.add_argument("--pairs", nargs="+", required=True,
+                        help="交易对（其资产需在 ASSET_CONFIGS 中）")
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--timerange", required=True, help="整体区间，如 20250101-20260101")
+    parser.add_argument("--train-days", type=positive_int, default=90)
+    parser.add_argument("--test-days", type=positive_int, default=30)
+    parser.add_argument("--spaces", nargs="+", choices=("buy", "sell"), default=["buy", "sell"],
+                        help="搜索的参数空间（buy: 入场 EMA / 入场过滤，sell: 出场 EMA / 阶梯止盈）")
+    parser.add_argument("--samples", type=non_negative_int, default=200, help="每折训练段的随机候选数")
+    parser.add_argument("--objective", choices=("calmar", "profit"), default="calmar")
+    parser.add_argument("--min-trades", type=non_negative_int, default=5,
+                        help="训练段交易数少于此值的候选不予考虑")
+    parser.add_argument("--fee", type=float, default=0.001)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=positive_int, default=4)
+    parser.add_argument("--export", type=Path,
+                        help="把最后一折的参数按 asset_configs.json 格式写入该文件")
+    options = parser.parse_args(argv)
+
+    start, end = parse_timerange(options.timerange)
+    if start is None or end is None:
+        parser.error("--timerange 需要给出起止日期")
+    folds = make_folds(start, end, options.train_days, options.test_days)
+    if not folds:
+        parser.error("区间短于训练段长度，无法切分")
+
+    pairs = pair_names(options.pairs)
+    unknown = [pair for pair in pairs if PROFILES.resolve(pair).name not in ASSET_PARAMETERS]
+    if unknown:
+        parser.error(f"以下交易对的资产不在 ASSET_CONFIGS 中: {', '.join(unknown)}")
+
+    strategy = make_strategy(STRATEGIES[STRATEGY], pairs, options.timeframe)
+    loader = CandleLoader(options.datadir, options.data_format)
+
+    started = time.perf_counter()
+    frames, searched, current = {}, {}, {}
+    for pair in pairs:
+        searched[pair] = enable_search(strategy, PROFILES.resolve(pair).name, options.spaces)
+        current[pair] = {name: parameter.value for name, parameter in searched[pair].items()}
+        frame = precompute(strategy, loader, pair, start, end)
+        if frame.empty:
+            print(f"{pair}: 数据不足，跳过")
+            continue
+        frames[pair] = frame
+    if not frames:
+        return 1
+    grid = max(sum(column.startswith("ema_grid_") for column in f.columns) for f in frames.values())
+    print(f"{len(frames)} 个交易对指标预计算完成（EMA 网格 {grid} 列），"
+          f"用时 {time.perf_counter() - started:.1f}s")
+
+    _shared.update(strategy=strategy, options=options, frames=frames,
+                   searched=searched, current=current, pairs=pairs)
+    tasks = [(pair, index, fold) for pair in frames for index, fold in enumerate(folds, start=1)]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=min(options.workers, len(tasks)),
+        mp_context=multiprocessing.get_context("fork"),
+    ) as pool:
+        results = list(pool.map(_run_fold, tasks))
+    print(f"{len(tasks)} 折 x {options.samples + 1} 组参数完成，"
+          f"用时 {time.perf_counter() - started:.1f}s（{options.workers} 个进程）\n")
+
+    print(_format(fold_table(results)))
+    days = max((end - folds[0][1]).days, 1)
+    print(f"\n样本外（{folds[0][1]:%Y-%m-%d} ~ {end:%Y-%m-%d}，各测试段拼接）:")
+    print(_format(out_of_sample(results, days)))
+    for pair in frames:
+        print(f"\n{pair} 各折参数:")
+        print(param_table(results, pair).to_string())
+
+    if options.export:
+        changed = export_profile(strategy, results, options.export)
+        if changed:
+            print(f"\n已合并进 {options.export}: "
+                  + "; ".join(f"{asset} {', '.join(values)}" for asset, values in changed.items()))
+        else:
+            print(f"\n参数与 {options.export} 中生效的值相同，未写入")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
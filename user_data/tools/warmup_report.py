@@ -0,0 +1,131 @@
+"""
+预热K线数报告
+
+按交易对解析 AdaptiveInstitutionalStrategy 的资产档案，列出每个指标在给定收敛容差下
+所需的最少预热K线数、交易对整体所需预热，以及与 startup_candle_count 的差距。
+MntTrendHoldV3Strategy 的指标周期固定，按其自身的列单独列出。
+
+启用了高周期确认（higher_timeframe_confirmation）时，各高周期所需的主周期K线数
+（HigherTimeframeSpec.needed_candles）作为 htf_<周期> 行计入交易对整体预热，
+与策略的 pair_startup_candles 一致。--confirmation default 按 DEFAULT_CONFIRMATION 估算。
+
+    python user_data/tools/warmup_report.py                              # config.json 的白名单
+    python user_data/tools/warmup_report.py --pairs DOGE/USDT MNT/USDT SOL/USDT
+    python user_data/tools/warmup_report.py --tolerance 0.05 0.01
+    python user_data/tools/warmup_report.py --confirmation default
+
+容差含义见 common.warmup: 递推指标（EMA / Wilder）初始种子的剩余权重上限。
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+USER_DATA = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(USER_DATA / "strategies"))
+
+from adaptive_institutional_strategy import PROFILES, AdaptiveInstitutionalStrategy  # noqa: E402
+from common.higher_timeframe import DEFAULT_CONFIRMATION, HigherTimeframeSpec  # noqa: E402
+from common.warmup import DEFAULT_TOLERANCE, indicator_warmups  # noqa: E402
+from mnt_trend_hold_v3 import MntTrendHoldV3Strategy  # noqa: E402
+
+
+# MntTrendHoldV3Strategy 的列 → 对应的指标预热项
+_MNT_COLUMNS = {
+    "ema20": "ema_fast",
+    "ema50": "ema_slow",
+    "ema100": "ema_trend",
+    "rsi": "rsi",
+    "atr": "atr",
+    "ema50_slope": "slope",
+}
+
+
+def whitelist(config_path: Path) -> List[str]:
+    config = json.loads(config_path.read_text(encoding="utf-8"))
+    return list(config.get("exchange", {}).get("pair_whitelist", []))
+
+
+def adaptive_report(pairs: List[str], tolerance: float,
+                    confirmation: Sequence[HigherTimeframeSpec] = ()) -> Dict[str, Dict[str, int]]:
+    """
+    {交易对: {指标: 预热K线数}}（档案取代码中的配置，不含热加载文件与超参结果）
+
+    与 AdaptiveInstitutionalStrategy.pair_startup_candles 相同: 高周期确认所需K线数一并计入
+    """
+    timeframe = AdaptiveInstitutionalStrategy.timeframe
+    report = {}
+    for pair in pairs:
+        warmups = indicator_warmups(PROFILES.resolve(pair).ema_periods, tolerance)
+        for spec in confirmation:
+            warmups[f"htf_{spec.timeframe}"] = spec.needed_candles(timeframe, tolerance)
+        report[pair] = warmups
+    return report
+
+
+def mnt_report(tolerance: float) -> Dict[str, int]:
+    strategy = MntTrendHoldV3Strategy
+    periods = (strategy.ema_fast, strategy.ema_slow, strategy.ema_trend, strategy.ema_trend)
+    warmups = indicator_warmups(periods, tolerance)
+    return {column: warmups[key] for column, key in _MNT_COLUMNS.items()}
+
+
+def _print_table(title: str, columns: Dict[str, Dict[str, int]], startup: int) -> None:
+    names = list(columns)
+    indicators = list(next(iter(columns.values())))
+    width = max(12, *(len(name) for name in names))
+    print(f"\n{title}")
+    print(f"{'indicator':<18}" + "".join(f"{name:>{width + 2}}" for name in names))
+    for indicator in indicators:
+        print(f"{indicator:<18}" + "".join(f"{columns[name][indicator]:>{width + 2}}" for name in names))
+
+    needed = {name: max(values.values()) for name, values in columns.items()}
+    print(f"{'-> pair warmup':<18}" + "".join(f"{needed[name]:>{width + 2}}" for name in names))
+    print(f"{'startup_candle':<18}" + "".join(f"{startup:>{width + 2}}" for _ in names))
+    for name in names:
+        if needed[name] > startup:
+            print(f"  {name}: 预热不足 {needed[name] - startup} 根（回测初期 / 冷启动时指标未收敛）")
+        else:
+            print(f"  {name}: 富余 {startup - needed[name]} 根")
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="按交易对 / 指标的预热K线数报告")
+    parser.add_argument("--config", type=Path, default=USER_DATA / "config.json")
+    parser.add_argument("--pairs", nargs="+", help="交易对（默认取配置文件的白名单）")
+    parser.add_argument("--tolerance", nargs="+", type=float, default=[DEFAULT_TOLERANCE],
+                        help=f"收敛容差，可给多个（默认 {DEFAULT_TOLERANCE}）")
+    parser.add_argument("--confirmation", choices=("strategy", "default", "none"), default="strategy",
+                        help="高周期确认: 策略当前的 higher_timeframe_confirmation / "
+                             "DEFAULT_CONFIRMATION / 不计入")
+    options = parser.parse_args(argv)
+    confirmation = {
+        "strategy": AdaptiveInstitutionalStrategy.higher_timeframe_confirmation,
+        "default": DEFAULT_CONFIRMATION,
+        "none": (),
+    }[options.confirmation]
+
+    pairs = options.pairs or whitelist(options.config)
+    if not pairs:
+        parser.error("未指定交易对，且配置文件白名单为空")
+
+    for tolerance in options.tolerance:
+        _print_table(
+            f"AdaptiveInstitutionalStrategy（容差 {tolerance:g}）",
+            adaptive_report(pairs, tolerance, confirmation),
+            AdaptiveInstitutionalStrategy.startup_candle_count,
+        )
+        _print_table(
+            f"MntTrendHoldV3Strategy（容差 {tolerance:g}）",
+            {"all pairs": mnt_report(tolerance)},
+            MntTrendHoldV3Strategy.startup_candle_count,
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))